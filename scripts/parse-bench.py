@@ -0,0 +1,85 @@
+"""Benchmark parsing of OpenSees recorder output.
+
+Compares the vectorized parsers in 'bridge_sim.sim.run.opensees.parse.common'
+against the previous implementation, on synthetic recorder files. Run from the
+repository root with e.g. 'pipenv run python scripts/parse-bench.py'.
+
+"""
+
+import os
+import sys
+import tempfile
+from timeit import default_timer as timer
+
+import numpy as np
+
+from bridge_sim.sim.run.opensees.parse.common import (
+    opensees_strains_to_numpy,
+    opensees_to_numpy,
+)
+
+NUM_NODES = [1_000, 10_000, 100_000]
+NUM_STEPS = 1
+REPEATS = 3
+
+
+def legacy_translations(path: str) -> np.ndarray:
+    """The previous implementation of 'opensees_to_numpy'."""
+    with open(path) as f:
+        x = f.read()
+    x = list(filter(lambda y: len(y) > 0, x.split("\n")))
+    for i in range(len(x)):
+        x[i] = list(map(float, x[i].split()))
+    return np.array(x)
+
+
+def legacy_strains(path: str) -> np.ndarray:
+    """The previous implementation of parsing one strain recorder file."""
+    with open(path) as f:
+        new_lines = f.read()
+        if new_lines.endswith("\n"):
+            new_lines = new_lines[:-1]
+        new_lines = list(map(float, new_lines.split()))
+        sections = len(new_lines) / 8
+        if int(len(new_lines)) / 8 != sections:
+            raise ValueError("Unexpected length of parsed strains")
+        return np.array(np.array_split(new_lines, sections))
+
+
+def best_time(f, path: str):
+    """Result of 'f(path)' and the best time of a few runs."""
+    times = []
+    for _ in range(REPEATS):
+        start = timer()
+        result = f(path)
+        times.append(timer() - start)
+    return result, min(times)
+
+
+def write_recorder(path: str, num_steps: int, num_columns: int):
+    """Write a synthetic recorder file, one line per analysis step."""
+    values = np.random.default_rng(0).normal(size=(num_steps, num_columns))
+    np.savetxt(path, values, fmt="%.10g")
+
+
+def bench(name: str, legacy, vectorized, num_columns: int, dir_: str):
+    path = os.path.join(dir_, f"{name}-{num_columns}.out")
+    write_recorder(path=path, num_steps=NUM_STEPS, num_columns=num_columns)
+    old, old_time = best_time(legacy, path)
+    new, new_time = best_time(vectorized, path)
+    assert old.shape == new.shape
+    assert np.allclose(old, new)
+    print(
+        f"{name:>12} {num_columns:>9} values:"
+        + f" legacy {old_time:.3f}s, vectorized {new_time:.3f}s,"
+        + f" speedup {old_time / new_time:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    num_nodes = list(map(int, sys.argv[1:])) or NUM_NODES
+    with tempfile.TemporaryDirectory() as dir_:
+        for n in num_nodes:
+            bench("translation", legacy_translations, opensees_to_numpy, n, dir_)
+            # 8 section deformations per element, about one element per node.
+            bench("strain", legacy_strains, opensees_strains_to_numpy, n * 8, dir_)
@@ -5,23 +5,15 @@ from typing import Callable, Optional
 
 from bridge_sim.model import Config, Bridge
 from bridge_sim.sim.run.opensees import os_runner
+from bridge_sim.sim.run.sparse import sparse_runner
 from bridge_sim.util import project_dir
 
 
-def opensees_default(
-    bridge: Callable[[], Bridge], os_exe: Optional[str] = None, **kwargs
-) -> Config:
-    """A Config using OpenSees for a given Bridge.
-
-    Args:
-        bridge: function to return a new Bridge.
-        os_exe: absolute path to OpenSees binary. Optional, if not given this
-            will look for OpenSees on the $PATH.
-        kwargs: keyword arguments passed to the Config constructor.
-    """
+def _default(bridge: Callable[[], Bridge], sim_runner, **kwargs) -> Config:
+    """A Config for a given Bridge and FEMRunner, with default vehicle data."""
     return Config(
         bridge=bridge,
-        sim_runner=os_runner(os_exe),
+        sim_runner=sim_runner,
         vehicle_data_path=os.path.join(project_dir(), "data/traffic/traffic.csv"),
         vehicle_pdf=[
             (2.4, 5),
@@ -35,3 +27,27 @@ def opensees_default(
         vehicle_pdf_col="length",
         **kwargs,
     )
+
+
+def opensees_default(
+    bridge: Callable[[], Bridge], os_exe: Optional[str] = None, **kwargs
+) -> Config:
+    """A Config using OpenSees for a given Bridge.
+
+    Args:
+        bridge: function to return a new Bridge.
+        os_exe: absolute path to OpenSees binary. Optional, if not given this
+            will look for OpenSees on the $PATH.
+        kwargs: keyword arguments passed to the Config constructor.
+    """
+    return _default(bridge=bridge, sim_runner=os_runner(os_exe), **kwargs)
+
+
+def sparse_default(bridge: Callable[[], Bridge], **kwargs) -> Config:
+    """A Config using the in-process sparse FE solver for a given Bridge.
+
+    Args:
+        bridge: function to return a new Bridge.
+        kwargs: keyword arguments passed to the Config constructor.
+    """
+    return _default(bridge=bridge, sim_runner=sparse_runner(), **kwargs)
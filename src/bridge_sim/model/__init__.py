@@ -204,11 +204,32 @@ class Config:
         # OpenSees
         self.os_model_template_path: str = "model-template.tcl"
         self.os_3d_model_template_path: str = "model-template-3d.tcl"
+        # Recorders write binary instead of ASCII output, ASCII is for debugging.
+        self.os_binary_recorders: bool = False
 
         # Simulation performance.
         self.parallel = 1
         self.parallel_ulm = True
         self.shorten_paths = shorten_paths
+        # Point load simulations per FE model file, if supported by FEMRunner.
+        self.sim_batch_size: int = 1
+        # FE program processes run concurrently by one FEMRunner.
+        self.parallel_sims: int = 1
+        # If set, each simulation is built, run, parsed, converted and saved
+        # independently, with at most this many simulations in memory at once.
+        self.sim_window: Optional[int] = None
+        # Unit load positions solved at once, if the FEMRunner computes unit
+        # load matrices directly. Bounds memory use.
+        self.ulm_block_size: int = 128
+        # Compute unit load matrices directly with one solve per point, instead
+        # of one per load position. If None, whichever needs fewer solves.
+        self.ulm_adjoint: Optional[bool] = None
+        # Reduced-order models, if supported by the FEMRunner: relative
+        # tolerance of the reduced basis, range of the scale of each group's
+        # stiffness it is trained on, and amount of random scales to validate.
+        self.rom_tol: float = 1e-6
+        self.rom_scales: Tuple[float, float] = (0.5, 2)
+        self.rom_validation: int = 2
         self.resp_matrices = dict()
 
         # Unit loads.
@@ -223,6 +244,14 @@ class Config:
         # Responses & events.
         self.sensor_hz: float = 1 / 100
         self.event_time_s: float = 2  # Seconds.
+        # Modes of vibration, and damping as a fraction of critical damping, of
+        # dynamic responses to traffic (if supported by FEMRunner).
+        self.dynamic_modes: int = 30
+        self.dynamic_damping_ratio: float = 0.02
+        # Time steps of responses to traffic computed at once, and threads that
+        # compute them, when streamed (see 'responses_to_traffic_blocks').
+        self.traffic_block_size: int = 10000
+        self.traffic_threads: int = 2
 
         # Vehicles.
         self.perturb_stddev: float = 0.1
@@ -256,21 +256,25 @@ class ThermalScenario(Scenario):
             raise ValueError(
                 f"Can only convert Strain not {sim_responses.response_type}"
             )
+        return sim_responses.map(lambda r: self.strain(c=c, responses=r))
+
+    def strain(self, c: Config, responses):
+        """Convert unit responses (microstrain), adding free and restrained strain.
+
+        Args:
+            c: Config, global configuration object.
+            responses: float or array, responses to this thermal scenario.
+
+        """
         if self.axial_delta_temp != 0 and self.moment_delta_temp != 0:
             raise ValueError("Must be only axial or moment loading")
         # Uniform temperature load.
         if self.axial_delta_temp != 0:
-            sim_responses = sim_responses.map(
-                lambda r: (r * 1e-6) - (1 * c.cte * c.unit_axial_delta_temp_c)
-            )
+            return (responses * 1e-6) - (1 * c.cte * c.unit_axial_delta_temp_c)
         # Linear temperature load.
         elif self.moment_delta_temp != 0:
-            sim_responses = sim_responses.map(
-                lambda r: r * 1e-6 + (0.5 * c.cte * c.unit_moment_delta_temp_c)
-            )
-        else:
-            raise ValueError("Don't know how to convert to strain")
-        return sim_responses
+            return responses * 1e-6 + (0.5 * c.cte * c.unit_moment_delta_temp_c)
+        raise ValueError("Don't know how to convert to strain")
 
     def to_stress(self, c: Config, sim_responses: SimResponses):
         sim_responses = self.to_strain(c=c, sim_responses=sim_responses)
@@ -0,0 +1,187 @@
+"""Content-addressed storage of simulation responses.
+
+Responses of a simulation are saved under a digest of everything that
+determines them: the bridge's geometry, materials, boundary conditions and
+mesh parameters, and the simulation's loads. The bridge's name and data ID are
+not part of the digest, so identical simulations from different scenarios,
+configs or machines resolve to the same file, and checking for saved
+responses is a single 'stat'.
+
+A JSON sidecar next to each responses file records the description that was
+hashed, for inspection.
+
+"""
+
+import functools
+import hashlib
+import json
+import os
+import platform
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from bridge_sim.model import Bridge, Config, Material, ResponseType
+from bridge_sim.sim.store import MESH_EXT, META_EXT
+from bridge_sim.util import atomic_write, print_i
+
+# Increment when the simulation model changes in a way that changes responses,
+# so that previously saved responses are no longer found.
+CACHE_VERSION = 1
+# Fractions of pier length at which pier material functions are described.
+_PIER_FRACS = np.linspace(0, 1, 101)
+
+
+def _num(x) -> float:
+    """Canonical representation of a number."""
+    return float(np.around(float(x), 9)) + 0.0  # Adding 0.0 removes -0.0.
+
+
+def _material_key(material: Material) -> Dict:
+    key = {
+        "density": _num(material.density),
+        "thickness": _num(material.thickness),
+        "youngs": _num(material.youngs),
+        "youngs_x": _num(material.youngs_x()),
+        "poissons": _num(material.poissons),
+    }
+    for attr in ["start_x_frac", "start_z_frac", "end_x_frac", "end_z_frac"]:
+        value = getattr(material, attr)
+        key[attr] = None if value is None else _num(value)
+    if hasattr(material, "start_frac_len"):
+        key["start_frac_len"] = _num(material.start_frac_len)
+    return key
+
+
+@functools.lru_cache(maxsize=None)
+def _material_f_key(material_f: Callable[[float], Material]) -> str:
+    """Digest of a function from fraction of pier length to material.
+
+    Cached, material functions are module-level functions of their argument.
+
+    """
+    key = [_material_key(material_f(frac)) for frac in _PIER_FRACS]
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def bridge_key(bridge: Bridge) -> Dict:
+    """Canonical description of everything about a bridge affecting responses."""
+    supports = []
+    for support in bridge.supports:
+        if callable(support._sections):
+            sections = _material_f_key(support._sections)
+        else:
+            sections = list(map(_material_key, support._sections))
+        supports.append(
+            {
+                "x": _num(support.x),
+                "z": _num(support.z),
+                "length": _num(support.length),
+                "height": _num(support.height),
+                "width_top": _num(support.width_top),
+                "width_bottom": _num(support.width_bottom),
+                "fix": [
+                    support.fix_x_translation,
+                    support.fix_y_translation,
+                    support.fix_z_translation,
+                    support.fix_x_rotation,
+                    support.fix_y_rotation,
+                    support.fix_z_rotation,
+                ],
+                "sections": sections,
+            }
+        )
+    return {
+        "length": _num(bridge.length),
+        "width": _num(bridge.width),
+        "msl": _num(bridge.msl),
+        "mesh": [
+            _num(bridge.base_mesh_deck_max_x),
+            _num(bridge.base_mesh_deck_max_z),
+            _num(bridge.base_mesh_pier_max_long),
+        ],
+        "additional_xs": list(map(_num, bridge.additional_xs)),
+        "ref_temp_c": _num(bridge.ref_temp_c),
+        "sections": list(map(_material_key, bridge.sections)),
+        "supports": supports,
+        "lanes": [[_num(l.z_min), _num(l.z_max), l.ltr] for l in bridge.lanes],
+    }
+
+
+def sim_params_key(sim_params: "SimParams") -> Dict:
+    """Canonical description of the loads of a simulation."""
+    temp = lambda t: None if t is None else _num(t)
+    key = {
+        "ploads": [[_num(pl.x), _num(pl.z), _num(pl.load)] for pl in sim_params.ploads],
+        "pier_settlement": [
+            [ps.pier, _num(ps.settlement)] for ps in sim_params.pier_settlement
+        ],
+        "axial_delta_temp": temp(sim_params.axial_delta_temp),
+        "moment_delta_temp": temp(sim_params.moment_delta_temp),
+    }
+    # Only if set, so that keys of simulations on their own mesh are unchanged.
+    if len(sim_params.mesh_positions) > 0:
+        key["mesh_positions"] = [
+            [_num(x), _num(z)] for x, z in sim_params.mesh_positions
+        ]
+    return key
+
+
+def sim_key(c: Config, sim_params: "SimParams") -> Dict:
+    """Canonical description of everything determining a simulation's responses.
+
+    Args:
+        c: simulation configuration object.
+        sim_params: simulation parameters.
+
+    """
+    return {
+        "version": CACHE_VERSION,
+        "sim_runner": c.sim_runner.cache_name,
+        "bridge": bridge_key(c.bridge),
+        "sim_params": sim_params_key(sim_params),
+        "cte": _num(c.cte),
+        "pd_unit_load_kn": _num(c.pd_unit_load_kn),
+    }
+
+
+def sim_digest(c: Config, sim_params: "SimParams") -> str:
+    """Digest of 'sim_key', identifying a simulation's responses."""
+    key = json.dumps(sim_key(c=c, sim_params=sim_params), sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def cached_responses_path(
+    c: Config, sim_params: "SimParams", response_type: ResponseType
+) -> str:
+    """Content-addressed path of one response type of a simulation."""
+    digest = sim_digest(c=c, sim_params=sim_params)
+    # Not in a bridge-specific directory, so shared by all scenarios.
+    return c.get_path_in(
+        c.root_generated_data_dir(),
+        os.path.join("sim-cache", digest[:2]),
+        f"{digest}-{response_type.value}.npy",
+    )
+
+
+def write_metadata(c: Config, sim_params: "SimParams", path: str):
+    """Write the metadata sidecar of a responses file."""
+    metadata = {
+        "key": sim_key(c=c, sim_params=sim_params),
+        "bridge_id": c.bridge.id_str(),
+        "sim_params_id": sim_params.id_str(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+    }
+    with atomic_write(path + META_EXT) as f:
+        json.dump(metadata, f, indent=1, sort_keys=True)
+
+
+def adopt_legacy(c: Config, legacy_path: str, path: str, sim_params: "SimParams"):
+    """Move responses saved at a legacy path to their content-addressed path."""
+    print_i(f"Moving responses to content-addressed path: {legacy_path} -> {path}")
+    for ext in ["", MESH_EXT]:
+        if os.path.exists(legacy_path + ext):
+            os.replace(legacy_path + ext, path + ext)
+    write_metadata(c=c, sim_params=sim_params, path=path)
@@ -0,0 +1,80 @@
+"""Manifests recording which simulations of a batch have completed.
+
+A batch is identified by the (content-addressed) responses paths of its
+simulations. When a simulation completes, a line with the checksum of its
+responses file is appended to the batch's manifest. Appending one short line
+is atomic, so processes running simulations of the same batch can record
+completions concurrently, and a crash loses at most the line being written.
+
+When resuming a batch, simulations recorded in the manifest are skipped after
+only checking their checksums.
+
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Set, Tuple
+
+from bridge_sim.model import Config
+from bridge_sim.util import print_w
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 checksum of a file."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2 ** 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class Manifest:
+    """Manifest of completed simulations of one batch.
+
+    Args:
+        c: simulation configuration object.
+        paths: responses path of each simulation in the batch.
+
+    """
+
+    def __init__(self, c: Config, paths: List[str]):
+        self.root = c.root_generated_data_dir()
+        digest = hashlib.sha256("\n".join(sorted(paths)).encode()).hexdigest()
+        self.path = c.get_path_in(self.root, "manifests", f"{digest}.jsonl")
+
+    def _rel(self, path: str) -> str:
+        """Path relative to the generated data directory, for portability."""
+        return os.path.relpath(path, self.root)
+
+    def entries(self) -> Dict[str, str]:
+        """Checksum of each completed simulation's responses, by path."""
+        entries = dict()
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                # The last line may be partially written.
+                except json.JSONDecodeError:
+                    continue
+                entries[os.path.join(self.root, entry["path"])] = entry["sha256"]
+        return entries
+
+    def record(self, path: str):
+        """Record that the simulation with the given responses path completed."""
+        line = json.dumps({"path": self._rel(path), "sha256": file_sha256(path)})
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+
+    def verify(self) -> Tuple[Set[str], Set[str]]:
+        """Paths of completed simulations with valid and invalid checksums."""
+        valid, invalid = set(), set()
+        for path, sha256 in self.entries().items():
+            if os.path.exists(path) and file_sha256(path) == sha256:
+                valid.add(path)
+            else:
+                print_w(f"Checksum mismatch, will re-run simulation for {path}")
+                invalid.add(path)
+        return valid, invalid
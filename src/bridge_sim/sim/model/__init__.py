@@ -1,10 +1,9 @@
 """Classes for simulation parameters, mesh and simulation responses."""
 
 import itertools
-from collections import defaultdict
-from typing import Optional, NewType, Dict, List, Tuple, Callable
-
-import dill
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Optional, NewType, Dict, List, Tuple, Callable, Union
 
 import numpy as np
 from bridge_sim.model import (
@@ -17,10 +16,54 @@ from bridge_sim.model import (
     Bridge,
     Config,
 )
+from bridge_sim.sim.cache import write_metadata
+from bridge_sim.sim.store import mesh_digest, save_responses
 from bridge_sim.sim.util import _responses_path
-from bridge_sim.util import round_m, safe_str, resize_units, nearest_index, print_i
-from scipy.interpolate import griddata, interp1d, interp2d
-from scipy.spatial import distance
+from bridge_sim.util import (
+    round_m,
+    safe_str,
+    resize_units,
+    nearest_index,
+    nearest_indices,
+    print_i,
+)
+from scipy import sparse
+from scipy.interpolate import LinearNDInterpolator, interp1d, interp2d
+from scipy.spatial import Delaunay, cKDTree, distance
+
+# Triangulations of the deck of recently interpolated meshes, by digest of the
+# deck's points.
+_triangulations: Dict[str, Delaunay] = OrderedDict()
+_TRIANGULATIONS_SIZE = 8
+_triangulations_lock = threading.Lock()
+
+# Sampling operators of recently sampled meshes, by digest of the mesh, whether
+# interpolated, and the points sampled.
+_operators: Dict[Tuple[str, bool, bytes], "SamplingOperator"] = OrderedDict()
+_OPERATORS_SIZE = 32
+
+
+def deck_triangulation(xz: np.ndarray) -> Delaunay:
+    """Delaunay triangulation of positions on the deck, from cache if recent.
+
+    Responses of all simulations on one mesh share the triangulation, and only
+    differ in the values interpolated.
+
+    Args:
+        xz: array of shape (N, 2), x and z position of each point on the deck.
+
+    """
+    digest = mesh_digest(xz)
+    with _triangulations_lock:
+        if digest in _triangulations:
+            _triangulations.move_to_end(digest)
+            return _triangulations[digest]
+    triangulation = Delaunay(xz)
+    with _triangulations_lock:
+        _triangulations[digest] = triangulation
+        if len(_triangulations) > _TRIANGULATIONS_SIZE:
+            _triangulations.popitem(last=False)
+    return triangulation
 
 
 class Node:
@@ -327,6 +370,9 @@ class SimParams:
             displacement in meters is reached.
         axial_delta_temp: Optional[float], axial thermal loading in celcius.
         moment_delta_temp: Optional[float], moment thermal loading in celcius.
+        mesh_positions: List[Tuple[float, float]], (x, z) positions on the deck
+            of additional nodes of the mesh, e.g. the load positions of the
+            other simulations in a batch.
 
     """
 
@@ -336,11 +382,13 @@ class SimParams:
         pier_settlement: List[PierSettlement] = [],
         axial_delta_temp: Optional[float] = None,
         moment_delta_temp: Optional[float] = None,
+        mesh_positions: List[Tuple[float, float]] = [],
     ):
         self.ploads = ploads
         self.pier_settlement = pier_settlement
         self.axial_delta_temp = axial_delta_temp
         self.moment_delta_temp = moment_delta_temp
+        self.mesh_positions = mesh_positions
 
     def build_ctx(self) -> BuildContext:
         """Build context from these simulation parameters.
@@ -348,7 +396,18 @@ class SimParams:
         The build context only requires information on geometry.
 
         """
-        return BuildContext(add_loads=[pload.point() for pload in self.ploads])
+        return BuildContext(
+            add_loads=[pload.point() for pload in self.ploads]
+            + [Point(x=x, y=0, z=z) for x, z in self.mesh_positions]
+        )
+
+    def point_loads_only(self) -> bool:
+        """Whether point loads are the only loads in this simulation."""
+        return (
+            len(self.pier_settlement) == 0
+            and self.axial_delta_temp is None
+            and self.moment_delta_temp is None
+        )
 
     def id_str(self):
         """String representing the simulation parameters.
@@ -369,52 +428,135 @@ class SimParams:
             load_str += f"[{pl_str}]"
         if len(self.pier_settlement) > 0:
             load_str += ",".join(ps.id_str() for ps in self.pier_settlement)
+        if len(self.mesh_positions) > 0:
+            load_str += f"mesh-{mesh_digest(np.array(self.mesh_positions))[:8]}"
         return safe_str(load_str)
 
 
+# Response values and the (x, y, z) coordinates of each value, as an array of
+# N values and an array of shape (N, 3).
+ResponseArrays = NewType("ResponseArrays", Tuple[np.ndarray, np.ndarray])
+
+
 class Responses:
-    """Responses of one sensor type for one FE simulation."""
+    """Responses of one sensor type for one FE simulation.
+
+    Responses are stored in arrays: the coordinates of each response in
+    'points', an array of shape (N, 3) sorted by x, y and then z, and the value
+    of each response at each time in 'data', an array of shape (T, N). Nearest
+    and radius queries use a KD-tree of the points. The nested dictionaries of
+    earlier versions ('responses[time][x][y][z]', 'xs', 'ys', 'zs' and
+    'deck_xs') are available as read-only views built on first access.
+
+    Args:
+        response_type: the type of sensor response.
+        responses: a list of (value, Point) or a tuple of value and coordinate
+            arrays (see 'ResponseArrays'). If a position is repeated the last
+            value is kept.
+        build: build the index of responses by position now, else on first use.
+        units: units of the responses, defaults to the response type's units.
+
+    """
 
     def __init__(
         self,
         response_type: ResponseType,
-        responses: List["Response"],
+        responses: Union[List["Response"], ResponseArrays],
         build: bool = True,
         units: Optional[str] = None,
     ):
-        assert isinstance(responses, list)
-        if len(responses) == 0:
+        if isinstance(responses, tuple):
+            values, points = responses
+        else:
+            assert isinstance(responses, list)
+            if len(responses) == 0:
+                raise ValueError("No fem found")
+            assert isinstance(responses[0][1], Point)
+            values = np.array([r for r, _ in responses], dtype=np.float64)
+            points = np.array([[p.x, p.y, p.z] for _, p in responses], dtype=np.float64)
+        if len(values) == 0:
             raise ValueError("No fem found")
-        assert isinstance(responses[0][1], Point)
+        assert len(values) == len(points)
         self.response_type = response_type
         self.units = response_type.units() if units is None else units
-        self.raw_responses = responses
-        self.num_sensors = len(responses)
-        # Nested dictionaries for indexing fem by position.
-        self.responses = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        self.raw_values = values
+        self.raw_points = points
+        self.num_sensors = len(values)
+        self.times = [0]
+        self._indexed = False
         if build:
-            for response, p in responses:
-                self.responses[0][p.x][p.y][p.z] = response
             self.index()
 
     def index(self):
-        """Create attributes for fast indexing of times and positions."""
-        self.times = sorted(self.responses.keys())
-        points = self.responses[self.times[0]]
-        self.xs = sorted(points.keys())
-        self.ys = {x: sorted(points[x].keys()) for x in self.xs}
-        self.deck_xs = [x for x in self.xs if 0 in points[x].keys()]
-        self.zs = {
-            x: {y: sorted(points[x][y].keys()) for y in self.ys[x]} for x in self.xs
-        }
+        """Sort responses by position, and index the responses on the deck."""
+        points = np.asarray(self.raw_points, dtype=np.float64).reshape(-1, 3)
+        values = np.asarray(self.raw_values)
+        # Stable sort, so the last of repeated positions is last.
+        order = np.lexsort((points[:, 2], points[:, 1], points[:, 0]))
+        points, values = points[order], values[order]
+        last = np.ones(len(points), dtype=bool)
+        last[:-1] = np.any(points[1:] != points[:-1], axis=1)
+        self.points = points[last]
+        self.data = values[last][np.newaxis]
+        # Deck responses are sorted by x and then z, 'deck_starts' holds the
+        # index of the first deck response at each x position in 'deck_x'.
+        self.deck = np.flatnonzero(self.points[:, 1] == 0)
+        self.deck_x, starts = np.unique(self.points[self.deck, 0], return_index=True)
+        self.deck_starts = np.append(starts, len(self.deck))
+        self._tree = None
+        self._views = None
+        self._interpolator = None
+        self._indexed = True
+
+    def _index(self):
+        """Build the index of responses by position, if not built."""
+        if not self._indexed:
+            self.index()
+
+    def _set_values(self, values: np.ndarray):
+        """Replace the value of each response, at the first time."""
+        self._index()
+        self.data[0] = values
+        self._views = None
+        self._interpolator = None
+
+    @property
+    def tree(self) -> cKDTree:
+        """KD-tree of the position of each response."""
+        self._index()
+        if self._tree is None:
+            self._tree = cKDTree(self.points)
+        return self._tree
+
+    def _view(self, name: str):
+        """Nested dictionaries of responses by position, built on first access."""
+        self._index()
+        if self._views is None:
+            responses = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+            for value, (x, y, z) in zip(self.data[0].tolist(), self.points.tolist()):
+                responses[0][x][y][z] = value
+            points = responses[0]
+            xs = list(points.keys())
+            ys = {x: list(points[x].keys()) for x in xs}
+            self._views = dict(
+                responses=responses,
+                xs=xs,
+                ys=ys,
+                zs={x: {y: list(points[x][y].keys()) for y in ys[x]} for x in xs},
+                deck_xs=self.deck_x.tolist(),
+            )
+        return self._views[name]
+
+    responses = property(lambda self: self._view("responses"))
+    xs = property(lambda self: self._view("xs"))
+    ys = property(lambda self: self._view("ys"))
+    zs = property(lambda self: self._view("zs"))
+    deck_xs = property(lambda self: self._view("deck_xs"))
 
     def deck_points(self) -> List[Point]:
         """All the points on the deck where fem are collected."""
-        return [
-            Point(x=x, y=0, z=z)
-            for _, (x, y, z) in self.values(point=True)
-            if np.isclose(y, 0)
-        ]
+        self._index()
+        return [Point(x=x, y=0, z=z) for x, _, z in self.points[self.deck].tolist()]
 
     def add(self, values: List[float], points: List[Point]):
         """Add the values corresponding to given points.
@@ -423,23 +565,25 @@ class Responses:
 
         """
         assert len(values) == len(points)
-        for v, p in zip(values, points):
-            before = self.responses[0][p.x][p.y][p.z]
-            self.responses[0][p.x][p.y][p.z] += v
-            after = self.responses[0][p.x][p.y][p.z]
-            # print(before, after)
+        xyz = np.array([[p.x, p.y, p.z] for p in points], dtype=np.float64)
+        distances, indices = self.tree.query(xyz.reshape(-1, 3))
+        if np.any(distances != 0):
+            raise KeyError(f"No fem at {points[np.flatnonzero(distances)[0]]}")
+        result = self.data[0].copy()
+        np.add.at(result, indices, np.asarray(values, dtype=np.float64))
+        self._set_values(result)
         return self
 
     def map(self, f, xyz: bool = False):
         """Map a function over the values of fem."""
-        time = self.times[0]
-        for x, y_dict in self.responses[time].items():
-            for y, z_dict in y_dict.items():
-                for z, response in z_dict.items():
-                    if xyz:
-                        self.responses[time][x][y][z] = f(response, x, y, z)
-                    else:
-                        self.responses[time][x][y][z] = f(response)
+        self._index()
+        values = self.data[0].tolist()
+        if xyz:
+            points = self.points.tolist()
+            values = [f(v, x, y, z) for v, (x, y, z) in zip(values, points)]
+        else:
+            values = [f(v) for v in values]
+        self._set_values(values)
         return self
 
     def resize(self):
@@ -452,18 +596,33 @@ class Responses:
         return responses
 
     def without(self, remove: Callable[[Point], bool]) -> "Responses":
-        responses = []
-        for x, y_dict in self.responses[self.times[0]].items():
-            for y, z_dict in y_dict.items():
-                for z, response in z_dict.items():
-                    p = Point(x=x, y=y, z=z)
-                    if not remove(p):
-                        responses.append((response, p))
-                    # if abs(p.distance(of)) > radius:
+        self._index()
+        keep = np.array(
+            [not remove(Point(x=x, y=y, z=z)) for x, y, z in self.points.tolist()],
+            dtype=bool,
+        )
         return Responses(
-            response_type=self.response_type, responses=responses, units=self.units
+            response_type=self.response_type,
+            responses=(self.data[0][keep], self.points[keep]),
+            units=self.units,
         )
 
+    def within(self, point: Point, radius: float) -> "Responses":
+        """The responses at most a distance 'radius' from a point."""
+        indices = self.tree.query_ball_point([point.x, point.y, point.z], radius)
+        indices = np.sort(np.asarray(indices, dtype=np.int64))
+        return Responses(
+            response_type=self.response_type,
+            responses=(self.data[0][indices], self.points[indices]),
+            units=self.units,
+        )
+
+    def nearest(self, points: List[Point]) -> np.ndarray:
+        """The response nearest to each point, in three dimensions."""
+        xyz = np.array([[p.x, p.y, p.z] for p in points], dtype=np.float64)
+        _, indices = self.tree.query(xyz.reshape(-1, 3))
+        return self.data[0][indices]
+
     def to_stress(self, bridge: Bridge):
         """Convert strains to stresses."""
         if self.response_type == ResponseType.Strain:
@@ -475,8 +634,8 @@ class Responses:
         else:
             raise ValueError(f"Responses must be strain fem")
         if len(bridge.sections) == 1:
-            youngs = bridge.sections[0].youngs
-            self.map(lambda r: r * youngs)
+            self._index()
+            self._set_values(self.data[0] * bridge.sections[0].youngs)
         else:
 
             def _map(r, x, y, z):
@@ -488,14 +647,11 @@ class Responses:
 
     def values(self, point: bool = False):
         """Yield each response value."""
-        time = self.times[0]
-        for x, y_dict in self.responses[time].items():
-            for y, z_dict in y_dict.items():
-                for z, response in z_dict.items():
-                    if point:
-                        yield response, (x, y, z)
-                    else:
-                        yield response
+        self._index()
+        if point:
+            yield from zip(self.data[0].tolist(), map(tuple, self.points.tolist()))
+        else:
+            yield from self.data[0].tolist()
 
     def at_shells(self, shells: List["Shell"]) -> "Responses":
         responses = []
@@ -523,36 +679,28 @@ class Responses:
         NOTE: Interpolation cannot exptrapolate to points outside known data.
 
         """
-        self._at_deck_interp(0, 0)  # Ensure the grid of points is calculated.
-        xzs = np.array([[point.x, point.z] for point in points])
-        points, values = self.griddata
-        return griddata(points, values, xzs)
-        # result = self.grid_interp2d(xzs[0].flatten(), xzs[1].flatten())[0]
-        # return result
+        xzs = np.array([[point.x, point.z] for point in points]).reshape(-1, 2)
+        return self.interpolator()(xzs)
+
+    def interpolator(self) -> LinearNDInterpolator:
+        """Linear interpolator of the deck responses, of x and z position.
+
+        The triangulation of the deck is shared by all responses on the same
+        mesh, see 'deck_triangulation'.
+
+        """
+        if self._interpolator is None:
+            self._index()
+            self._interpolator = LinearNDInterpolator(
+                deck_triangulation(self.points[self.deck][:, [0, 2]]),
+                self.data[0][self.deck],
+            )
+        return self._interpolator
 
     def _at_deck_interp(self, x: float, z: float, grid_interp=True):
-        # Assign to new variables, so they are not overwritten in loop.
-        _x, _z = x, z
-        # Determine grid of point and values for interpolation.
-        if not hasattr(self, "griddata"):
-            points = []
-            values = []
-            # For each x on the deck..
-            for x in self.deck_xs:
-                # for each z, for that x, determine value.
-                for z in self.zs[x][0]:
-                    points.append([x, z])
-                    values.append(self.responses[0][x][0][z])
-            self.griddata = np.array(points), np.array(values)
-            # points = self.griddata[0].T
-            # self.grid_interp2d = interp2d(points[0], points[1], values)
         # If grid interpolation selected then perform it.
         if grid_interp:
-            points, values = self.griddata
-            result = griddata(points, values, [[_x, _z]])[0]
-            # result = self.grid_interp2d([_x], [_z])[0]
-            # print(f"x = {_x}, z = {_z}, result = {result}")
-            return result
+            return self.interpolator()([[x, z]])[0]
         # Else (old method), needs update.
         assert False
         # _x, _z = x, z
@@ -618,12 +766,110 @@ class Responses:
 
     def _at_deck_snap(self, x: float, z: float):
         """Deck response from nearest available sensor."""
-        y = 0
-        x_ind = nearest_index(self.deck_xs, x)
-        x_near = self.deck_xs[x_ind]
-        z_ind = nearest_index(self.zs[x_near][y], z)
-        z_near = self.zs[x_near][y][z_ind]
-        return self.responses[0][x_near][y][z_near]
+        self._index()
+        x_ind = nearest_index(self.deck_x, x)
+        at_x = self.deck[self.deck_starts[x_ind] : self.deck_starts[x_ind + 1]]
+        z_ind = nearest_index(self.points[at_x, 2], z)
+        return self.data[0][at_x[z_ind]]
+
+    def sampling_operator(
+        self, points: List[Point], interp: bool
+    ) -> "SamplingOperator":
+        """Operator sampling the deck at points, from cache if recent.
+
+        The operator applies to the responses of any simulation on the same
+        mesh, see 'SamplingOperator'.
+
+        """
+        self._index()
+        xz = np.array([[p.x, p.z] for p in points], dtype=np.float64).reshape(-1, 2)
+        key = (mesh_digest(self.points), interp, xz.tobytes())
+        with _triangulations_lock:
+            if key in _operators:
+                _operators.move_to_end(key)
+                return _operators[key]
+        operator = SamplingOperator(responses=self, xz=xz, interp=interp)
+        with _triangulations_lock:
+            _operators[key] = operator
+            if len(_operators) > _OPERATORS_SIZE:
+                _operators.popitem(last=False)
+        return operator
+
+
+class SamplingOperator:
+    """Linear map from all responses on a mesh to responses at points on the deck.
+
+    Sampling the same points of many simulations on one mesh, the nearest
+    response or the interpolation weights of each point are found once. Then
+    sampling is a sparse matrix product, of the values of all simulations at
+    once. Results are the same as 'Responses.at_deck' without interpolation,
+    or 'Responses.at_decks' with interpolation.
+
+    Args:
+        responses: responses on the mesh, only the positions are used.
+        xz: array of shape (P, 2), x and z position of each point on the deck.
+        interp: interpolate linearly, else the nearest response to each point.
+
+    Attrs:
+        points: array of shape (N, 3), position of each response on the mesh.
+        matrix: sparse matrix of shape (P, N). Rows of points that cannot be
+            interpolated, being outside the deck, are NaN.
+
+    """
+
+    def __init__(self, responses: Responses, xz: np.ndarray, interp: bool):
+        responses._index()
+        self.points = responses.points
+        deck = responses.deck
+        n_points = len(xz)
+        if interp:
+            triangulation = deck_triangulation(self.points[deck][:, [0, 2]])
+            simplex = triangulation.find_simplex(xz)
+            transform = triangulation.transform[simplex]
+            b = np.einsum("ijk,ik->ij", transform[:, :2], xz - transform[:, 2])
+            weights = np.column_stack([b, 1 - b.sum(axis=1)])
+            columns = deck[triangulation.simplices[simplex]]
+            weights[simplex == -1] = np.nan
+        else:
+            x_inds = nearest_indices(responses.deck_x, xz[:, 0])
+            columns = np.empty(n_points, dtype=np.int64)
+            for x_ind in np.unique(x_inds):
+                start, end = responses.deck_starts[x_ind : x_ind + 2]
+                at_x = deck[start:end]
+                mask = x_inds == x_ind
+                columns[mask] = at_x[nearest_indices(self.points[at_x, 2], xz[mask, 1])]
+            columns = columns[:, np.newaxis]
+            weights = np.ones(columns.shape)
+        rows = np.repeat(np.arange(n_points), columns.shape[1])
+        self.matrix = sparse.csr_matrix(
+            (weights.reshape(-1), (rows, columns.reshape(-1))),
+            shape=(n_points, len(self.points)),
+        )
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        """Sample an array of shape (N,) or (S, N), of one or more simulations.
+
+        Returns:
+            An array of shape (P,) or (S, P).
+
+        """
+        return (self.matrix @ np.asarray(values).T).T
+
+    def sample(self, many_responses: List[Responses]) -> np.ndarray:
+        """Sample the responses of many simulations, on the same mesh.
+
+        Returns:
+            An array of shape (S, P), the response of each simulation at each
+            point.
+
+        """
+        values = np.empty((len(many_responses), len(self.points)))
+        for i, responses in enumerate(many_responses):
+            responses._index()
+            if not np.array_equal(responses.points, self.points):
+                raise ValueError("Responses are not on the mesh of the operator")
+            values[i] = responses.data[0]
+        return self(values)
 
 
 class SimResponses(Responses):
@@ -635,7 +881,7 @@ class SimResponses(Responses):
         sim_params: SimParams,
         sim_runner: "FEMRunner",
         response_type: ResponseType,
-        responses: List["Response"],
+        responses: Union[List["Response"], ResponseArrays],
         build: bool = True,
     ):
         self.c = c
@@ -650,11 +896,10 @@ class SimResponses(Responses):
             sim_params=self.sim_params,
             response_type=self.response_type,
         )
-        try:
-            with open(path, "wb") as f:
-                dill.dump(self.raw_responses, f)
-        except:
-            print("Could not save raw responses", flush=True)
+        write_metadata(c=self.c, sim_params=self.sim_params, path=path)
+        save_responses(
+            c=self.c, path=path, values=self.raw_values, points=self.raw_points
+        )
 
 
 def bridge_3d_nodes(deck_nodes: DeckNodes, all_support_nodes: PierNodes) -> List[Node]:
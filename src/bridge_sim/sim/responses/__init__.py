@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 # Print debug information for this file.
+import itertools
 import os
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from typing import Callable, List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 from bridge_sim.model import (
@@ -21,14 +23,16 @@ from bridge_sim.model import (
 from bridge_sim.scenarios import (
     PierSettlementScenario,
     Scenario,
+    CrackedScenario,
     HealthyScenario,
     transverse_crack,
     healthy_damage_w_crack_nodes,
 )
 from bridge_sim.sim.model import SimParams, ManyResponses, Responses
 from bridge_sim.sim.run import FEMRunner, load_expt_responses, load_fem_responses
-from bridge_sim.sim.run.opensees import OSRunner
+from bridge_sim.sim.store import ColumnStore
 from bridge_sim.util import (
+    atomic_write,
     print_i,
     print_w,
     flatten,
@@ -49,46 +53,267 @@ def responses_to_traffic_array(
     response_type: ResponseType,
     damage_scenario: "Scenario",
     points: List[Point],
-    sim_runner: Callable[[Config], FEMRunner] = OSRunner,
+    sim_runner: Optional[Callable[[Config], FEMRunner]] = None,
+    dynamic: bool = False,
 ):
     """The magic function.
 
     Args:
         c: Config, global configuration object.
-        traffic_array: TrafficArray, ....
+        traffic_array: TrafficArray, loads on the bridge at each time step, a
+            dense array or a sparse matrix.
         damage_scenario: DamageScenario, the scenarios scenario of the bridge.
         response_type: ResponseType, the type of sensor response to calculate.
         points: List[Point], points on the bridge to calculate fem at.
-        sim_runner: Callable[[Config], FEMRunner], the FEM program to run
-            simulations with.
+        sim_runner: Optional[Callable[[Config], FEMRunner]], the FEM program to
+            run simulations with, by default that of the given Config.
+        dynamic: bool, dynamic responses by modal superposition, instead of
+            static responses by the unit load matrix. The FEM program must
+            support it, see 'FEMRunner.has_dynamic_responses'.
 
     """
+    if sim_runner is None:
+        sim_runner = c._sim_runner
+    healthy_sim_runner = sim_runner(c)
+    if dynamic:
+        if not healthy_sim_runner.has_dynamic_responses():
+            raise ValueError(
+                f"{healthy_sim_runner.name} does not compute dynamic responses"
+            )
+        if isinstance(damage_scenario, CrackedScenario):
+            dynamic_damage = damage_scenario
+        elif isinstance(damage_scenario, (HealthyScenario, PierSettlementScenario)):
+            dynamic_damage = None
+        else:
+            raise ValueError(
+                f"Dynamic responses not supported for {damage_scenario.name}"
+            )
+        responses = healthy_sim_runner.dynamic_responses(
+            traffic_array=traffic_array,
+            response_type=response_type,
+            points=points,
+            damage_scenario=dynamic_damage,
+        )
+    else:
+        unit_load_matrix = _unit_load_matrix(
+            c=c,
+            response_type=response_type,
+            damage_scenario=damage_scenario,
+            points=points,
+            sim_runner=sim_runner,
+        )
+        print(traffic_array.shape)
+        print(unit_load_matrix.shape)
+        # Sparse or dense, the result is a dense array.
+        responses = traffic_array @ unit_load_matrix
+
+    return responses + _pier_settlement_responses(
+        c=c,
+        response_type=response_type,
+        damage_scenario=damage_scenario,
+        points=points,
+        sim_runner=sim_runner,
+    )
+
+
+def _unit_load_matrix(
+    c: Config,
+    response_type: ResponseType,
+    damage_scenario: "Scenario",
+    points: List[Point],
+    sim_runner: Callable[[Config], FEMRunner],
+) -> np.ndarray:
+    """Unit load matrix of the bridge in a damage scenario."""
+    healthy_sim_runner = sim_runner(c)
+    if (
+        isinstance(damage_scenario, CrackedScenario)
+        and healthy_sim_runner.has_unit_load_matrix()
+    ):
+        # Cracked bridge as a low-rank update of the healthy bridge.
+        return ULResponses.load_ulm(
+            c=c,
+            response_type=response_type,
+            points=points,
+            sim_runner=healthy_sim_runner,
+            damage_scenario=damage_scenario,
+        )
     use_c = damage_scenario.use(c)[0]
-    unit_load_matrix = ULResponses.load_ulm(
+    return ULResponses.load_ulm(
         c=use_c,
         response_type=response_type,
         points=points,
         sim_runner=sim_runner(use_c),
     )
-    print(traffic_array.shape)
-    print(unit_load_matrix.shape)
-    responses = np.matmul(traffic_array, unit_load_matrix)
 
-    # Calculate the response at each point due to pier settlement.
-    pd_responses = np.zeros(responses.shape).T
-    assert len(pd_responses) == len(points)
+
+def _pier_settlement_responses(
+    c: Config,
+    response_type: ResponseType,
+    damage_scenario: "Scenario",
+    points: List[Point],
+    sim_runner: Callable[[Config], FEMRunner],
+) -> np.ndarray:
+    """Response at each point due to pier settlement, if any."""
+    pd_responses = np.zeros(len(points))
     if isinstance(damage_scenario, PierSettlementScenario):
         pd_expt = list(
             PSResponses.load(c=c, response_type=response_type, fem_runner=sim_runner(c))
         )
-        for point_i, point in enumerate(points):
-            for pier_displacement in damage_scenario.pier_disps:
-                pd_sim_responses = pd_expt[pier_displacement.pier]
-                pd_responses[point_i] += pd_sim_responses.at_deck(
-                    point, interp=False
-                ) * (pier_displacement.displacement / c.pd_unit_disp)
+        for pier_displacement in damage_scenario.pier_disps:
+            pd_sim_responses = pd_expt[pier_displacement.pier]
+            operator = pd_sim_responses.sampling_operator(points, interp=False)
+            pd_responses += operator.sample([pd_sim_responses])[0] * (
+                pier_displacement.displacement / c.pd_unit_disp
+            )
+    return pd_responses
+
+
+def responses_to_traffic_blocks(
+    c: Config,
+    traffic_array: Union["TrafficArray", Iterable["TrafficArray"]],
+    response_type: ResponseType,
+    damage_scenario: "Scenario",
+    points: List[Point],
+    sim_runner: Optional[Callable[[Config], FEMRunner]] = None,
+    thermal: Optional[np.ndarray] = None,
+) -> Iterator[np.ndarray]:
+    """Like 'responses_to_traffic_array', one block of time steps at a time.
+
+    The traffic array is read 'Config.traffic_block_size' time steps at a
+    time, and 'Config.traffic_threads' blocks are computed at once by a pool
+    of threads. So peak memory is set by the block size, not the length of the
+    traffic. Only static responses are supported.
+
+    Args:
+        c: Config, global configuration object.
+        traffic_array: a 'TrafficArray', dense (e.g. a memory-mapped '.npy'
+            file) or sparse, or an iterable of consecutive blocks of time steps
+            of a 'TrafficArray' (e.g. generated on the fly).
+        response_type: ResponseType, the type of sensor response to calculate.
+        damage_scenario: DamageScenario, the scenarios scenario of the bridge.
+        points: List[Point], points on the bridge to calculate fem at.
+        sim_runner: Optional[Callable[[Config], FEMRunner]], the FEM program to
+            run simulations with, by default that of the given Config.
+        thermal: Optional[np.ndarray], responses added to the responses to
+            traffic, of shape (time steps, len(points)), e.g. the transposed
+            temperature effect of 'temperature.effect'. May be memory-mapped.
+
+    Yields:
+        Arrays of shape (B, len(points)), the responses at consecutive blocks
+        of B time steps.
+
+    """
+    if sim_runner is None:
+        sim_runner = c._sim_runner
+    if hasattr(traffic_array, "shape"):
+        if thermal is not None and len(thermal) != traffic_array.shape[0]:
+            raise ValueError(
+                f"{len(thermal)} thermal responses for {traffic_array.shape[0]}"
+                + " time steps of traffic"
+            )
+        blocks = (
+            traffic_array[start : start + c.traffic_block_size]
+            for start in range(0, traffic_array.shape[0], c.traffic_block_size)
+        )
+    else:
+        blocks = iter(traffic_array)
+    unit_load_matrix = _unit_load_matrix(
+        c=c,
+        response_type=response_type,
+        damage_scenario=damage_scenario,
+        points=points,
+        sim_runner=sim_runner,
+    )
+    pd_responses = _pier_settlement_responses(
+        c=c,
+        response_type=response_type,
+        damage_scenario=damage_scenario,
+        points=points,
+        sim_runner=sim_runner,
+    )
+
+    def block_responses(start: int, block: "TrafficArray") -> np.ndarray:
+        # Reading a memory-mapped block and the product both release the GIL.
+        result = np.asarray(block @ unit_load_matrix)
+        result += pd_responses
+        if thermal is not None:
+            block_thermal = thermal[start : start + len(result)]
+            if len(block_thermal) != len(result):
+                raise ValueError(f"No thermal responses at time step {start}")
+            result += block_thermal
+        return result
+
+    with ThreadPoolExecutor(max_workers=c.traffic_threads) as pool:
+        # At most 'traffic_threads' blocks pending, yielded in order.
+        pending, start = deque(), 0
+        for block in blocks:
+            pending.append(pool.submit(block_responses, start, block))
+            start += block.shape[0]
+            if len(pending) >= c.traffic_threads:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+
+def save_responses_to_traffic(
+    path: str,
+    c: Config,
+    traffic_array: Union["TrafficArray", Iterable["TrafficArray"]],
+    response_type: ResponseType,
+    damage_scenario: "Scenario",
+    points: List[Point],
+    sim_runner: Optional[Callable[[Config], FEMRunner]] = None,
+    thermal: Optional[np.ndarray] = None,
+    time_steps: Optional[int] = None,
+) -> np.ndarray:
+    """Save responses to traffic to a '.npy' file, one block at a time.
+
+    See 'responses_to_traffic_blocks' for the arguments. The file is written
+    through a memory-map, and replaces 'path' once complete.
+
+    Args:
+        path: str, path of the '.npy' file to write.
+        time_steps: Optional[int], amount of time steps of traffic, required
+            if 'traffic_array' is an iterable of blocks.
 
-    return responses + pd_responses.T
+    Returns:
+        The responses, memory-mapped read-only, of shape (time steps,
+        len(points)).
+
+    """
+    if time_steps is None:
+        if not hasattr(traffic_array, "shape"):
+            raise ValueError("Amount of time steps required for blocks of traffic")
+        time_steps = traffic_array.shape[0]
+    tmp_path = f"{path}.tmp-{os.getpid()}.npy"
+    try:
+        result = np.lib.format.open_memmap(
+            tmp_path, mode="w+", shape=(time_steps, len(points))
+        )
+        start = 0
+        for block in responses_to_traffic_blocks(
+            c=c,
+            traffic_array=traffic_array,
+            response_type=response_type,
+            damage_scenario=damage_scenario,
+            points=points,
+            sim_runner=sim_runner,
+            thermal=thermal,
+        ):
+            if start + len(block) > time_steps:
+                raise ValueError(f"More than {time_steps} time steps of traffic")
+            result[start : start + len(block)] = block
+            start += len(block)
+        if start != time_steps:
+            raise ValueError(f"{start} time steps of traffic, not {time_steps}")
+        result.flush()
+        del result
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print_i(f"Saved responses to {time_steps} time steps of traffic to {path}")
+    return np.load(path, mmap_mode="r")
 
 
 def responses_to_loads_d(
@@ -109,7 +334,8 @@ def responses_to_loads_d(
     )
     result = []
     for sim_responses in expt_responses:
-        result.append([sim_responses.at_deck(point, interp=True) for point in points])
+        operator = sim_responses.sampling_operator(points, interp=True)
+        result.append(operator.sample([sim_responses])[0])
         print_i("Interpolating fem in responses_from_load_d")
     return np.array(result)
 
@@ -201,7 +427,9 @@ class PSResponses(ManyResponses):
 
         # Determine experiment simulation parameters.
         expt_params = [
-            SimParams(displacement_ctrl=PierSettlement(c.pd_unit_disp, i))
+            SimParams(
+                pier_settlement=[PierSettlement(pier=i, settlement=c.pd_unit_disp)]
+            )
             for i in range(len(c.bridge.supports))
         ]
 
@@ -262,9 +490,13 @@ class ULResponses(ManyResponses):
         wheel_zs: List[float],
     ):
         wheel_zs_str = [round_m(wheel_z) for wheel_z in wheel_zs]
+        # Batched simulations are on the mesh of their batch.
+        batch_str = ""
+        if sim_runner.batch_size() > 1:
+            batch_str = f"-batch={sim_runner.batch_size()}"
         return (
-            f"il-{response_type.name()}-{sim_runner.name}-{c.il_unit_load_kn}"
-            + f"-{c.il_num_loads}-z={wheel_zs_str}"
+            f"il-{response_type.name()}-{sim_runner.cache_name}-{c.il_unit_load_kn}"
+            + f"-{c.il_num_loads}-z={wheel_zs_str}{batch_str}"
         )
 
     @staticmethod
@@ -273,26 +505,94 @@ class ULResponses(ManyResponses):
         response_type: ResponseType,
         points: List[Point],
         sim_runner: FEMRunner,
+        damage_scenario: Optional[CrackedScenario] = None,
     ):
+        """Response at each point to a 1 kN load at each wheel track position.
+
+        Each point's column of the matrix is saved in a 'ColumnStore', so only
+        the columns of points not requested before are calculated.
+
+        Args:
+            c: Config, global configuration object.
+            response_type: ResponseType, the type of sensor response.
+            points: List[Point], points on the deck to calculate responses at.
+            sim_runner: FEMRunner, the FE program to run simulations with.
+            damage_scenario: Optional[CrackedScenario], a crack of the bridge
+                given by 'c'. Requires a 'sim_runner' that computes unit load
+                matrices, which computes the cracked unit load matrix from the
+                healthy bridge.
+
+        """
+        use_c = c if damage_scenario is None else damage_scenario.use(c)[0]
+        if damage_scenario is not None and not sim_runner.has_unit_load_matrix():
+            raise ValueError(f"{sim_runner.name} does not update unit load matrices")
         wheel_zs = c.bridge.wheel_track_zs(c)
-        filepath = c.get_data_path(
-            "ulms",
-            (
-                ULResponses.id_str(
+        id_str = ULResponses.id_str(
+            c=use_c,
+            response_type=response_type,
+            sim_runner=sim_runner,
+            wheel_zs=wheel_zs,
+        )
+        # One column per point, shared by requests for any points.
+        store = ColumnStore(
+            shorten_path(
+                c=c,
+                bypass_config=True,
+                filepath=use_c.get_data_path("ulms", id_str + ".columns"),
+            )
+        )
+        xyz = np.array([[p.x, p.y, p.z] for p in points], dtype=np.float64)
+        missing = store.missing(xyz)
+        if np.any(missing):
+            # Import a unit load matrix saved before the column store.
+            legacy_path = use_c.get_data_path(
+                "ulms", id_str + str([str(point) for point in points]) + ".ulm"
+            )
+            legacy_path = shorten_path(c=c, bypass_config=True, filepath=legacy_path)
+            if os.path.exists(legacy_path):
+                with open(legacy_path, "rb") as f:
+                    store.append(xyz, np.load(f))
+                missing[:] = False
+        if np.any(missing):
+            # Each missing point once.
+            _, first = np.unique(round_m(xyz[missing]), axis=0, return_index=True)
+            new_points = [points[i] for i in np.flatnonzero(missing)[np.sort(first)]]
+            print_i(
+                f"Unit load matrix: {len(new_points)} of {len(points)} points"
+                + " not saved"
+            )
+            store.append(
+                [[p.x, p.y, p.z] for p in new_points],
+                ULResponses._calc_ulm(
                     c=c,
                     response_type=response_type,
+                    points=new_points,
                     sim_runner=sim_runner,
-                    wheel_zs=wheel_zs,
-                )
-                + str([str(point) for point in points])
+                    damage_scenario=damage_scenario,
+                ),
             )
-            + ".ulm",
-        )
-        filepath = shorten_path(c=c, bypass_config=True, filepath=filepath)
+        return store.gather(xyz)
+
+    @staticmethod
+    def _calc_ulm(
+        c: Config,
+        response_type: ResponseType,
+        points: List[Point],
+        sim_runner: FEMRunner,
+        damage_scenario: Optional[CrackedScenario],
+    ):
+        """Calculate the unit load matrix of 'load_ulm', without saving."""
+        wheel_zs = c.bridge.wheel_track_zs(c)
 
-        if os.path.exists(filepath):
-            with open(filepath, "rb") as f:
-                return np.load(f)
+        # Computed directly, the result is already the response to 1 kN.
+        if sim_runner.has_unit_load_matrix():
+            print_i(f"Calculating unit load matrix with {sim_runner.name}...")
+            return sim_runner.unit_load_matrix(
+                response_type=response_type,
+                points=points,
+                wheel_zs=wheel_zs,
+                damage_scenario=damage_scenario,
+            )
 
         def ulm_partial(wheel_z):
             """Slice of unit load matrix for one wheel track."""
@@ -303,18 +603,12 @@ class ULResponses(ManyResponses):
                 load_z_frac=c.bridge.z_frac(wheel_z),
                 run_only=False,
             )
-            partial = np.empty((c.il_num_loads, len(points)))
-            i = 0
-            for sim_responses in wheel_track:
-                for j, point in enumerate(points):
-                    partial[i][j] = sim_responses.at_deck(point, interp=False)
-                    if wheel_z < 0 and i == 302:
-                        log(
-                            c,
-                            f"z = {wheel_z}, i = 302, partial[i][j] = {partial[i][j]}",
-                        )
-                i += 1
-            assert i == c.il_num_loads
+            partial = ULResponses.sample_wheel_track(
+                c=c, wheel_track=wheel_track, points=points
+            )
+            if wheel_z < 0 and c.il_num_loads > 302:
+                for j in range(len(points)):
+                    log(c, f"z = {wheel_z}, i = 302, partial[i][j] = {partial[302][j]}")
             print_i(f"Calculated unit load matrix for wheel track {wheel_z}")
             return partial
 
@@ -331,10 +625,68 @@ class ULResponses(ManyResponses):
             ]
         # Divide by unit load, so the value at a cell is the response to 1 kN.
         unit_load_matrix /= c.il_unit_load_kn
-        with open(filepath, "wb") as f:
-            np.save(f, unit_load_matrix)
         return unit_load_matrix
 
+    @staticmethod
+    def sample_wheel_track(
+        c: Config, wheel_track: Iterable[Responses], points: List[Point]
+    ) -> np.ndarray:
+        """Response at each point of each simulation of a wheel track.
+
+        Simulations are sampled by the operator of their mesh (see
+        'Responses.sampling_operator'). Consecutive simulations on the same
+        mesh are sampled together, up to 'Config.ulm_block_size' at once.
+
+        Returns:
+            An array of shape (Config.il_num_loads, len(points)).
+
+        """
+        result = np.empty((c.il_num_loads, len(points)))
+        i, block, block_operator = 0, [], None
+        for sim_responses in itertools.chain(wheel_track, [None]):
+            operator = None
+            if sim_responses is not None:
+                operator = sim_responses.sampling_operator(points, interp=False)
+            if len(block) > 0 and (
+                operator is not block_operator or len(block) == c.ulm_block_size
+            ):
+                result[i : i + len(block)] = block_operator.sample(block)
+                i, block = i + len(block), []
+            if sim_responses is not None:
+                block.append(sim_responses)
+                block_operator = operator
+        assert i == c.il_num_loads
+        return result
+
+    @staticmethod
+    def load_surrogate(
+        c: Config,
+        response_type: ResponseType,
+        points: List[Point],
+        sim_runner: FEMRunner,
+    ):
+        """Reduced-order model of the bridge, for fast unit load matrices.
+
+        The surrogate's 'unit_load_matrix' is as 'load_ulm' but for given
+        scales of the stiffness of groups of the bridge's elements, and its
+        'error_bound' bounds the error against the full model.
+
+        Args:
+            c: Config, global configuration object.
+            response_type: ResponseType, the type of sensor response.
+            points: List[Point], points on the deck to calculate responses at.
+            sim_runner: FEMRunner, the FE program to build the surrogate with.
+
+        """
+        if not sim_runner.has_surrogate():
+            raise ValueError(f"{sim_runner.name} does not build surrogates")
+        print_i(f"Loading surrogate with {sim_runner.name}...")
+        return sim_runner.surrogate(
+            response_type=response_type,
+            points=points,
+            wheel_zs=c.bridge.wheel_track_zs(c),
+        )
+
     @staticmethod
     def load_wheel_tracks(
         c: Config,
@@ -342,12 +694,15 @@ class ULResponses(ManyResponses):
         sim_runner: FEMRunner,
         wheel_zs: List[float],
         run_only: bool = False,
+        resume: bool = False,
     ):
         """Return a dictionary of wheel tracks indexed by z position.
 
         Each wheel track will be calculated in parallel if the
         'Config.parallel_ulm' is set. If the 'run_only' option is given, then
         the simulations will run but the results will not be loaded into memory.
+        If the 'resume' option is given, then completed simulations are only
+        verified by checksum (see 'load_expt_responses').
 
         """
 
@@ -365,6 +720,7 @@ class ULResponses(ManyResponses):
                 run_only=_run_only,
                 left_only=left_only,
                 right_only=right_only,
+                resume=resume and _run_only,
             )
             # If results are only being generated, then evaluate the generator,
             # such that the results are generated. Otherwise leave the generator
@@ -419,6 +775,7 @@ class ULResponses(ManyResponses):
         indices: Optional[List[int]] = None,
         left_only: bool = False,
         right_only: bool = False,
+        resume: bool = False,
     ) -> List[Responses]:
         """Load a wheel track from disk, running simulations if necessary.
 
@@ -435,6 +792,8 @@ class ULResponses(ManyResponses):
                 track. If true, right_only must be false and indices None.
             right_only: bool, if True only run the right-hand-side of the wheel
                 track. If true, left_only must be false and indices None.
+            resume: bool, verify completed simulations by checksum, re-running
+                any with an invalid checksum.
 
         """
         wheel_xs = c.bridge.wheel_track_xs(c)
@@ -455,27 +814,20 @@ class ULResponses(ManyResponses):
         expt_params = [
             SimParams(
                 ploads=[
-                    PointLoad(
-                        x_frac=c.bridge.x_frac(x),
-                        z_frac=load_z_frac,
-                        kn=c.il_unit_load_kn,
-                    )
+                    PointLoad(x=x, z=c.bridge.z(load_z_frac), load=c.il_unit_load_kn,)
                 ],
-                clean_build=True,
             )
             for x in wheel_xs
         ]
         # Filter simulations, only running those in 'indices'.
         if indices is not None:
-            expt_params.sim_params = [
-                sp for i, sp in enumerate(expt_params.sim_params) if i in indices
-            ]
+            expt_params = [sp for i, sp in enumerate(expt_params) if i in indices]
         return load_expt_responses(
             c=c,
             expt_params=expt_params,
             response_type=response_type,
-            sim_runner=fem_runner,
             run_only=run_only,
+            resume=resume,
         )
 
 
@@ -486,8 +838,14 @@ def run_uls(
     cracked: bool,
     crack_x: Optional[int] = None,
     crack_length: Optional[int] = None,
+    resume: bool = False,
 ):
-    """Run all unit load simulations."""
+    """Run all unit load simulations.
+
+    If 'resume' is True, simulations recorded as completed by an earlier,
+    interrupted run are skipped after checking their checksums.
+
+    """
 
     def crack_f():
         return transverse_crack(at_x=crack_x, length=crack_length)
@@ -499,16 +857,21 @@ def run_uls(
     response_type = ResponseType.YTranslation
     if piers:
         # Pier settlement.
-        list(PSResponses.load(c=c, response_type=response_type, fem_runner=OSRunner(c)))
+        list(
+            PSResponses.load(
+                c=c, response_type=response_type, fem_runner=c._sim_runner(c)
+            )
+        )
     if healthy:
         c = healthy_damage_w_crack_nodes(crack_f=crack_f).use(c)[0]
         # Unit load simulations (healthy bridge).
         ULResponses.load_wheel_tracks(
             c=c,
             response_type=response_type,
-            sim_runner=OSRunner(c),
+            sim_runner=c._sim_runner(c),
             wheel_zs=c.bridge.wheel_track_zs(c),
             run_only=True,
+            resume=resume,
         )
     elif cracked:
         # Unit load simulations (cracked bridge).
@@ -516,9 +879,10 @@ def run_uls(
         ULResponses.load_wheel_tracks(
             c=c,
             response_type=response_type,
-            sim_runner=OSRunner(c),
+            sim_runner=c._sim_runner(c),
             wheel_zs=c.bridge.wheel_track_zs(c),
             run_only=True,
+            resume=resume,
         )
 
 
@@ -533,10 +897,137 @@ def run_ulm(c: Config, healthy: bool, cracked: bool, x_i: float, z_i: float):
     point = Point(x=wheel_x, y=0, z=wheel_z)
     if healthy:
         ULResponses.load_ulm(
-            c=c, response_type=response_type, points=[point], sim_runner=OSRunner(c),
+            c=c,
+            response_type=response_type,
+            points=[point],
+            sim_runner=c._sim_runner(c),
         )
     if cracked:
         c = transverse_crack().use(c)[0]
         ULResponses.load_ulm(
-            c=c, response_type=response_type, points=[point], sim_runner=OSRunner(c),
+            c=c,
+            response_type=response_type,
+            points=[point],
+            sim_runner=c._sim_runner(c),
+        )
+
+
+def run_crack_sweep(
+    c: Config,
+    response_type: ResponseType,
+    points: List[Point],
+    crack_xs: List[float],
+    lengths: List[float],
+    widths: List[Optional[float]] = [None],
+    sim_runner: Optional[Callable[[Config], FEMRunner]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit load matrix of each crack in a grid of transverse cracks.
+
+    There is one crack ('transverse_crack') for each combination of x position,
+    length and width. Cracks with the same crack area are only computed once.
+    If the FEMRunner computes unit load matrices, each crack is a low-rank
+    update of the one healthy model. Otherwise the simulations of all cracks
+    are run in one pool of processes, each building its own model: cracks with
+    the same mesh ('Bridge.additional_xs') differ in the sections of the
+    cracked elements, so their models are not shared.
+
+    The result is saved to and loaded from disk as one stacked array.
+
+    Args:
+        c: Config, global configuration object, of the healthy bridge.
+        response_type: ResponseType, the type of sensor response to calculate.
+        points: List[Point], points on the deck to calculate responses at.
+        crack_xs: List[float], x positions of the start of each crack area.
+        lengths: List[float], lengths of each crack area in x direction.
+        widths: List[Optional[float]], widths of each crack area in z
+            direction, by default half the bridge's width.
+        sim_runner: Optional[Callable[[Config], FEMRunner]], the FEM program to
+            run simulations with, by default that of the given Config.
+
+    Returns:
+        A tuple of: an array of shape (S, 4), the crack area (x start, z start,
+        x end, z end) of each of S cracks; an array of shape (S, L, P), the unit
+        load matrix of each crack, as 'ULResponses.load_ulm'.
+
+    """
+    if sim_runner is None:
+        sim_runner = c._sim_runner
+    # Crack scenarios of distinct crack areas.
+    scenarios, cracks = [], []
+    for x, length, width in itertools.product(crack_xs, lengths, widths):
+        scenario = transverse_crack(length=length, width=width, at_x=x)
+        crack = tuple(map(round_m, scenario.crack_area(c.bridge)))
+        if crack not in cracks:
+            scenarios.append(scenario)
+            cracks.append(crack)
+    cracks = np.array(cracks, dtype=np.float64).reshape(-1, 4)
+
+    healthy_sim_runner = sim_runner(c)
+    wheel_zs = c.bridge.wheel_track_zs(c)
+    filepath = c.get_data_path(
+        "ulms",
+        (
+            "cracks-"
+            + ULResponses.id_str(
+                c=c,
+                response_type=response_type,
+                sim_runner=healthy_sim_runner,
+                wheel_zs=wheel_zs,
+            )
+            + str([str(point) for point in points])
+            + str(cracks.tolist())
+        )
+        + ".npz",
+    )
+    filepath = shorten_path(c=c, bypass_config=True, filepath=filepath)
+    if os.path.exists(filepath):
+        with np.load(filepath) as data:
+            return data["cracks"], data["unit_load_matrices"]
+
+    print_i(f"Calculating unit load matrices of {len(scenarios)} cracks...")
+    if healthy_sim_runner.has_unit_load_matrix():
+        unit_load_matrices = healthy_sim_runner.unit_load_matrices(
+            response_type=response_type,
+            points=points,
+            wheel_zs=wheel_zs,
+            damage_scenarios=scenarios,
+        )
+    else:
+        use_cs = [scenario.use(c)[0] for scenario in scenarios]
+
+        def _run(params):
+            """Run one half of one wheel track of one crack."""
+            i, wheel_z, left_only = params
+            use_c = use_cs[i]
+            wheel_track = ULResponses.load_wheel_track(
+                c=deepcopy(use_c),
+                response_type=response_type,
+                fem_runner=sim_runner(use_c),
+                load_z_frac=use_c.bridge.z_frac(wheel_z),
+                run_only=True,
+                left_only=left_only,
+                right_only=not left_only,
+            )
+            deque(wheel_track, maxlen=0)
+
+        # All simulations of all cracks, in one pool of processes.
+        all_params = list(
+            itertools.product(range(len(use_cs)), wheel_zs, [True, False])
+        )
+        processes = min(multiprocessing.cpu_count(), len(all_params))
+        with multiprocessing.Pool(processes=processes) as pool:
+            pool.map(_run, all_params)
+        unit_load_matrices = np.stack(
+            [
+                ULResponses.load_ulm(
+                    c=use_c,
+                    response_type=response_type,
+                    points=points,
+                    sim_runner=sim_runner(use_c),
+                )
+                for use_c in use_cs
+            ]
         )
+    with atomic_write(filepath, "wb") as f:
+        np.savez(f, cracks=cracks, unit_load_matrices=unit_load_matrices)
+    return cracks, unit_load_matrices
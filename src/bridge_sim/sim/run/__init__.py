@@ -9,17 +9,32 @@ from __future__ import annotations
 import itertools
 import os
 from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from copy import deepcopy
 from timeit import default_timer as timer
 from typing import Callable, Dict, List, TypeVar, Optional, Tuple
 
-import dill
+import numpy as np
 from pathos.multiprocessing import Pool
 
-from bridge_sim.model import Bridge, Config, ResponseType
+from bridge_sim.model import Bridge, Config, Point, ResponseType
 from bridge_sim.sim.model import SimParams, SimResponses
+from bridge_sim.sim.manifest import Manifest
+from bridge_sim.sim.store import load_responses, remove_responses
 from bridge_sim.sim.util import _responses_path
-from bridge_sim.util import print_d, print_i, safe_str, shorten_path
+from bridge_sim.util import (
+    print_d,
+    print_i,
+    print_w,
+    round_m,
+    safe_str,
+    shorten_path,
+)
 
 # Print debug information for this file.
 
@@ -29,8 +44,21 @@ D: str = "fem.run"
 Parsed = TypeVar("Parsed")
 
 
+def batch_positions(expt_params: List[SimParams]) -> List[Tuple[float, float]]:
+    """Sorted (x, z) positions of the point loads and mesh of each simulation."""
+    positions = set()
+    for sim_params in expt_params:
+        if not sim_params.point_loads_only():
+            raise ValueError("Can only batch simulations of point loads")
+        for pload in sim_params.ploads:
+            positions.add((round_m(pload.x), round_m(pload.z)))
+        for x, z in sim_params.mesh_positions:
+            positions.add((round_m(x), round_m(z)))
+    return sorted(positions)
+
+
 class FEMRunner:
-    """An interface to run simulations with an external FE program.
+    """An interface to run simulations with an external or in-process FE program.
 
     NOTE: For running simulations and loading fem you probably want the
     higher-level API in 'bridge_sim.sim.responses'.
@@ -38,6 +66,21 @@ class FEMRunner:
     Args:
         supported_response_types: Callable[[Bridge], List[ResponseType]], the
             supported response types for a given bridge.
+        build_batch: optional, build one model file for a batch of point load
+            simulations. Used when 'Config.sim_batch_size > 1'.
+        run_batch: optional, run a batch built with 'build_batch'.
+        unit_load_matrix: optional, compute a unit load matrix directly,
+            instead of one simulation per unit load, optionally of a cracked
+            bridge.
+        unit_load_matrices: optional, compute the unit load matrices of many
+            cracked bridges at once.
+        dynamic_responses: optional, compute dynamic responses to a history
+            of loads on the wheel tracks, optionally of a cracked bridge.
+        surrogate: optional, build a reduced-order model of the bridge for fast
+            re-analysis with scaled stiffness of groups of elements.
+        version: version of the responses of this FEMRunner, incremented when
+            a change to the FEMRunner changes its responses, so that results
+            cached by a previous version are not reused. See 'cache_name'.
 
     """
 
@@ -53,6 +96,52 @@ class FEMRunner:
         convert: Callable[
             [Config, Parsed], Dict[int, Dict[ResponseType, List[Response]]]
         ],
+        build_batch: Optional[
+            Callable[[Config, List[SimParams], FEMRunner], List[SimParams]]
+        ] = None,
+        run_batch: Optional[
+            Callable[[Config, List[SimParams], FEMRunner], List[SimParams]]
+        ] = None,
+        unit_load_matrix: Optional[
+            Callable[
+                [
+                    Config,
+                    ResponseType,
+                    List[Point],
+                    List[float],
+                    Optional["CrackedScenario"],
+                ],
+                np.ndarray,
+            ]
+        ] = None,
+        unit_load_matrices: Optional[
+            Callable[
+                [
+                    Config,
+                    ResponseType,
+                    List[Point],
+                    List[float],
+                    List["CrackedScenario"],
+                ],
+                np.ndarray,
+            ]
+        ] = None,
+        dynamic_responses: Optional[
+            Callable[
+                [
+                    Config,
+                    np.ndarray,
+                    ResponseType,
+                    List[Point],
+                    Optional["CrackedScenario"],
+                ],
+                np.ndarray,
+            ]
+        ] = None,
+        surrogate: Optional[
+            Callable[[Config, ResponseType, List[Point], List[float]], "Surrogate"]
+        ] = None,
+        version: int = 0,
     ):
         self.c = c
         self.name = name
@@ -62,23 +151,199 @@ class FEMRunner:
         self._run = run
         self._parse = parse
         self._convert = convert
+        self._build_batch = build_batch
+        self._run_batch = run_batch
+        self._unit_load_matrix = unit_load_matrix
+        self._unit_load_matrices = unit_load_matrices
+        self._dynamic_responses = dynamic_responses
+        self._surrogate = surrogate
+        self.version = version
+
+    @property
+    def cache_name(self) -> str:
+        """Name of this FEMRunner in the keys of cached results."""
+        if self.version == 0:
+            return self.name
+        return f"{self.name}-v{self.version}"
+
+    def has_unit_load_matrix(self) -> bool:
+        """Whether unit load matrices are computed directly."""
+        return self._unit_load_matrix is not None
+
+    def unit_load_matrix(
+        self,
+        response_type: ResponseType,
+        points: List[Point],
+        wheel_zs: List[float],
+        damage_scenario: Optional["CrackedScenario"] = None,
+    ) -> np.ndarray:
+        """Response at each point to a 1 kN load at each wheel track position.
 
-    def run(
+        Rows are ordered by wheel track and then by x position of the load. If
+        a 'damage_scenario' is given the responses are of the damaged bridge.
+
+        """
+        if not self.has_unit_load_matrix():
+            raise ValueError(f"{self.name} does not compute unit load matrices")
+        return self._unit_load_matrix(
+            c=self.c,
+            response_type=response_type,
+            points=points,
+            wheel_zs=wheel_zs,
+            damage_scenario=damage_scenario,
+        )
+
+    def unit_load_matrices(
         self,
-        expt_params: List[SimParams],
-        return_parsed: bool = False,
-        return_converted: bool = False,
-    ):
-        """Run multiple simulations and save responses.
+        response_type: ResponseType,
+        points: List[Point],
+        wheel_zs: List[float],
+        damage_scenarios: List["CrackedScenario"],
+    ) -> np.ndarray:
+        """Unit load matrix of the bridge under each damage scenario.
 
-        TODO: Change ExptParams to SimParams.
+        Returns:
+            An array of shape (len(damage_scenarios), L, len(points)), each
+            unit load matrix is as returned by 'unit_load_matrix'.
+
+        """
+        if self._unit_load_matrices is not None:
+            return self._unit_load_matrices(
+                c=self.c,
+                response_type=response_type,
+                points=points,
+                wheel_zs=wheel_zs,
+                damage_scenarios=damage_scenarios,
+            )
+        return np.stack(
+            [
+                self.unit_load_matrix(
+                    response_type=response_type,
+                    points=points,
+                    wheel_zs=wheel_zs,
+                    damage_scenario=damage_scenario,
+                )
+                for damage_scenario in damage_scenarios
+            ]
+        )
+
+    def has_dynamic_responses(self) -> bool:
+        """Whether dynamic responses to traffic are computed."""
+        return self._dynamic_responses is not None
+
+    def dynamic_responses(
+        self,
+        traffic_array: np.ndarray,
+        response_type: ResponseType,
+        points: List[Point],
+        damage_scenario: Optional["CrackedScenario"] = None,
+    ) -> np.ndarray:
+        """Dynamic response at each point to a history of loads, e.g. traffic.
 
         Args:
-            expt_params: ExptParams, parameters for a number of simulations.
-            return_parsed: bool, for testing, return parsed fem.
-            return_converted: bool, for testing, return converted fem.
+            traffic_array: array of shape (T, L), the load at each load position
+                (as for 'unit_load_matrix') at each time step.
+            response_type: the type of response at each point.
+            points: points on the deck at which to calculate responses.
+            damage_scenario: optional, a crack of the bridge.
+
+        Returns:
+            An array of shape (T, len(points)).
+
+        """
+        if not self.has_dynamic_responses():
+            raise ValueError(f"{self.name} does not compute dynamic responses")
+        return self._dynamic_responses(
+            c=self.c,
+            traffic_array=traffic_array,
+            response_type=response_type,
+            points=points,
+            damage_scenario=damage_scenario,
+        )
+
+    def has_surrogate(self) -> bool:
+        """Whether reduced-order models of the bridge are built."""
+        return self._surrogate is not None
+
+    def surrogate(
+        self, response_type: ResponseType, points: List[Point], wheel_zs: List[float]
+    ) -> "Surrogate":
+        """Reduced-order model of the bridge, for fast re-analysis.
+
+        Args:
+            response_type: the type of response at each point.
+            points: points on the deck at which to calculate responses.
+            wheel_zs: z position of each wheel track.
+
+        Returns:
+            A surrogate with methods 'unit_load_matrix', 'thermal_responses'
+            and 'error_bound' of the scale of each group's stiffness, see
+            'bridge_sim.sim.run.sparse.rom.Surrogate'.
+
+        """
+        if not self.has_surrogate():
+            raise ValueError(f"{self.name} does not build surrogates")
+        return self._surrogate(
+            c=self.c, response_type=response_type, points=points, wheel_zs=wheel_zs
+        )
+
+    def batch_size(self) -> int:
+        """Simulations per model file, 1 if this FEMRunner doesn't batch them."""
+        if self._build_batch is None or self._run_batch is None:
+            return 1
+        return max(1, self.c.sim_batch_size)
+
+    def batchable(self, expt_params: List[SimParams]) -> bool:
+        """Whether the simulations can be run in batches of one model file."""
+        return (
+            self.batch_size() > 1
+            and len(expt_params) > 1
+            and all(sim_params.point_loads_only() for sim_params in expt_params)
+        )
+
+    def batches(self, expt_params: List[SimParams]) -> List[List[int]]:
+        """Indices of the simulations in each batch of 'Config.sim_batch_size'.
+
+        The mesh of a batch has a node at each load position in the batch, so
+        the load positions of its batch are set as the 'mesh_positions' of each
+        simulation. These are part of the key of its cached responses, and a
+        simulation with the same 'mesh_positions' run on its own is on the same
+        mesh.
 
         """
+        size = self.c.sim_batch_size
+        batches = [
+            list(range(i, min(i + size, len(expt_params))))
+            for i in range(0, len(expt_params), size)
+        ]
+        for batch in batches:
+            positions = batch_positions([expt_params[i] for i in batch])
+            for i in batch:
+                expt_params[i].mesh_positions = positions
+        return batches
+
+    def _build_and_run_batches(self, expt_params: List[SimParams]):
+        """Build and run simulations, 'Config.sim_batch_size' per model file."""
+        batches = [
+            [expt_params[i] for i in batch] for batch in self.batches(expt_params)
+        ]
+        for b, batch in enumerate(batches):
+            start = timer()
+            batch = self._build_batch(c=self.c, expt_params=batch, fem_runner=self)
+            print_i(
+                f"FEMRunner: built {self.name} batch {b + 1}/{len(batches)}"
+                + f" in {timer() - start:.2f}s"
+            )
+            start = timer()
+            self._run_batch(c=self.c, expt_params=batch, fem_runner=self)
+            print_i(
+                f"FEMRunner: ran {self.name} batch {b + 1}/{len(batches)}"
+                + f" of {len(batch)} simulations in {timer() - start:.2f}s"
+            )
+        return expt_params
+
+    def _build_and_run(self, expt_params: List[SimParams]):
+        """Build and run simulations, one per model file."""
         # Building.
         start = timer()
         expt_params = self._build(c=self.c, expt_params=expt_params, fem_runner=self,)
@@ -96,6 +361,142 @@ class FEMRunner:
                 + f" {sim_ind + 1}/{len(expt_params)}"
                 + f" simulation in {timer() - start:.2f}s"
             )
+        return expt_params
+
+    def _parse_convert_save(self, sim_ind: int, sim_params: List[SimParams]):
+        """Parse, convert and save the responses of one simulation."""
+        start = timer()
+        parsed = self._parse(self.c, sim_params, self)
+        converted = self._convert(
+            c=self.c, expt_params=sim_params, parsed_expt_responses=parsed,
+        )
+        self._save(sim_params, converted)
+        print_i(
+            f"FEMRunner: parsed, converted and saved simulation"
+            + f" {sim_ind + 1} in {timer() - start:.2f}s"
+        )
+
+    def _run_pipelined(self, expt_params: List[SimParams]):
+        """Build, run, parse, convert and save each simulation independently.
+
+        At most 'Config.sim_window' simulations are in flight (built but not yet
+        saved) at once, so peak memory does not grow with the number of
+        simulations. Up to 'Config.parallel_sims' simulations run at once, each
+        is parsed, converted and saved as soon as it has run. Building uses
+        module-level caches of meshes, so simulations are built one at a time
+        in the calling thread, while others run.
+
+        """
+        window = max(1, self.c.sim_window)
+        workers = max(1, min(window, self.c.parallel_sims))
+
+        def _run(
+            sim_ind: int, sim_params: List[SimParams], build_time: float
+        ) -> Tuple[int, List[SimParams], float]:
+            start = timer()
+            sim_params = self._run(self.c, sim_params, self, 0)
+            return sim_ind, sim_params, build_time + timer() - start
+
+        start_all = timer()
+        to_submit = iter(range(len(expt_params)))
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            def _build_and_submit(n: int):
+                """Build the next 'n' simulations and submit them to run."""
+                for sim_ind in itertools.islice(to_submit, n):
+                    start = timer()
+                    sim_params = self._build(
+                        c=self.c, expt_params=[expt_params[sim_ind]], fem_runner=self,
+                    )
+                    in_flight.add(
+                        executor.submit(_run, sim_ind, sim_params, timer() - start)
+                    )
+
+            _build_and_submit(window)
+            done_count = 0
+            while len(in_flight) > 0:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sim_ind, sim_params, run_time = future.result()
+                    done_count += 1
+                    print_i(
+                        f"FEMRunner: built and ran {self.name} simulation"
+                        + f" {sim_ind + 1} ({done_count}/{len(expt_params)} done)"
+                        + f" in {run_time:.2f}s"
+                    )
+                    self._parse_convert_save(sim_ind, sim_params)
+                    del sim_params
+                    # Refill the window.
+                    _build_and_submit(1)
+        print_i(
+            f"FEMRunner: ran {len(expt_params)} {self.name} simulations"
+            + f" in {timer() - start_all:.2f}s"
+        )
+
+    def _run_concurrent(self, expt_params: List[SimParams]):
+        """Run up to 'Config.parallel_sims' simulations at once.
+
+        Each simulation is parsed, converted and saved as soon as it finishes,
+        while the remaining simulations are still running. The FE program runs
+        in a subprocess, so threads are sufficient to keep many running.
+
+        """
+        # Building.
+        start = timer()
+        expt_params = self._build(c=self.c, expt_params=expt_params, fem_runner=self,)
+        print_i(
+            f"FEMRunner: built {self.name} model file(s) in"
+            + f" {timer() - start:.2f}s"
+        )
+
+        def _run(sim_ind: int) -> Tuple[int, float]:
+            start = timer()
+            self._run(self.c, expt_params, self, sim_ind)
+            return sim_ind, timer() - start
+
+        start_all = timer()
+        with ThreadPoolExecutor(max_workers=self.c.parallel_sims) as executor:
+            futures = [executor.submit(_run, i) for i in range(len(expt_params))]
+            for done, future in enumerate(as_completed(futures)):
+                sim_ind, run_time = future.result()
+                print_i(
+                    f"FEMRunner: ran {self.name} simulation {sim_ind + 1}"
+                    + f" ({done + 1}/{len(expt_params)} done) in {run_time:.2f}s"
+                )
+                self._parse_convert_save(sim_ind, [expt_params[sim_ind]])
+        print_i(
+            f"FEMRunner: ran {len(expt_params)} {self.name} simulations"
+            + f" in {timer() - start_all:.2f}s"
+        )
+
+    def run(
+        self,
+        expt_params: List[SimParams],
+        return_parsed: bool = False,
+        return_converted: bool = False,
+    ):
+        """Run multiple simulations and save responses.
+
+        TODO: Change ExptParams to SimParams.
+
+        Args:
+            expt_params: ExptParams, parameters for a number of simulations.
+            return_parsed: bool, for testing, return parsed fem.
+            return_converted: bool, for testing, return converted fem.
+
+        """
+        # Building and running, many simulations per model file if possible.
+        if self.batchable(expt_params):
+            expt_params = self._build_and_run_batches(expt_params)
+        # Else run each simulation through all stages independently.
+        elif self.c.sim_window is not None and not (return_parsed or return_converted):
+            return self._run_pipelined(expt_params)
+        # Else run simulations concurrently, saving each as soon as it's done.
+        elif self.c.parallel_sims > 1 and not (return_parsed or return_converted):
+            return self._run_concurrent(expt_params)
+        else:
+            expt_params = self._build_and_run(expt_params)
 
         # Parsing.
         start = timer()
@@ -121,11 +522,18 @@ class FEMRunner:
         print(converted_expt_responses[0].keys())
 
         # Saving.
+        self._save(expt_params, converted_expt_responses)
+
+    def _save(
+        self,
+        expt_params: List[SimParams],
+        converted_expt_responses: Dict[int, Dict[ResponseType, List[Response]]],
+    ):
+        """Save converted responses of each simulation to disk."""
         for sim_ind in converted_expt_responses:
             print_d(D, f"sim_ind = {sim_ind}")
             for response_type, responses in converted_expt_responses[sim_ind].items():
                 print_d(D, f"response_type in converted = {response_type}")
-                print(len(responses))
                 fem_responses = SimResponses(
                     c=self.c,
                     sim_params=expt_params[sim_ind],
@@ -149,6 +557,7 @@ class FEMRunner:
         ext: str,
         append: str = "",
         dirname: Optional[str] = None,
+        shorten: bool = True,
     ) -> str:
         """Deterministic path for a FE model file.
 
@@ -156,6 +565,7 @@ class FEMRunner:
         :param ext: extension of the output file without the dot.
         :param dirname: directory name of output file. Defaults to FEMRunner.name.
         :param append: append to the filename (before the extension).
+        :param shorten: shorten the path, see 'bridge_sim.util.shorten_path'.
         :return: path for the output file.
         """
         param_str = sim_params.id_str()
@@ -164,9 +574,10 @@ class FEMRunner:
         if dirname is None:
             dirname = self.name
         dirname = safe_str(dirname)
-        return shorten_path(
-            self.c, safe_str(self.c.get_data_path(dirname, filename)) + f".{ext}"
-        )
+        path = safe_str(self.c.get_data_path(dirname, filename)) + f".{ext}"
+        if not shorten:
+            return path
+        return shorten_path(self.c, path)
 
     def sim_out_path(
         self,
@@ -175,6 +586,7 @@ class FEMRunner:
         dirname: Optional[str] = None,
         append: str = "",
         response_types: List[ResponseType] = [],
+        shorten: bool = True,
     ) -> str:
         """Deterministic path for unprocessed simulation output files.
 
@@ -183,6 +595,7 @@ class FEMRunner:
         :param dirname: directory name of output file. Defaults to FEMRunner.name + "-fem".
         :param append: append to the filename (before the extension).
         :param response_types: response types identifying the output file.
+        :param shorten: shorten the path, see 'bridge_sim.util.shorten_path'.
         :return: path for the output file.
         """
         sim_params_copy = deepcopy(sim_params)
@@ -192,7 +605,11 @@ class FEMRunner:
         if dirname is None:
             dirname = self.name + "-responses"
         return self.sim_model_path(
-            sim_params=sim_params_copy, ext=ext, dirname=dirname, append=append
+            sim_params=sim_params_copy,
+            ext=ext,
+            dirname=dirname,
+            append=append,
+            shorten=shorten,
         )
 
 
@@ -247,20 +664,14 @@ def load_fem_responses(
 
     start = timer()
     try:
-        with open(path, "rb") as f:
-            responses = dill.load(f)
-    # Try again on Exception.
+        responses = load_responses(c=c, path=path)
+    # Responses are written atomically, so this is unexpected (e.g. corruption
+    # on disk). Try again once, re-running the simulation.
     except Exception as e:
-        print_i(f"\n{str(e)}\nremoving and re-running sim. {index} at {path}")
-        os.remove(path)
-        return load_fem_responses(
-            c=c,
-            sim_params=sim_params,
-            response_type=response_type,
-            run=run,
-            run_only=run_only,
-            index=index,
-        )
+        print_w(f"\n{str(e)}\nremoving and re-running sim. {index} at {path}")
+        remove_responses(path)
+        c.sim_runner.run([sim_params])
+        responses = load_responses(c=c, path=path)
 
     print_prog(f"Loaded Responses in {timer() - start:.2f}s, ({response_type})")
 
@@ -282,6 +693,7 @@ def load_expt_responses(
     expt_params: List[SimParams],
     response_type: ResponseType,
     run_only: bool = False,
+    resume: bool = False,
 ) -> List[SimResponses]:
     """Save/load responses of one sensor type for multiple simulations.
 
@@ -289,18 +701,85 @@ def load_expt_responses(
     'run_only' option is passed, then the simulations will run but nothing will
     be returned.
 
+    If 'Config.sim_batch_size > 1' and the FEMRunner supports it, simulations
+    without saved results are run 'Config.sim_batch_size' per model file, each
+    on the mesh of its batch (see 'FEMRunner.batches'). Else if
+    'Config.parallel_sims > 1' or 'Config.sim_window' is set they are run by
+    one FEMRunner, instead of in a process pool.
+
+    Each simulation run is recorded in a manifest of this batch of simulations.
+    If 'resume' is passed then the checksums of simulations in the manifest are
+    verified, and any simulation with an invalid checksum is run again.
+
     """
+    # Batches are of all the simulations, so each one's mesh, and thus the path
+    # of its responses, doesn't depend on which have saved results.
+    batches = []
+    if c.sim_runner.batchable(expt_params):
+        expt_params = deepcopy(expt_params)
+        batches = c.sim_runner.batches(expt_params)
     indices_and_params = list(zip(itertools.count(), expt_params))
+    paths = [
+        _responses_path(
+            sim_runner=c.sim_runner, sim_params=sim_params, response_type=response_type,
+        )
+        for sim_params in expt_params
+    ]
+    manifest = Manifest(c=c, paths=paths)
+    if resume:
+        completed, invalid = manifest.verify()
+        for path in invalid:
+            remove_responses(path)
+        # Saved responses missing from the manifest were written atomically, so
+        # they are complete, e.g. the process was killed before recording them.
+        for path in set(paths) - completed:
+            if os.path.exists(path):
+                manifest.record(path)
+                completed.add(path)
+        print_i(f"Resuming: {len(completed)}/{len(set(paths))} simulations completed")
+    already_saved = set(filter(os.path.exists, paths))
+
+    def record(path: str):
+        if path not in already_saved and os.path.exists(path):
+            manifest.record(path)
+
+    # Run simulations without saved results in batches, if possible.
+    to_run = [i for i, path in enumerate(paths) if path not in already_saved]
+    if len(batches) > 0:
+        batches = [
+            [i for i in batch if paths[i] not in already_saved] for batch in batches
+        ]
+        batches = [batch for batch in batches if len(batch) > 0]
+        print_i(f"Running {len(to_run)} simulations in {len(batches)} batches")
+
+        def run_batch(batch: List[int]):
+            c.sim_runner.run(deepcopy([expt_params[i] for i in batch]))
+            for i in batch:
+                record(paths[i])
+
+        if c.parallel > 1:
+            with Pool(processes=c.parallel, maxtasksperchild=1) as pool:
+                pool.map(run_batch, batches)
+        else:
+            deque(map(run_batch, batches), maxlen=0)
+    # Else one FEMRunner can run the simulations concurrently, if requested.
+    elif (c.parallel_sims > 1 or c.sim_window is not None) and len(to_run) > 0:
+        print_i(f"Running {len(to_run)} simulations, {c.parallel_sims} at once")
+        c.sim_runner.run(deepcopy([expt_params[i] for i in to_run]))
+        deque(map(record, paths), maxlen=0)
 
     def process(index_and_params, _run_only: bool = True):
         i, sim_params = index_and_params
-        return load_fem_responses(
+        result = load_fem_responses(
             c=deepcopy(c),
             sim_params=deepcopy(sim_params),
             response_type=response_type,
             run_only=_run_only,
             index=(i + 1, len(expt_params)),
         )
+        if _run_only:
+            record(paths[i])
+        return result
 
     # First run the simulations (if necessary), in parallel if requested. To
     # free resources as quickly as possible only 1 task is run per process.
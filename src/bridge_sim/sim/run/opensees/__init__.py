@@ -8,9 +8,10 @@ from typing import Callable, List, Optional
 from bridge_sim.model import ResponseType, Config, Bridge
 from bridge_sim.sim.model import SimParams
 from bridge_sim.sim.run import FEMRunner
-from bridge_sim.sim.run.opensees.build import build_model
+from bridge_sim.sim.run.opensees.batch import build_model_batch, run_model_batch
 from bridge_sim.sim.run.opensees.convert import convert_responses
 from bridge_sim.sim.run.opensees.parse import parse_responses
+from bridge_sim.sim.run.opensees.recorders import build_model_with_recorders
 from bridge_sim.sim.run.opensees.run import run_model
 from bridge_sim.util import print_i, print_w
 
@@ -34,10 +35,12 @@ class OSRunner(FEMRunner):
             name="OpenSees",
             exe_path=exe_path,
             supported_response_types=opensees_supported_response_types,
-            build=build_model,
+            build=build_model_with_recorders,
             run=run_model,
             parse=parse_responses,
             convert=convert_responses,
+            build_batch=build_model_batch,
+            run_batch=run_model_batch,
         )
 
         def opensees_out_path(*args, **kwargs):
@@ -0,0 +1,161 @@
+"""Run many point-load simulations from one OpenSees model file.
+
+All simulations in a batch share one mesh, which has nodes at every load
+position in the batch. The model is built once and each simulation becomes a
+load pattern that is active at exactly one analysis step. With a linear
+algorithm that factorizes once, the stiffness matrix is assembled and factorized
+once for the whole batch. Each recorder writes one row per analysis step, which
+is split back into per-simulation responses when parsing.
+
+"""
+
+import re
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bridge_sim.model import Config, PointLoad
+from bridge_sim.sim.model import SimParams
+from bridge_sim.sim.run import FEMRunner, batch_positions
+from bridge_sim.sim.run.opensees.build import build_model
+from bridge_sim.sim.run.opensees.recorders import binary_recorders
+from bridge_sim.util import print_i, round_m
+
+_node_re = re.compile(r"^\s*node\s+(\d+)\s+(\S+)\s+(\S+)\s+(\S+)", re.MULTILINE)
+_load_re = re.compile(r"^\s*load\s+(\d+)\s+([^;#\n]*)", re.MULTILINE)
+
+
+def batch_sim_params(expt_params: List[SimParams]) -> SimParams:
+    """Simulation parameters with a 1 kN load at each load position of a batch.
+
+    A model built from these parameters has a node at each load position of
+    each simulation in the batch, the same mesh as of each simulation with the
+    'mesh_positions' set by 'FEMRunner.batches'.
+
+    """
+    positions = batch_positions(expt_params)
+    return SimParams(ploads=[PointLoad(x=x, z=z, load=1) for x, z in positions])
+
+
+def _split_model(tcl: str) -> Tuple[str, str, str, str]:
+    """Model, load pattern, recorders and analysis parts of a built model."""
+    model, rest = tcl.split("timeSeries Linear 1", 1)
+    pattern_start = rest.index("pattern Plain 1 1 {")
+    pattern_end = rest.index("\n}", pattern_start)
+    loads = rest[pattern_start:pattern_end]
+    analysis_start = rest.index("system ")
+    recorders = rest[pattern_end + 2 : analysis_start]
+    analysis = rest[analysis_start:].split("analyze 1", 1)[0]
+    return model, loads, recorders, analysis
+
+
+def _unit_loads(model: str, loads: str) -> Dict[Tuple[float, float], np.ndarray]:
+    """Load command values for a 1 kN load, indexed by deck position."""
+    node_ids = {
+        (round_m(float(x)), round_m(float(z))): int(n_id)
+        for n_id, x, y, z in _node_re.findall(model)
+        if np.isclose(float(y), 0)
+    }
+    values_by_id = defaultdict(float)
+    for n_id, values in _load_re.findall(loads):
+        values_by_id[int(n_id)] += np.array(list(map(float, values.split())))
+    return {
+        position: (n_id, values_by_id[n_id])
+        for position, n_id in node_ids.items()
+        if n_id in values_by_id
+    }
+
+
+def batch_tcl(tcl: str, expt_params: List[SimParams]) -> str:
+    """Convert a model built from 'batch_sim_params' into a batched model.
+
+    Simulation i (from 0) is a load pattern with a factor of 1 at time i + 1
+    and 0 otherwise. The model is analyzed once per simulation, with load
+    control increments of 1, so that row i of each recorder's output holds the
+    responses of simulation i.
+
+    """
+    model, loads, recorders, analysis = _split_model(tcl)
+    unit_loads = _unit_loads(model=model, loads=loads)
+    analysis = "\n".join(
+        (
+            "algorithm Linear -factorOnce"
+            if line.strip().startswith("algorithm")
+            else (
+                "integrator LoadControl 1"
+                if line.strip().startswith("integrator")
+                else line
+            )
+        )
+        for line in analysis.split("\n")
+    )
+    patterns = []
+    for i, sim_params in enumerate(expt_params):
+        case_loads = dict()
+        for pload in sim_params.ploads:
+            position = (round_m(pload.x), round_m(pload.z))
+            if position not in unit_loads:
+                raise ValueError(f"No load command found for {pload}")
+            n_id, values = unit_loads[position]
+            case_loads[n_id] = case_loads.get(n_id, 0) + values * pload.load
+        load_commands = "\n".join(
+            f"    load {n_id} " + " ".join(map(str, values))
+            for n_id, values in case_loads.items()
+        )
+        ts = i + 1
+        patterns.append(
+            f"timeSeries Path {ts} -time {{{i} {i + 1} {i + 2}}} -values {{0 1 0}}"
+            + f"\npattern Plain {ts} {ts} {{\n{load_commands}\n}}"
+        )
+    return (
+        model
+        + "\n\n".join(patterns)
+        + f"\n\n{recorders}\n"
+        + f"{analysis}\n"
+        + f"analyze {len(expt_params)}\n"
+    )
+
+
+def build_model_batch(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner
+) -> List[SimParams]:
+    """Build one OpenSees model file for a batch of simulations.
+
+    Each of the given simulation parameters is annotated with the batch it
+    belongs to, its index in that batch and the size of the batch, used when
+    parsing responses.
+
+    """
+    batch_params = build_model(
+        c=c, expt_params=[batch_sim_params(expt_params)], fem_runner=fem_runner
+    )[0]
+    model_path = fem_runner.sim_model_path(sim_params=batch_params, ext="tcl")
+    with open(model_path) as f:
+        tcl = f.read()
+    tcl = batch_tcl(tcl=tcl, expt_params=expt_params)
+    if c.os_binary_recorders:
+        tcl = binary_recorders(tcl)
+    with open(model_path, "w") as f:
+        f.write(tcl)
+    for i, sim_params in enumerate(expt_params):
+        sim_params.batch = (batch_params, i, len(expt_params))
+        sim_params.bridge_nodes = batch_params.bridge_nodes
+        sim_params.bridge_shells = batch_params.bridge_shells
+    print_i(f"OpenSees: built batch of {len(expt_params)} simulations")
+    return expt_params
+
+
+def run_model_batch(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner
+) -> List[SimParams]:
+    """Run a batch of simulations built with 'build_model_batch'."""
+    batch_params, _, _ = expt_params[0].batch
+    subprocess.run(
+        [
+            fem_runner.exe_path,
+            fem_runner.sim_model_path(sim_params=batch_params, ext="tcl"),
+        ]
+    )
+    return expt_params
@@ -1,153 +1,161 @@
-"""Convert parsed OpenSees responses to List[Response]."""
+"""Convert parsed OpenSees responses to arrays of values and points."""
 
-from collections import defaultdict
-from copy import deepcopy
-from typing import Dict, List
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Tuple
 
 import numpy as np
 
-from bridge_sim.model import ResponseType, Point, Config
+from bridge_sim.model import ResponseType, Config
 from bridge_sim.sim.build import det_nodes, det_shells
-from bridge_sim.sim.model import Node, Shell, SimParams
+from bridge_sim.sim.model import Node, ResponseArrays, Shell, SimParams
 from bridge_sim.sim.run import Parsed
+from bridge_sim.sim.store import mesh_digest
 from bridge_sim.util import print_w
 
 # Print debug information for this file.
 D = "fem.run.opensees.convert.d3"
 # D = False
 
+# Signs of the x and z offsets of each integration point from the center of a
+# shell element, in the order that OpenSees records them.
+I_POINT_SIGNS = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+
+# Integration point geometry of recently converted meshes, by mesh digest.
+_i_point_cache: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = OrderedDict()
+_I_POINT_CACHE_SIZE = 8
+
+
+def node_points(nodes: List[Node]) -> np.ndarray:
+    """The (x, y, z) coordinates of each node, as an array of shape (N, 3)."""
+    return np.array([(n.x, n.y, n.z) for n in nodes], dtype=np.float64).reshape(-1, 3)
+
+
+def i_point_geometry(
+    elements: List[Shell],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Geometry of the integration points of shell elements.
+
+    The result is cached per mesh, identified by the coordinates of each
+    element's nodes and each element's thickness.
+
+    Returns:
+        A tuple of: a boolean array, true for each element on the deck; an
+        array of shape (4, M, 3), the coordinates of each integration point of
+        the M deck elements; an array of shape (M,), the half thickness of each
+        deck element.
+
+    """
+    # Coordinates of every node in the build context, sorted by node ID.
+    nodes_by_id = elements[0].nodes_by_id if len(elements) > 0 else dict()
+    n_ids = np.fromiter(nodes_by_id.keys(), dtype=np.int64, count=len(nodes_by_id))
+    order = np.argsort(n_ids)
+    n_ids = n_ids[order]
+    xyz = node_points(list(nodes_by_id.values()))[order]
+    # Coordinates of the corners of each element, shape is (M, 4, 3).
+    corner_ids = np.array(
+        [(e.ni_id, e.nj_id, e.nk_id, e.nl_id) for e in elements], dtype=np.int64
+    ).reshape(-1, 4)
+    corners = xyz[np.searchsorted(n_ids, corner_ids)]
+    deck = np.array([not element.pier for element in elements], dtype=bool)
+    thickness = np.array(
+        [element.section.thickness for element in elements], dtype=np.float64
+    )
+    digest = mesh_digest(np.concatenate([corners.reshape(-1), thickness]))
+    if digest in _i_point_cache:
+        _i_point_cache.move_to_end(digest)
+        return _i_point_cache[digest]
+
+    corners, half_height = corners[deck], thickness[deck] / 2
+    # Center is the midpoint of corners i and k.
+    center = (corners[:, 0] + corners[:, 2]) / 2
+    length = corners[:, :, 0].max(axis=1) - corners[:, :, 0].min(axis=1)
+    width = corners[:, :, 2].max(axis=1) - corners[:, :, 2].min(axis=1)
+    offset = np.stack([length, width], axis=1) / 2 * (1 / np.sqrt(3))
+    i_points = np.repeat(center[np.newaxis], 4, axis=0)
+    i_points[:, :, [0, 2]] += I_POINT_SIGNS[:, np.newaxis, :] * offset
+    # Shared by all responses on this mesh, so don't allow modification.
+    for array in [deck, i_points, half_height]:
+        array.flags.writeable = False
+
+    _i_point_cache[digest] = (deck, i_points, half_height)
+    if len(_i_point_cache) > _I_POINT_CACHE_SIZE:
+        _i_point_cache.popitem(last=False)
+    return _i_point_cache[digest]
+
 
 def convert_sim_translation_responses(
-    nodes: List[Node],
+    points: np.ndarray,
     sim_ind: int,
     response_type: ResponseType,
-    parsed_sim_responses: Dict[ResponseType, List[List[float]]],
-    converted_expt_responses: Dict[int, Dict[ResponseType, List["Response"]]],
+    parsed_sim_responses: Dict[ResponseType, np.ndarray],
+    converted_expt_responses: Dict[int, Dict[ResponseType, ResponseArrays]],
 ):
-    """Convert parsed simulation translation fem to List[Response].
+    """Convert parsed simulation translation fem to arrays.
 
     The converted fem will be entered into the given dictionary.
 
+    Args:
+        points: array of shape (N, 3), coordinates of each recorded node.
+
     """
     # If the requested response type is not available do nothing.
     # TODO: Should we not raise an Error?
     if response_type not in parsed_sim_responses:
         return
-    parsed_sim_trans_responses = parsed_sim_responses[response_type]
-    result = []  # The List[Response] that we are converting to.
-    node_index = 0  # Index of node corresponding to current response.
-    # For each time step in the simulation.
-    for time in range(len(parsed_sim_trans_responses)):
-        # For each collected response at that time.
-        for i in range(len(parsed_sim_trans_responses[time])):
-            node = nodes[node_index]
-            result.append(
-                (
-                    parsed_sim_trans_responses[time][i],
-                    Point(x=node.x, y=node.y, z=node.z),
-                )
-            )
-            node_index += 1
-    converted_expt_responses[sim_ind][response_type] = result
+    values = np.asarray(parsed_sim_responses[response_type], dtype=np.float64)
+    values = values.reshape(-1)
+    if len(values) != len(points):
+        raise ValueError(f"{len(values)} {response_type} for {len(points)} nodes")
+    converted_expt_responses[sim_ind][response_type] = (values, points)
 
 
 def convert_strain_responses(
     elements: List[Shell],
     sim_ind: int,
-    parsed_sim_responses: Dict[ResponseType, List[List[float]]],
-    converted_expt_responses: Dict[int, Dict[ResponseType, List["Response"]]],
+    parsed_sim_responses: Dict[ResponseType, np.ndarray],
+    converted_expt_responses: Dict[int, Dict[ResponseType, ResponseArrays]],
 ):
+    """Convert parsed simulation strain fem to arrays.
+
+    The strain at each integration point of each deck element is computed from
+    the recorded section deformations [eps11, eps22, gamma12, theta11, theta22,
+    theta33, gamma13, gamma23], at the bottom and top of the element.
+
+    """
     if not any(rt.is_strain() or rt.is_stress() for rt in parsed_sim_responses):
         return
-    parsed_sim_strain = parsed_sim_responses[ResponseType.StrainXXB]
-    result_bottom, result_bottom_z, result_top = [], [], []
+    parsed_sim_strain = np.asarray(parsed_sim_responses[ResponseType.StrainXXB])
     print_w("Elements belonging to piers will not have strain recorded")
     print_w("Strain fem are specified to be at y=0, but recorded lower")
 
-    # For each integration point..
+    # Shape is (integration point, element, section deformation).
     assert len(parsed_sim_strain) == 4
-    for i_point in range(4):
-
-        # ..consider the fem for each element.
-        assert len(elements) == len(parsed_sim_strain[i_point])
-        for element, el_responses in zip(elements, parsed_sim_strain[i_point]):
-
-            # Skip any elements belonging to the pier.
-            if element.pier:
-                continue
-
-            # First calculate the center offset of the integration points..
-            if not hasattr(element, "i_point_offset"):
-                element.i_point_offset = (
-                    element.length() / 2 * (1 / np.sqrt(3)),
-                    element.width() / 2 * (1 / np.sqrt(3)),
-                )
-            i_point_x_offset, i_point_z_offset = element.i_point_offset
-
-            # ..then determine the position of each integration point.
-            response_point = deepcopy(element.center())
-            if i_point + 1 == 1:
-                response_point.x -= i_point_x_offset
-                response_point.z -= i_point_z_offset
-            elif i_point + 1 == 2:
-                response_point.x += i_point_x_offset
-                response_point.z -= i_point_z_offset
-            elif i_point + 1 == 3:
-                response_point.x += i_point_x_offset
-                response_point.z += i_point_z_offset
-            elif i_point + 1 == 4:
-                response_point.x -= i_point_x_offset
-                response_point.z += i_point_z_offset
-            else:
-                raise ValueError("Unknown integration point {i_point + 1}")
-
-            # if (
-            #     np.isclose(element.center().x, 2.170312) and
-            #     np.isclose(element.center().z, 12.8495)
-            # ):
-            #     print()
-            #     print(element.center())
-            #     print(element.length(), element.width())
-            #     print(element.i_point_offset)
-            #     print(response_point)
-
-            # Calculate and record the response.
-            eps11, eps22, _g12, theta11, theta22, theta33, _g13, _g23 = list(
-                el_responses
-            )
-            half_height = element.section.thickness / 2
-            # print(response_point.x, response_point.y, response_point.z)
-            # print(eps11)
-            result_bottom.append(
-                (
-                    (eps11 - (theta11 * half_height)) * -1e6,
-                    Point(x=response_point.x, y=response_point.y, z=response_point.z,),
-                )
-            )
-            result_bottom_z.append(
-                (
-                    (eps22 - (theta22 * half_height)) * -1e6,
-                    Point(x=response_point.x, y=response_point.y, z=response_point.z,),
-                )
-            )
-            result_top.append(
-                (
-                    (eps11 + (theta11 * half_height)) * -1e6,
-                    Point(x=response_point.x, y=response_point.y, z=response_point.z,),
-                )
-            )
-
-    converted_expt_responses[sim_ind][ResponseType.StrainXXB] = result_bottom
-    converted_expt_responses[sim_ind][ResponseType.StrainXXT] = result_top
-    converted_expt_responses[sim_ind][ResponseType.StrainZZB] = result_bottom_z
-    print(len(result_bottom))
+    assert len(elements) == parsed_sim_strain.shape[1]
+    deck, i_points, half_height = i_point_geometry(elements)
+    strain = parsed_sim_strain[:, deck]
+    eps11, eps22 = strain[:, :, 0], strain[:, :, 1]
+    theta11, theta22 = strain[:, :, 3], strain[:, :, 4]
+    points = i_points.reshape(-1, 3)
+
+    converted_expt_responses[sim_ind][ResponseType.StrainXXB] = (
+        ((eps11 - theta11 * half_height) * -1e6).reshape(-1),
+        points,
+    )
+    converted_expt_responses[sim_ind][ResponseType.StrainXXT] = (
+        ((eps11 + theta11 * half_height) * -1e6).reshape(-1),
+        points,
+    )
+    converted_expt_responses[sim_ind][ResponseType.StrainZZB] = (
+        ((eps22 - theta22 * half_height) * -1e6).reshape(-1),
+        points,
+    )
 
 
 def convert_responses_3d(
     c: Config, expt_params: List[SimParams], parsed_expt_responses: Parsed
-) -> Dict[int, Dict[ResponseType, List["Response"]]]:
-    """Convert parsed OpenSees fem to List[Response]."""
-    # A dictionary of simulation index to ResponseType to [Response].
+) -> Dict[int, Dict[ResponseType, ResponseArrays]]:
+    """Convert parsed OpenSees fem to arrays of values and points."""
+    # A dictionary of simulation index to ResponseType to ResponseArrays.
     converted_expt_responses = defaultdict(dict)
     for sim_ind, parsed_sim_responses in parsed_expt_responses.items():
         sim_params = expt_params[sim_ind]
@@ -155,6 +163,7 @@ def convert_responses_3d(
         elements = det_shells(sim_params.bridge_shells)
         del sim_params.bridge_nodes
         del sim_params.bridge_shells
+        points = node_points(nodes)
         # Parse x, y, and z translation fem if necessary.
         for response_type in [
             ResponseType.XTrans,
@@ -162,7 +171,7 @@ def convert_responses_3d(
             ResponseType.ZTrans,
         ]:
             convert_sim_translation_responses(
-                nodes=nodes,
+                points=points,
                 sim_ind=sim_ind,
                 response_type=response_type,
                 parsed_sim_responses=parsed_expt_responses[sim_ind],
@@ -1,5 +1,6 @@
 """Utilities for parsing fem from OpenSees simulations."""
 
+import os
 from typing import List, NewType, Optional, Tuple
 
 import numpy as np
@@ -10,16 +11,71 @@ from bridge_sim.util import print_d
 D: bool = False
 
 
-def opensees_to_numpy(path: str):
-    """Convert OpenSees output to 2d array."""
-    with open(path) as f:
-        x = f.read()
-    # A string per unit time.
-    x = list(filter(lambda y: len(y) > 0, x.split("\n")))
-    # A list of string per unit time.
-    for i in range(len(x)):
-        x[i] = list(map(float, x[i].split()))
-    return np.array(x)
+def opensees_to_numpy(
+    path: str, row: Optional[int] = None, binary: bool = False, steps: int = 1
+) -> np.ndarray:
+    """Convert OpenSees output to 2d array, one row per analysis step.
+
+    Args:
+        path: path of an OpenSees recorder output file.
+        row: optional, only return this analysis step (as a 2d array).
+        binary: whether the recorder wrote binary ('-binary') output.
+        steps: amount of analysis steps, only required for binary output.
+
+    """
+    if binary:
+        responses = opensees_binary_to_numpy(path=path, steps=steps)
+    else:
+        responses = np.loadtxt(path, dtype=np.float64, ndmin=2)
+    if row is not None:
+        responses = responses[row : row + 1]
+    return responses
+
+
+def opensees_binary_to_numpy(path: str, steps: int = 1) -> np.ndarray:
+    """Memory-map binary OpenSees output as a read-only 2d array.
+
+    A binary recorder writes each analysis step as raw doubles, followed by a
+    newline character. Files without the newline characters are also read.
+
+    Args:
+        path: path of an OpenSees recorder output file.
+        steps: amount of analysis steps recorded in the file.
+
+    """
+    size = os.path.getsize(path)
+    if size % steps != 0:
+        raise ValueError(f"Size of {path} is not a multiple of {steps} steps")
+    step_bytes = size // steps
+    # Each step is terminated by a newline character.
+    if step_bytes % 8 == 1:
+        dtype = np.dtype([("values", "<f8", (step_bytes // 8,)), ("end", "u1")])
+        return np.memmap(path, dtype=dtype, mode="r")["values"]
+    # Each step is only raw doubles.
+    if step_bytes % 8 == 0:
+        return np.memmap(path, dtype="<f8", mode="r").reshape(steps, -1)
+    raise ValueError(f"Unexpected size of binary OpenSees output {path}")
+
+
+def opensees_strains_to_numpy(
+    path: str, row: Optional[int] = None, binary: bool = False, steps: int = 1
+) -> np.ndarray:
+    """Convert OpenSees shell section deformation output to an (N, 8) array.
+
+    Each row of the result is the 8 section deformations of one element at one
+    analysis step, ordered by analysis step and then by element.
+
+    Args:
+        path: path of an OpenSees element recorder output file.
+        row: optional, only return this analysis step.
+        binary: whether the recorder wrote binary ('-binary') output.
+        steps: amount of analysis steps, only required for binary output.
+
+    """
+    strains = opensees_to_numpy(path=path, row=row, binary=binary, steps=steps)
+    if strains.size % 8 != 0:
+        raise ValueError("Unexpected length of parsed strains")
+    return strains.reshape(-1, 8)
 
 
 # A tuple of collected stress or strain response.
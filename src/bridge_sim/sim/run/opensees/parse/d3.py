@@ -2,14 +2,17 @@
 
 from collections import defaultdict
 from timeit import default_timer as timer
-from typing import List
+from typing import List, Optional
 
 import numpy as np
 
 from bridge_sim.model import Config, ResponseType, RT
 from bridge_sim.sim.model import SimParams
 from bridge_sim.sim.run import Parsed
-from bridge_sim.sim.run.opensees.parse.common import opensees_to_numpy
+from bridge_sim.sim.run.opensees.parse.common import (
+    opensees_strains_to_numpy,
+    opensees_to_numpy,
+)
 from bridge_sim.util import print_i
 
 
@@ -19,14 +22,25 @@ def parse_translation_responses_3d(
     sim_ind: int,
     responses_path: str,
     response_type: ResponseType,
+    row: Optional[int] = None,
+    binary: bool = False,
+    steps: int = 1,
 ):
-    """Parse translation fem from a 3D OpenSees simulation."""
+    """Parse translation fem from a 3D OpenSees simulation.
+
+    If 'row' is given then only that analysis step is kept, this is the case
+    for a simulation that was run as part of a batch. If 'binary' then the
+    output was recorded in binary format, over the given amount of steps.
+
+    """
     print(f"response_type = {response_type}")
     if response_type not in [RT.XTrans, RT.YTrans, RT.ZTrans]:
         raise ValueError("Must be translation response type")
     start = timer()
-    translation_responses = opensees_to_numpy(responses_path)
-    translation_responses *= -1
+    translation_responses = opensees_to_numpy(
+        path=responses_path, row=row, binary=binary, steps=steps
+    )
+    translation_responses = translation_responses * -1
     print_i(
         f"OpenSees: Parsed {response_type.name()} fem in" + f" {timer() - start:.2f}s"
     )
@@ -34,23 +48,29 @@ def parse_translation_responses_3d(
 
 
 def parse_stress_strain_responses_3d(
-    results_dict, sim_params: SimParams, sim_ind: int, response_paths: List[str],
+    results_dict,
+    sim_params: SimParams,
+    sim_ind: int,
+    response_paths: List[str],
+    row: Optional[int] = None,
+    binary: bool = False,
+    steps: int = 1,
 ):
-    """Parse stress or strain fem from a 3D OpenSees simulation."""
-    lines = []
-    for response_path in response_paths:
-        with open(response_path) as f:
-            new_lines = f.read()
-            if new_lines.endswith("\n"):
-                new_lines = new_lines[:-1]
-            new_lines = list(map(float, new_lines.split()))
-            sections = len(new_lines) / 8
-            if int(len(new_lines)) / 8 != sections:
-                raise ValueError("Unexpected length of parsed strains")
-            per_element_lines = np.array_split(new_lines, sections)
-            lines.append(per_element_lines)
-    lines = np.array(lines)
-    print(lines.shape)
+    """Parse stress or strain fem from a 3D OpenSees simulation.
+
+    If 'row' is given then only that analysis step is kept, this is the case
+    for a simulation that was run as part of a batch. If 'binary' then the
+    output was recorded in binary format, over the given amount of steps.
+
+    """
+    start = timer()
+    lines = np.stack(
+        [
+            opensees_strains_to_numpy(path=path, row=row, binary=binary, steps=steps)
+            for path in response_paths
+        ]
+    )
+    print_i(f"OpenSees: Parsed strain fem in {timer() - start:.2f}s")
     results_dict[sim_ind][ResponseType.StrainXXB] = lines
 
 
@@ -62,6 +82,10 @@ def parse_responses_3d(
     results_dict = defaultdict(dict)
     for sim_ind, fem_params in enumerate(expt_params):
         print(f"Parsing, sim_ind = {sim_ind}")
+        # Simulations run in a batch are parsed from the batch's output files.
+        row, steps = None, 1
+        if getattr(fem_params, "batch", None) is not None:
+            fem_params, row, steps = fem_params.batch
         # Parse x translation fem if necessary.
         parse_translation_responses_3d(
             results_dict=results_dict,
@@ -69,6 +93,9 @@ def parse_responses_3d(
             sim_ind=sim_ind,
             responses_path=os_runner.x_translation_path(fem_params),
             response_type=ResponseType.XTrans,
+            row=row,
+            binary=c.os_binary_recorders,
+            steps=steps,
         )
         # Parse y translation fem if necessary.
         parse_translation_responses_3d(
@@ -77,6 +104,9 @@ def parse_responses_3d(
             sim_ind=sim_ind,
             responses_path=os_runner.y_translation_path(fem_params),
             response_type=ResponseType.YTrans,
+            row=row,
+            binary=c.os_binary_recorders,
+            steps=steps,
         )
         # Parse z translation fem if necessary.
         parse_translation_responses_3d(
@@ -85,6 +115,9 @@ def parse_responses_3d(
             sim_ind=sim_ind,
             responses_path=os_runner.z_translation_path(fem_params),
             response_type=ResponseType.ZTrans,
+            row=row,
+            binary=c.os_binary_recorders,
+            steps=steps,
         )
         # Parse strain fem if necessary.
         parse_stress_strain_responses_3d(
@@ -92,5 +125,8 @@ def parse_responses_3d(
             sim_params=fem_params,
             sim_ind=sim_ind,
             response_paths=[os_runner.strain_path(fem_params, i) for i in [1, 2, 3, 4]],
+            row=row,
+            binary=c.os_binary_recorders,
+            steps=steps,
         )
     return results_dict
@@ -0,0 +1,38 @@
+"""Output format of the recorders in OpenSees model files.
+
+By default recorders write ASCII output, which is easy to inspect when
+debugging. With 'Config.os_binary_recorders' recorders instead write binary
+output (OpenSees '-binary'), which is smaller on disk and is memory-mapped
+when parsing instead of being parsed from text.
+
+"""
+
+import re
+from typing import List
+
+from bridge_sim.model import Config
+from bridge_sim.sim.model import SimParams
+from bridge_sim.sim.run import FEMRunner
+from bridge_sim.sim.run.opensees.build import build_model
+
+_file_re = re.compile(r"^(\s*recorder\s.*?\s)-file(\s)", re.MULTILINE)
+
+
+def binary_recorders(tcl: str) -> str:
+    """Change each recorder in a model file to write binary output."""
+    return _file_re.sub(r"\1-binary\2", tcl)
+
+
+def build_model_with_recorders(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner
+) -> List[SimParams]:
+    """Build model files, with binary recorders if 'Config.os_binary_recorders'."""
+    expt_params = build_model(c=c, expt_params=expt_params, fem_runner=fem_runner)
+    if c.os_binary_recorders:
+        for sim_params in expt_params:
+            model_path = fem_runner.sim_model_path(sim_params=sim_params, ext="tcl")
+            with open(model_path) as f:
+                tcl = f.read()
+            with open(model_path, "w") as f:
+                f.write(binary_recorders(tcl))
+    return expt_params
@@ -0,0 +1,185 @@
+"""Run FE simulations in-process, with SciPy sparse matrices.
+
+The same shell mesh is built as for OpenSees, then the stiffness matrix is
+assembled and factorized in-process and each simulation is one linear solve.
+No model or output files are written, so no external FE program is required.
+The model of recently simulated meshes is kept in memory, so simulations on the
+same mesh (e.g. each pier settlement) share one factorization. Unit load
+matrices are computed directly from one factorization, see
+'bridge_sim.sim.run.sparse.ulm', as are dynamic responses to traffic, see
+'bridge_sim.sim.run.sparse.modal'. Reduced-order surrogates for fast
+re-analysis are built by 'bridge_sim.sim.run.sparse.rom'.
+
+Units are meters and Newtons. Responses follow the convention of the OpenSees
+FEMRunner, which negates translations and strains relative to the axes of the
+model: translation in y direction is positive downwards and compressive strain
+is positive.
+
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from bridge_sim.model import Bridge, Config, ResponseType
+from bridge_sim.sim.build import det_nodes, det_shells
+from bridge_sim.sim.model import ResponseArrays, Shell, SimParams
+from bridge_sim.sim.run import FEMRunner, Parsed
+from bridge_sim.sim.run.opensees.convert.d3 import (
+    convert_sim_translation_responses,
+    i_point_geometry,
+    node_points,
+)
+from bridge_sim.sim.run.sparse.build import build_mesh, i_point_order, sim_loads
+from bridge_sim.sim.run.sparse.build import sim_model
+from bridge_sim.sim.run.sparse.modal import dynamic_responses
+from bridge_sim.sim.run.sparse.rom import surrogate
+from bridge_sim.sim.run.sparse.ulm import (
+    RESPONSE_SIGN,
+    unit_load_matrices,
+    unit_load_matrix,
+)
+
+
+def sparse_supported_response_types(bridge: Bridge) -> List[ResponseType]:
+    """The response types supported by the sparse FEMRunner."""
+    return [
+        ResponseType.XTrans,
+        ResponseType.YTrans,
+        ResponseType.ZTrans,
+        ResponseType.StrainXXB,
+        ResponseType.StrainXXT,
+        ResponseType.StrainZZB,
+    ]
+
+
+def build_model_sparse(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner
+) -> List[SimParams]:
+    """Build the mesh of each simulation, attached to its parameters."""
+    for sim_params in expt_params:
+        build_mesh(c=c, sim_params=sim_params)
+    return expt_params
+
+
+def run_model_sparse(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner, sim_ind: int
+) -> List[SimParams]:
+    """Solve one simulation, attaching its responses to its parameters.
+
+    Responses are attached in the format that 'parse_responses_sparse' returns.
+
+    """
+    sim_params = expt_params[sim_ind]
+    nodes, shells, bottoms, model = sim_model(c=c, sim_params=sim_params)
+    loads, displacements = sim_loads(
+        c=c, sim_params=sim_params, nodes=nodes, bottoms=bottoms, model=model
+    )
+    u = model.solve(loads=loads, displacements=displacements).reshape(-1, 6)
+    deformations = model.deformations(u.reshape(-1))
+    order = i_point_order(model)
+    sim_params.sparse_responses = {
+        ResponseType.XTrans: u[:, 0] * RESPONSE_SIGN,
+        ResponseType.YTrans: u[:, 1] * RESPONSE_SIGN,
+        ResponseType.ZTrans: u[:, 2] * RESPONSE_SIGN,
+        ResponseType.StrainXXB: deformations[order, np.arange(len(shells))],
+    }
+    return expt_params
+
+
+def parse_responses_sparse(
+    c: Config, expt_params: List[SimParams], fem_runner: FEMRunner
+) -> Parsed:
+    """Responses of each simulation, by simulation index and response type.
+
+    Translations are arrays of shape (N,), one value per node. Section
+    deformations of shells are one array of shape (4, M, 8), see
+    'bridge_sim.sim.run.sparse.shell'.
+
+    """
+    results_dict = defaultdict(dict)
+    for sim_ind, sim_params in enumerate(expt_params):
+        results_dict[sim_ind] = sim_params.sparse_responses
+        del sim_params.sparse_responses
+    return results_dict
+
+
+def convert_strain_responses_sparse(
+    elements: List[Shell],
+    sim_ind: int,
+    parsed_sim_responses: Dict[ResponseType, np.ndarray],
+    converted_expt_responses: Dict[int, Dict[ResponseType, ResponseArrays]],
+):
+    """Convert section deformations to strain at deck integration points."""
+    deformations = parsed_sim_responses[ResponseType.StrainXXB]
+    deck, i_points, half_height = i_point_geometry(elements)
+    deformations = deformations[:, deck]
+    eps11, eps22 = deformations[:, :, 0], deformations[:, :, 1]
+    kappa11, kappa22 = deformations[:, :, 3], deformations[:, :, 4]
+    points = i_points.reshape(-1, 3)
+    for response_type, strain in [
+        (ResponseType.StrainXXB, eps11 - kappa11 * half_height),
+        (ResponseType.StrainXXT, eps11 + kappa11 * half_height),
+        (ResponseType.StrainZZB, eps22 - kappa22 * half_height),
+    ]:
+        converted_expt_responses[sim_ind][response_type] = (
+            (strain * RESPONSE_SIGN * 1e6).reshape(-1),  # Microstrain.
+            points,
+        )
+
+
+def convert_responses_sparse(
+    c: Config, expt_params: List[SimParams], parsed_expt_responses: Parsed
+) -> Dict[int, Dict[ResponseType, ResponseArrays]]:
+    """Convert parsed responses to arrays of values and points."""
+    converted_expt_responses = defaultdict(dict)
+    for sim_ind, parsed_sim_responses in parsed_expt_responses.items():
+        sim_params = expt_params[sim_ind]
+        nodes = det_nodes(sim_params.bridge_nodes)
+        elements = det_shells(sim_params.bridge_shells)
+        del sim_params.bridge_nodes
+        del sim_params.bridge_shells
+        points = node_points(nodes)
+        for response_type in [
+            ResponseType.XTrans,
+            ResponseType.YTrans,
+            ResponseType.ZTrans,
+        ]:
+            convert_sim_translation_responses(
+                points=points,
+                sim_ind=sim_ind,
+                response_type=response_type,
+                parsed_sim_responses=parsed_sim_responses,
+                converted_expt_responses=converted_expt_responses,
+            )
+        convert_strain_responses_sparse(
+            elements=elements,
+            sim_ind=sim_ind,
+            parsed_sim_responses=parsed_sim_responses,
+            converted_expt_responses=converted_expt_responses,
+        )
+    return converted_expt_responses
+
+
+class SparseRunner(FEMRunner):
+    def __init__(self, c: Config):
+        super().__init__(
+            c=c,
+            name="Sparse",
+            exe_path=None,
+            supported_response_types=sparse_supported_response_types,
+            build=build_model_sparse,
+            run=run_model_sparse,
+            parse=parse_responses_sparse,
+            convert=convert_responses_sparse,
+            unit_load_matrix=unit_load_matrix,
+            unit_load_matrices=unit_load_matrices,
+            dynamic_responses=dynamic_responses,
+            surrogate=surrogate,
+            version=1,
+        )
+
+
+def sparse_runner() -> Callable[["Config"], SparseRunner]:
+    return lambda c: SparseRunner(c=c)
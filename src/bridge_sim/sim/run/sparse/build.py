@@ -0,0 +1,202 @@
+"""Models and loads of simulations, for the sparse FE runner."""
+
+import threading
+from collections import OrderedDict
+from timeit import default_timer as timer
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bridge_sim.model import Config
+from bridge_sim.sim.build import (
+    det_nodes,
+    det_shells,
+    get_bridge_nodes,
+    get_bridge_shells,
+)
+from bridge_sim.sim.model import Node, Shell, SimParams
+from bridge_sim.sim.run.opensees.convert.d3 import I_POINT_SIGNS, node_points
+from bridge_sim.sim.run.sparse import shell
+from bridge_sim.sim.run.sparse.model import ShellModel
+from bridge_sim.sim.store import mesh_digest
+from bridge_sim.util import flatten, print_i, round_m
+
+# Models of recently simulated meshes, by digest of the model's arrays.
+_model_cache: Dict[str, ShellModel] = OrderedDict()
+_MODEL_CACHE_SIZE = 4
+_model_cache_lock = threading.Lock()
+
+
+def build_mesh(c: Config, sim_params: SimParams):
+    """Build the mesh of a simulation, attached to its parameters."""
+    ctx = sim_params.build_ctx()
+    sim_params.bridge_nodes = get_bridge_nodes(bridge=c.bridge, ctx=ctx)
+    sim_params.bridge_shells = get_bridge_shells(bridge=c.bridge, ctx=ctx)
+
+
+def pier_bottoms(sim_params: SimParams, index: Dict[int, int]) -> List[np.ndarray]:
+    """Index of each node at the bottom of each pier."""
+    bottoms = []
+    for pier_nodes in sim_params.bridge_nodes[1]:
+        pier_nodes = flatten(pier_nodes, Node)
+        min_y = min(node.y for node in pier_nodes)
+        bottoms.append(
+            np.array(
+                [index[n.n_id] for n in pier_nodes if np.isclose(n.y, min_y)],
+                dtype=np.int64,
+            )
+        )
+    return bottoms
+
+
+def fixed_dofs(
+    c: Config, sim_params: SimParams, nodes: List[Node], bottoms: List[np.ndarray]
+) -> np.ndarray:
+    """Fixed degrees of freedom of each node, as a boolean array of shape (N, 6).
+
+    Deck nodes at each end of the bridge are fixed in y and z translation. The
+    nodes at the bottom of each pier are fixed as specified by the pier's
+    'Support', and settled piers are always fixed in y translation.
+
+    """
+    fixed = np.zeros((len(nodes), 6), dtype=bool)
+    x = np.array([node.x for node in nodes])
+    deck = np.array([node.deck for node in nodes], dtype=bool)
+    ends = deck & (np.isclose(x, c.bridge.x_min) | np.isclose(x, c.bridge.x_max))
+    fixed[ends, 1:3] = True
+    for support, bottom in zip(c.bridge.supports, bottoms):
+        fixed[bottom] = [
+            support.fix_x_translation,
+            support.fix_y_translation,
+            support.fix_z_translation,
+            support.fix_x_rotation,
+            support.fix_y_rotation,
+            support.fix_z_rotation,
+        ]
+    for ps in sim_params.pier_settlement:
+        fixed[bottoms[ps.pier], 1] = True
+    return fixed
+
+
+def shell_model(
+    c: Config,
+    sim_params: SimParams,
+    nodes: List[Node],
+    shells: List[Shell],
+    bottoms: List[np.ndarray],
+) -> ShellModel:
+    """The model of a built mesh, from cache if recently simulated."""
+    index = {node.n_id: i for i, node in enumerate(nodes)}
+    points = node_points(nodes)
+    elements = np.array(
+        [[index[n_id] for n_id in s.node_ids()] for s in shells], dtype=np.int64
+    ).reshape(-1, 4)
+    # Young's modulus is given in MPa.
+    sections = np.array(
+        [
+            (
+                s.section.thickness,
+                s.section.youngs * 1e6,
+                s.section.youngs_x() * 1e6,
+                s.section.poissons,
+            )
+            for s in shells
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    up = np.array([not s.pier for s in shells], dtype=bool)
+    fixed = fixed_dofs(c=c, sim_params=sim_params, nodes=nodes, bottoms=bottoms)
+    digest = mesh_digest(
+        np.concatenate(
+            [points.ravel(), elements.ravel(), sections.ravel(), up, fixed.ravel()]
+        )
+    )
+    with _model_cache_lock:
+        if digest in _model_cache:
+            _model_cache.move_to_end(digest)
+            return _model_cache[digest]
+        start = timer()
+        model = ShellModel(
+            points=points, elements=elements, sections=sections, up=up, fixed=fixed
+        )
+        model.factorize()
+        print_i(
+            f"Sparse: assembled and factorized model of {len(model.free)} degrees"
+            + f" of freedom in {timer() - start:.2f}s"
+        )
+        _model_cache[digest] = model
+        if len(_model_cache) > _MODEL_CACHE_SIZE:
+            _model_cache.popitem(last=False)
+        return model
+
+
+def sim_loads(
+    c: Config,
+    sim_params: SimParams,
+    nodes: List[Node],
+    bottoms: List[np.ndarray],
+    model: ShellModel,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Loads and prescribed displacements of one simulation.
+
+    Point loads act downwards. Pier settlement is a downwards displacement of
+    the bottom of a pier. Thermal loads are a uniform change in temperature of
+    the deck ('axial_delta_temp') and a difference in temperature between the
+    top and bottom of the deck ('moment_delta_temp').
+
+    """
+    loads = np.zeros(model.n_dofs)
+    deck_index = {
+        (round_m(node.x), round_m(node.z)): i
+        for i, node in enumerate(nodes)
+        if node.deck and np.isclose(node.y, 0)
+    }
+    for pload in sim_params.ploads:
+        position = (round_m(pload.x), round_m(pload.z))
+        if position not in deck_index:
+            raise ValueError(f"No deck node for point load {pload}")
+        loads[6 * deck_index[position] + 1] -= pload.load * 1e3  # kN to N.
+
+    displacements = np.zeros(model.n_dofs)
+    for ps in sim_params.pier_settlement:
+        displacements[6 * bottoms[ps.pier] + 1] = -ps.settlement
+
+    thermal = np.zeros((len(model.elements), 8))
+    if sim_params.axial_delta_temp is not None:
+        thermal[:, :2] = c.cte * sim_params.axial_delta_temp
+    if sim_params.moment_delta_temp is not None:
+        thickness = model.sections[:, [0]]
+        thermal[:, 3:5] = c.cte * sim_params.moment_delta_temp / thickness
+    if np.any(thermal):
+        thermal[~model.up] = 0  # Only the deck.
+        loads += model.strain_loads(thermal)
+    return loads, displacements
+
+
+def i_point_order(model: ShellModel) -> np.ndarray:
+    """Gauss points of each element in the order of integration points.
+
+    Integration points are ordered as in 'I_POINT_SIGNS', by the sign of their
+    x and z offset from the center of an element. For deck elements the local
+    axes are x and -z.
+
+    Returns:
+        An integer array of shape (4, M), indexing the Gauss points.
+
+    """
+    offsets = shell.gauss_points(model.local) * [1, -1]  # Shape is (M, 4, 2).
+    return np.argmax(np.einsum("kd,mgd->kmg", I_POINT_SIGNS, offsets), axis=2)
+
+
+def sim_model(
+    c: Config, sim_params: SimParams
+) -> Tuple[List[Node], List[Shell], List[np.ndarray], ShellModel]:
+    """Nodes, shells, pier bottoms and model of a simulation's built mesh."""
+    nodes = det_nodes(sim_params.bridge_nodes)
+    shells = det_shells(sim_params.bridge_shells)
+    index = {node.n_id: i for i, node in enumerate(nodes)}
+    bottoms = pier_bottoms(sim_params=sim_params, index=index)
+    model = shell_model(
+        c=c, sim_params=sim_params, nodes=nodes, shells=shells, bottoms=bottoms
+    )
+    return nodes, shells, bottoms, model
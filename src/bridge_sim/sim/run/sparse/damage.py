@@ -0,0 +1,270 @@
+"""Damaged models as low-rank updates of a healthy model.
+
+Damage that only changes the material of some elements, e.g. a crack which
+halves Young's modulus along the deck ('CrackedScenario'), changes the
+stiffness matrix 'K' by a matrix of low rank 'U C U^T'. Each column of 'U' is
+a mode of the change in stiffness of one damaged element, and 'C' is diagonal.
+By the Sherman-Morrison-Woodbury identity
+
+    (K + U C U^T)^-1 = K^-1 - K^-1 U (C^-1 + U^T K^-1 U)^-1 U^T K^-1,
+
+so the damaged model is solved with the healthy model's factorization and one
+solve per column of 'U', instead of assembling and factorizing a new model.
+
+The damaged model has the mesh of the healthy model, each deck element takes
+the section of the damaged bridge at the element's center.
+
+"""
+
+from timeit import default_timer as timer
+from typing import List, Optional
+
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import csc_matrix, csr_matrix, hstack
+
+from bridge_sim.model import Bridge
+from bridge_sim.sim.run.sparse import shell
+from bridge_sim.sim.run.sparse.model import ShellModel
+from bridge_sim.util import print_i
+
+# Modes of a change in element stiffness smaller than this fraction of the
+# element's largest mode are ignored.
+RANK_TOL = 1e-9
+
+
+def _deck_sections(model: ShellModel, bridge: Bridge) -> np.ndarray:
+    """Sections of a model's elements, with the deck sections of a bridge.
+
+    Each deck element takes the first of the bridge's sections that contains
+    the element's center, as 'Bridge.deck_section_at'.
+
+    """
+    if callable(bridge.sections):
+        raise NotImplementedError()
+    sections = model.sections.copy()
+    deck = np.flatnonzero(model.up)
+    centers = model.points[model.elements[deck]].mean(axis=1)
+    x_frac = np.interp(centers[:, 0], [bridge.x_min, bridge.x_max], [0, 1])
+    z_frac = np.interp(centers[:, 2], [bridge.z_min, bridge.z_max], [0, 1])
+
+    def at_least(a, b):
+        return (a > b) | np.isclose(a, b)
+
+    found = np.zeros(len(deck), dtype=bool)
+    for section in bridge.sections:
+        contains = (
+            ~found
+            & at_least(x_frac, section.start_x_frac)
+            & at_least(section.end_x_frac, x_frac)
+            & at_least(z_frac, section.start_z_frac)
+            & at_least(section.end_z_frac, z_frac)
+        )
+        if len(bridge.sections) == 1:
+            contains[:] = True
+        # Young's modulus is given in MPa.
+        sections[deck[contains]] = (
+            section.thickness,
+            section.youngs * 1e6,
+            section.youngs_x() * 1e6,
+            section.poissons,
+        )
+        found |= contains
+    if not np.all(found):
+        raise ValueError(f"No section for x, z = {centers[~found][0, [0, 2]]}")
+    return sections
+
+
+def damaged_sections(
+    model: ShellModel, bridge: Bridge, damaged_bridge: Bridge
+) -> np.ndarray:
+    """Sections of a model's elements, with the deck of a damaged bridge.
+
+    Only the sections of elements that differ between the bridge and the
+    damaged bridge are changed.
+
+    Args:
+        model: model of the bridge.
+        bridge: the bridge.
+        damaged_bridge: the damaged bridge.
+
+    Returns:
+        An array of shape (M, 4), see 'ShellModel'.
+
+    """
+    healthy = _deck_sections(model=model, bridge=bridge)
+    damaged = _deck_sections(model=model, bridge=damaged_bridge)
+    changed = np.any(healthy != damaged, axis=1)
+    return np.where(changed[:, np.newaxis], damaged, model.sections)
+
+
+class DamageUpdate:
+    """A damaged model, solved with the factorization of a healthy model.
+
+    Args:
+        model: the healthy model.
+        sections: array of shape (M, 4), the section of each element of the
+            damaged model (see 'ShellModel').
+
+    """
+
+    def __init__(self, model: ShellModel, sections: np.ndarray):
+        self.model = model
+        self.sections = np.asarray(sections, dtype=np.float64)
+        self.elements = np.flatnonzero(np.any(self.sections != model.sections, axis=1))
+        # Change in stiffness of each damaged element, in global coordinates.
+        local, rotation = model.local[self.elements], model.rotation[self.elements]
+        delta = shell.stiffness(local, shell.constitutive(self.sections[self.elements]))
+        delta -= shell.stiffness(local, model.d[self.elements])
+        delta = shell.to_global(rotation, delta)
+        # Modes of each element's change in stiffness, one column of U each.
+        values, vectors = np.linalg.eigh(delta)
+        scale = np.abs(values).max(axis=1, initial=0, keepdims=True)
+        element, mode = np.nonzero(np.abs(values) > RANK_TOL * scale)
+        self.rank = len(mode)
+        self.c = values[element, mode]
+        # Damaged element of each column of U.
+        self._column_elements = self.elements[element]
+        u = csc_matrix(
+            (
+                vectors[element, :, mode].reshape(-1),
+                (
+                    model.dofs[self.elements[element]].reshape(-1),
+                    np.repeat(np.arange(self.rank), 24),
+                ),
+            ),
+            shape=(model.n_dofs, self.rank),
+        )
+        # Rows of U of free and of fixed degrees of freedom.
+        self._free = csc_matrix(u.multiply(~model.fixed[:, np.newaxis]))
+        self._fixed = csc_matrix(u.multiply(model.fixed[:, np.newaxis]))
+        self._z = None
+        self._m = None
+
+    def factorize(self):
+        """Solve for K^-1 U and factorize the capacitance matrix, once."""
+        if self._z is None:
+            self._z = self.model.solve(self._free.toarray())
+            m = np.diag(1 / self.c) + self._free.T @ self._z
+            self._m = lu_factor(m)
+        return self._z, self._m
+
+    def solve(
+        self, loads: np.ndarray, displacements: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Displacement of each degree of freedom of the damaged model.
+
+        Args and return value are as for 'ShellModel.solve'.
+
+        """
+        loads = np.asarray(loads, dtype=np.float64)
+        if self.rank == 0:
+            return self.model.solve(loads=loads, displacements=displacements)
+        z, m = self.factorize()
+        if displacements is not None:
+            # Change in loads from the prescribed displacements.
+            fixed = self._fixed.T @ np.asarray(displacements)
+            c = self.c if fixed.ndim == 1 else self.c[:, np.newaxis]
+            loads = loads - self._free @ (c * fixed)
+        u = self.model.solve(loads=loads, displacements=displacements)
+        return u - z @ lu_solve(m, self._free.T @ u)
+
+    def unit_loads(
+        self, healthy: np.ndarray, loads: csc_matrix, sample: csr_matrix
+    ) -> np.ndarray:
+        """Damaged unit load matrix, from the healthy unit load matrix.
+
+        Args:
+            healthy: array of shape (L, P), the healthy response at each point
+                to each column of loads.
+            loads: array of shape (6N, L), loads of each load position.
+            sample: array of shape (P, 6N), the linear map from displacements
+                to responses at each point.
+
+        Returns:
+            An array of shape (L, P).
+
+        """
+        if self.rank == 0:
+            return healthy.copy()
+        z, m = self.factorize()
+        return healthy - (loads.T @ z) @ lu_solve(m, (sample @ z).T)
+
+
+def sweep_unit_loads(
+    updates: List[DamageUpdate],
+    healthy: np.ndarray,
+    loads: csc_matrix,
+    sample: csr_matrix,
+    block_size: int,
+) -> np.ndarray:
+    """Damaged unit load matrices of many damaged models of one healthy model.
+
+    As 'DamageUpdate.unit_loads' for each update, but an element with the same
+    damaged section in many updates (e.g. overlapping cracks) is solved for
+    once. The columns of 'U' of all updates are solved for in blocks of
+    'block_size'.
+
+    Args:
+        updates: damaged models of the same healthy model.
+        healthy: array of shape (L, P), the healthy response at each point to
+            each column of loads.
+        loads: array of shape (6N, L), loads of each load position.
+        sample: array of shape (P, 6N), the linear map from displacements to
+            responses at each point.
+        block_size: columns of 'U' solved for at once.
+
+    Returns:
+        An array of shape (len(updates), L, P).
+
+    """
+    result = np.empty((len(updates),) + healthy.shape)
+    if len(updates) == 0:
+        return result
+    model = updates[0].model
+    # Columns of each distinct damaged element, and of each update.
+    distinct, blocks, columns, n = dict(), [], [], 0
+    for update in updates:
+        update_columns = [np.empty(0, dtype=np.int64)]
+        for e in update.elements:
+            key = (e, update.sections[e].tobytes())
+            if key not in distinct:
+                element_columns = np.flatnonzero(update._column_elements == e)
+                distinct[key] = np.arange(n, n + len(element_columns))
+                n += len(element_columns)
+                blocks.append(update._free[:, element_columns])
+            update_columns.append(distinct[key])
+        columns.append(np.concatenate(update_columns))
+    print_i(
+        f"Sparse: {n} distinct damage modes of {len(distinct)} damaged elements"
+        + f" in {len(updates)} damaged models"
+    )
+
+    # K^-1 U of each distinct column, kept only as needed by each update.
+    u = hstack(blocks, format="csc") if n > 0 else csc_matrix((model.n_dofs, 0))
+    dofs = np.unique(u.indices)
+    u_dofs = u[dofs]
+    loads_z = np.empty((loads.shape[1], n))
+    sample_z = np.empty((sample.shape[0], n))
+    z_dofs = np.empty((len(dofs), n))
+    for start in range(0, n, block_size):
+        block_start = timer()
+        block = slice(start, min(start + block_size, n))
+        z = model.solve(u[:, block].toarray())
+        loads_z[:, block] = loads.T @ z
+        sample_z[:, block] = sample @ z
+        z_dofs[:, block] = z[dofs]
+        print_i(
+            f"Sparse: damage modes {block.start + 1}-{block.stop}/{n}"
+            + f" in {timer() - block_start:.2f}s"
+        )
+
+    for i, (update, cols) in enumerate(zip(updates, columns)):
+        if update.rank == 0:
+            result[i] = healthy
+            continue
+        m = np.diag(1 / update.c) + u_dofs[:, cols].T @ z_dofs[:, cols]
+        result[i] = healthy - loads_z[:, cols] @ lu_solve(
+            lu_factor(m), sample_z[:, cols].T
+        )
+    return result
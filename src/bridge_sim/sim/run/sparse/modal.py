@@ -0,0 +1,219 @@
+"""Dynamic responses to moving loads, by modal superposition.
+
+The lowest 'Config.dynamic_modes' modes of vibration of the model are computed
+once, by a sparse eigen-solve that reuses the factorization of the stiffness
+matrix. For a history of loads, e.g. a 'TrafficArray', each modal equation
+
+    x'' + 2 zeta omega x' + omega^2 x = p(t)
+
+is integrated exactly for loads that vary linearly over each time step, for all
+modes at once. Responses are computed by the mode-acceleration method: the
+static response from the unit load matrix, plus the dynamic part of each
+mode's response. So the static response is exact however few modes are used.
+
+Mass is lumped at the nodes. Densities of sections are given in tonnes per
+cubic meter (as for bridge 705).
+
+"""
+
+from timeit import default_timer as timer
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.linalg import expm
+from scipy.sparse import diags
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+from bridge_sim.model import Config, Point, ResponseType
+from bridge_sim.scenarios import CrackedScenario
+from bridge_sim.sim.model import Shell
+from bridge_sim.sim.run.sparse import shell
+from bridge_sim.sim.run.sparse.damage import damaged_sections
+from bridge_sim.sim.run.sparse.model import ShellModel
+from bridge_sim.sim.run.sparse.ulm import operators, static_unit_loads
+from bridge_sim.util import print_i
+
+
+def lumped_mass(model: ShellModel, density: np.ndarray) -> np.ndarray:
+    """Mass of each degree of freedom, with each element's mass at its nodes.
+
+    Each node of an element has a quarter of the element's mass, and a quarter
+    of the element's rotational inertia about each axis.
+
+    Args:
+        model: model of a bridge.
+        density: array of shape (M,), density of each element in kg/m^3.
+
+    Returns:
+        An array of shape (6N,).
+
+    """
+    _, det = shell.strain_displacement(model.local)
+    area = np.abs(det).sum(axis=1)
+    thickness = model.sections[:, 0]
+    mass = density * thickness * area / 4
+    inertia = density * thickness ** 3 / 12 * area / 4
+    per_node = np.repeat([mass, inertia], 3, axis=0).T  # Shape is (M, 6).
+    return np.bincount(
+        model.dofs.reshape(-1),
+        weights=np.repeat(per_node[:, np.newaxis], 4, axis=1).reshape(-1),
+        minlength=model.n_dofs,
+    )
+
+
+def modes(
+    model: ShellModel, mass: np.ndarray, n_modes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """The lowest modes of vibration of a model.
+
+    Args:
+        model: model of a bridge.
+        mass: array of shape (6N,), mass of each degree of freedom.
+        n_modes: amount of modes.
+
+    Returns:
+        A tuple of: an array of shape (K,), the angular frequency of each mode
+        in rad/s; an array of shape (6N, K), the shape of each mode, normalized
+        by mass.
+
+    """
+    lu = model.factorize()
+    n = len(model.free)
+    eigenvalues, vectors = eigsh(
+        model.k[model.free][:, model.free],
+        k=n_modes,
+        M=diags(mass[model.free]).tocsc(),
+        sigma=0,
+        OPinv=LinearOperator((n, n), matvec=lu.solve, dtype=np.float64),
+    )
+    order = np.argsort(eigenvalues)
+    shapes = np.zeros((model.n_dofs, n_modes))
+    shapes[model.free] = vectors[:, order]
+    return np.sqrt(np.abs(eigenvalues[order])), shapes
+
+
+def transitions(
+    omega: np.ndarray, damping_ratio: float, time_step: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Exact time step of each modal equation, for linearly varying loads.
+
+    Returns:
+        A tuple of arrays of shape (K, 2, 2), (K, 2) and (K, 2). With 's' the
+        displacement and velocity of a mode at a time step and 'p' the modal
+        load, at the next time step 's' is a @ s + b0 * p + b1 * p_next.
+
+    """
+    k = len(omega)
+    # Continuous state space, extended with the load and its rate of change.
+    system = np.zeros((k, 4, 4))
+    system[:, 0, 1] = 1
+    system[:, 1, 0] = -(omega ** 2)
+    system[:, 1, 1] = -2 * damping_ratio * omega
+    system[:, 1, 2] = 1
+    system[:, :2] *= time_step
+    system[:, 2, 3] = 1
+    exp = expm(system)
+    a, g1, g2 = exp[:, :2, :2], exp[:, :2, 2], exp[:, :2, 3]
+    return a, g1 - g2, g2
+
+
+def modal_displacements(
+    omega: np.ndarray, loads: np.ndarray, damping_ratio: float, time_step: float
+) -> np.ndarray:
+    """Displacement of each mode at each time step, starting at rest.
+
+    Args:
+        omega: array of shape (K,), angular frequency of each mode.
+        loads: array of shape (T, K), the load on each mode at each time step.
+        damping_ratio: damping as a fraction of critical damping.
+        time_step: time between time steps in seconds.
+
+    Returns:
+        An array of shape (T, K).
+
+    """
+    a, b0, b1 = transitions(
+        omega=omega, damping_ratio=damping_ratio, time_step=time_step
+    )
+    result = np.empty(loads.shape)
+    state = np.zeros((len(omega), 2))
+    for t in range(len(loads)):
+        if t > 0:
+            state = (
+                np.einsum("kij,kj->ki", a, state)
+                + b0 * loads[t - 1, :, np.newaxis]
+                + b1 * loads[t, :, np.newaxis]
+            )
+        result[t] = state[:, 0]
+    return result
+
+
+def _density(shells: List[Shell]) -> np.ndarray:
+    """Density of each shell in kg/m^3, given in tonnes per cubic meter."""
+    return np.array([s.section.density * 1e3 for s in shells], dtype=np.float64)
+
+
+def dynamic_responses(
+    c: Config,
+    traffic_array: np.ndarray,
+    response_type: ResponseType,
+    points: List[Point],
+    damage_scenario: Optional[CrackedScenario] = None,
+) -> np.ndarray:
+    """Dynamic response at each point to a history of loads on the wheel tracks.
+
+    Args:
+        c: simulation configuration object, of the healthy bridge.
+        traffic_array: array or sparse matrix of shape (T, L), the load in kN
+            at each load position at each time step, time steps are
+            'Config.sensor_hz' apart. Load positions are as for
+            'unit_load_matrix', for every wheel track of the bridge.
+        response_type: the type of response at each point.
+        points: points on the deck at which to calculate responses.
+        damage_scenario: optional, a crack of the bridge's deck.
+
+    Returns:
+        An array of shape (T, len(points)).
+
+    """
+    wheel_zs = c.bridge.wheel_track_zs(c)
+    model, shells, loads, sample = operators(
+        c=c, response_type=response_type, points=points, wheel_zs=wheel_zs
+    )
+    if damage_scenario is not None:
+        sections = damaged_sections(
+            model=model,
+            bridge=c.bridge,
+            damaged_bridge=damage_scenario.use(c)[0].bridge,
+        )
+        model = ShellModel(
+            points=model.points,
+            elements=model.elements,
+            sections=sections,
+            up=model.up,
+            fixed=model.fixed.reshape(-1, 6),
+        )
+    static = static_unit_loads(c=c, model=model, loads=loads, sample=sample)
+    start = timer()
+    mass = lumped_mass(model=model, density=_density(shells))
+    omega, shapes = modes(model=model, mass=mass, n_modes=c.dynamic_modes)
+    print_i(
+        f"Sparse: {len(omega)} modes from {omega[0] / (2 * np.pi):.2f} Hz to"
+        + f" {omega[-1] / (2 * np.pi):.2f} Hz in {timer() - start:.2f}s"
+    )
+    start = timer()
+    modal_loads = traffic_array @ (loads.T @ shapes)
+    x = modal_displacements(
+        omega=omega,
+        loads=modal_loads,
+        damping_ratio=c.dynamic_damping_ratio,
+        time_step=c.sensor_hz,
+    )
+    # Static response, plus the dynamic part of each mode's response.
+    result = traffic_array @ static
+    result += (x - modal_loads / omega ** 2) @ (sample @ shapes).T
+    print_i(
+        f"Sparse: dynamic responses of {traffic_array.shape[0]} time steps in"
+        + f" {timer() - start:.2f}s"
+    )
+    return result
@@ -0,0 +1,174 @@
+"""Sparse stiffness matrix of a mesh of shell elements."""
+
+from typing import Iterator, Optional
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix, spmatrix
+from scipy.sparse.linalg import splu
+
+from bridge_sim.sim.run.sparse import shell
+
+# Elements per chunk when computing element matrices, bounds memory use.
+CHUNK_SIZE = 4096
+
+
+def _chunks(n: int) -> Iterator[slice]:
+    for start in range(0, n, CHUNK_SIZE):
+        yield slice(start, min(start + CHUNK_SIZE, n))
+
+
+def factorize(k: spmatrix):
+    """Factorize a symmetric positive definite sparse matrix."""
+    # Use an ordering for symmetric matrices and pivot on the diagonal.
+    return splu(
+        k.tocsc(),
+        permc_spec="MMD_AT_PLUS_A",
+        diag_pivot_thresh=0,
+        options=dict(SymmetricMode=True),
+    )
+
+
+class ShellModel:
+    """A linear FE model of shell elements, with a sparse stiffness matrix.
+
+    The stiffness matrix is factorized once, when first solving, and the
+    factorization is reused by each following solve.
+
+    Args:
+        points: array of shape (N, 3), coordinates of each node.
+        elements: integer array of shape (M, 4), index of each element's nodes.
+        sections: array of shape (M, 4), the thickness (m), Young's modulus
+            (Pa), Young's modulus along the local x axis (Pa) and Poisson's
+            ratio of each element.
+        up: boolean array of shape (M,), true for elements with an upwards
+            normal, i.e. the bottom of the element is in -y direction.
+        fixed: boolean array of shape (N, 6), true for each fixed degree of
+            freedom of each node.
+
+    """
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        elements: np.ndarray,
+        sections: np.ndarray,
+        up: np.ndarray,
+        fixed: np.ndarray,
+    ):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.elements = np.asarray(elements, dtype=np.int64)
+        self.n_dofs = 6 * len(self.points)
+        self.sections = np.asarray(sections, dtype=np.float64)
+        self.up = np.asarray(up, dtype=bool)
+        corners = self.points[self.elements]
+        self.rotation, self.local = shell.frames(corners, self.up)
+        self.d = shell.constitutive(self.sections)
+        # Global degrees of freedom of each element, shape is (M, 24).
+        self.dofs = (6 * self.elements[:, :, np.newaxis] + np.arange(6)).reshape(-1, 24)
+
+        self.k = self.stiffness()
+
+        # Degrees of freedom of nodes without elements are also fixed.
+        self.fixed = np.asarray(fixed, dtype=bool).reshape(-1).copy()
+        self.fixed |= np.isclose(self.k.diagonal(), 0)
+        self.free = np.flatnonzero(~self.fixed)
+        self._lu = None
+
+    def stiffness(self, elements: Optional[np.ndarray] = None) -> csr_matrix:
+        """Stiffness matrix, of all elements or only of the given elements.
+
+        Args:
+            elements: optional, a non-empty integer array of element indices.
+
+        """
+        if elements is None:
+            elements = np.arange(len(self.elements))
+        rows, cols, values = [], [], []
+        for chunk in _chunks(len(elements)):
+            chunk = elements[chunk]
+            k = shell.stiffness(self.local[chunk], self.d[chunk])
+            k = shell.to_global(self.rotation[chunk], k)
+            dofs = self.dofs[chunk]
+            rows.append(np.repeat(dofs, 24, axis=1).reshape(-1))
+            cols.append(np.tile(dofs, (1, 24)).reshape(-1))
+            values.append(k.reshape(-1))
+        return coo_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(self.n_dofs, self.n_dofs),
+        ).tocsr()
+
+    def factorize(self):
+        """Factorize the stiffness matrix of free degrees of freedom, once."""
+        if self._lu is None:
+            self._lu = factorize(self.k[self.free][:, self.free])
+        return self._lu
+
+    def solve(
+        self, loads: np.ndarray, displacements: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Displacement of each degree of freedom under the given loads.
+
+        Args:
+            loads: array of shape (6N,) or (6N, K), the load on each degree of
+                freedom, for one or K load cases.
+            displacements: optional array of the same shape, the prescribed
+                displacement of fixed degrees of freedom (others are ignored).
+
+        Returns:
+            An array of the same shape as 'loads'.
+
+        """
+        loads = np.asarray(loads, dtype=np.float64)
+        lu = self.factorize()
+        u = np.zeros(loads.shape)
+        rhs = loads[self.free]
+        if displacements is not None:
+            u[self.fixed] = np.asarray(displacements)[self.fixed]
+            rhs = rhs - self.k[self.free][:, self.fixed] @ u[self.fixed]
+        u[self.free] = lu.solve(rhs)
+        return u
+
+    def deformations(self, u: np.ndarray) -> np.ndarray:
+        """Generalized strain at each Gauss point of each element.
+
+        Args:
+            u: array of shape (6N,), displacement of each degree of freedom.
+
+        Returns:
+            An array of shape (4, M, 8), indexed by Gauss point, element and
+            generalized strain (see 'bridge_sim.sim.run.sparse.shell').
+
+        """
+        result = np.empty((4, len(self.elements), 8))
+        for chunk in _chunks(len(self.elements)):
+            b, _ = shell.strain_displacement(self.local[chunk])
+            u_local = shell.to_local(self.rotation[chunk], u[self.dofs[chunk]])
+            result[:, chunk] = np.einsum("mgsj,mj->gms", b, u_local)
+        return result
+
+    def strain_loads(self, strain: np.ndarray) -> np.ndarray:
+        """Loads equivalent to imposing a generalized strain, e.g. thermal.
+
+        Args:
+            strain: array of shape (M, 8), the imposed generalized strain of
+                each element.
+
+        Returns:
+            An array of shape (6N,), the load on each degree of freedom.
+
+        """
+        loads = np.zeros(self.n_dofs)
+        for chunk in _chunks(len(self.elements)):
+            b, det = shell.strain_displacement(self.local[chunk])
+            stress = np.einsum("mst,mt->ms", self.d[chunk], strain[chunk])
+            f = np.einsum("mgsi,ms,mg->mi", b, stress, np.abs(det))
+            # Transform element loads to global coordinates.
+            f = np.einsum(
+                "mki,mak->mai", self.rotation[chunk], f.reshape(-1, 8, 3)
+            ).reshape(-1, 24)
+            loads += np.bincount(
+                self.dofs[chunk].reshape(-1),
+                weights=f.reshape(-1),
+                minlength=self.n_dofs,
+            )
+        return loads
@@ -0,0 +1,467 @@
+"""Reduced-order surrogates of a bridge, for fast re-analysis.
+
+The elements of a model are grouped by section, e.g. each material of the deck
+and the piers. Scaling both Young's moduli of a section scales its stiffness,
+so with 'mu' the scale of each group's stiffness the stiffness matrix is
+
+    K(mu) = sum_g mu_g K_g.
+
+Offline, a reduced basis 'V' is computed from the displacements under the
+loads of each wheel track position, the unit thermal loads and the adjoint
+loads of each point (see 'bridge_sim.sim.run.sparse.ulm'), at each of a few
+training scales. Online, the projected model V^T K(mu) V a = V^T f(mu) is
+assembled from projected matrices and solved, in time independent of the size
+of the mesh.
+
+The error of a surrogate is bounded by residuals, whose norms are also
+computed from projected matrices. With 's' the map from displacements to the
+response at a point, 'r' the residual f(mu) - K(mu) V a of a load and 'r_s'
+the residual s^T - K(mu) V b of the adjoint load, the error of the response is
+at most |r| min(|r_s|, |s|) / lambda_min(K(mu)). As each K_g is positive
+semi-definite, lambda_min(K(mu)) is at least min_g(mu_g) lambda_min(K(1)).
+Each surrogate is also validated against the full model at random scales.
+
+Prescribed displacements (pier settlement) are not supported. A surrogate is
+of the mesh of one Config, so of one maximum shell length ('msl').
+
+"""
+
+import itertools
+import os
+from timeit import default_timer as timer
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.linalg import qr, solve
+from scipy.sparse import csc_matrix, hstack
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+from bridge_sim.model import Config, Point, ResponseType
+from bridge_sim.sim.run.sparse.model import ShellModel, factorize
+from bridge_sim.sim.run.sparse.ulm import operators
+from bridge_sim.util import atomic_write, print_i, shorten_path
+
+# Relative round-off error of the norm of a residual, computed from projected
+# terms as the square root of a difference of squares.
+ROUND_OFF = np.sqrt(np.finfo(np.float64).eps)
+
+
+def groups(model: ShellModel) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Groups of a model's elements with the same section, deck or pier.
+
+    Returns:
+        A tuple of: an integer array of shape (M,), the group of each element;
+        an array of shape (G, 4), the section of each group (see 'ShellModel');
+        a boolean array of shape (G,), true for groups of pier elements.
+
+    """
+    keys = np.column_stack([model.sections, model.up])
+    keys, labels = np.unique(keys, axis=0, return_inverse=True)
+    return labels.reshape(-1), keys[:, :4], keys[:, 4] == 0
+
+
+def thermal_loads(
+    c: Config, model: ShellModel, labels: np.ndarray, n_groups: int
+) -> np.ndarray:
+    """Loads of the unit thermal loads of the deck, of each group's elements.
+
+    The unit thermal loads are a uniform change in temperature of the deck of
+    'Config.unit_axial_delta_temp_c', and a difference in temperature between
+    the top and bottom of the deck of 'Config.unit_moment_delta_temp_c', as in
+    'bridge_sim.sim.run.sparse.build.sim_loads'.
+
+    Returns:
+        An array of shape (G, 6N, 2), the uniform and the linear thermal load of
+        each group at nominal stiffness.
+
+    """
+    strains = np.zeros((2, len(model.elements), 8))
+    strains[0, :, :2] = c.cte * c.unit_axial_delta_temp_c
+    thickness = model.sections[:, [0]]
+    strains[1, :, 3:5] = c.cte * c.unit_moment_delta_temp_c / thickness
+    strains[:, ~model.up] = 0  # Only the deck.
+    result = np.zeros((n_groups, model.n_dofs, 2))
+    for g in np.unique(labels[model.up]):
+        for i, strain in enumerate(strains):
+            result[g, :, i] = model.strain_loads(
+                np.where(labels[:, None] == g, strain, 0)
+            )
+    return result
+
+
+def extend_basis(
+    basis: Optional[np.ndarray], snapshots: np.ndarray, tol: float
+) -> np.ndarray:
+    """Orthonormal basis extended by the part of each snapshot not in its span.
+
+    Snapshots are normalized first, a part of a snapshot is added if its norm is
+    at least 'tol', by QR decomposition with column pivoting.
+
+    Args:
+        basis: optional, array of shape (n, r) with orthonormal columns.
+        snapshots: array of shape (n, k).
+        tol: relative tolerance.
+
+    Returns:
+        An array of shape (n, r'), where r' >= r.
+
+    """
+    norms = np.linalg.norm(snapshots, axis=0)
+    snapshots = snapshots[:, norms > 0] / norms[norms > 0]
+    if basis is None:
+        basis = np.empty((len(snapshots), 0))
+    # Orthogonalize twice, for numerical stability.
+    for _ in range(2):
+        snapshots = snapshots - basis @ (basis.T @ snapshots)
+    q, r, _ = qr(snapshots, mode="economic", pivoting=True)
+    rank = np.count_nonzero(np.abs(np.diag(r)) >= tol)
+    return np.hstack([basis, q[:, :rank]])
+
+
+class Surrogate:
+    """A reduced-order model of a bridge, see module documentation.
+
+    Responses are computed at the scales 'mu' of each group's stiffness, an
+    array of shape (G,) with 1 the stiffness of the model it was built from.
+    The sections of each group are in 'sections' and pier groups are marked in
+    'piers'. A surrogate is built by 'build_surrogate'.
+
+    """
+
+    def __init__(self, **arrays):
+        self.sections = arrays["sections"]
+        self.piers = arrays["piers"]
+        # Projected stiffness of each group, loads and map to responses.
+        self.stiffness = arrays["stiffness"]
+        self.loads = arrays["loads"]
+        self.thermal = arrays["thermal"]
+        self.sample = arrays["sample"]
+        # Projected parts of the norm of the residual, and norms of the map to
+        # responses at each point, for error bounds.
+        self.gram = arrays["gram"]
+        self.loads_norms = arrays["loads_norms"]
+        self.loads_residual = arrays["loads_residual"]
+        self.thermal_norms = arrays["thermal_norms"]
+        self.thermal_residual = arrays["thermal_residual"]
+        self.sample_residual = arrays["sample_residual"]
+        self.sample_norms = arrays["sample_norms"]
+        self.min_eigenvalue = float(arrays["min_eigenvalue"])
+        # Maximum error relative to the maximum response, of responses at each
+        # validation scale.
+        self.validation_error = arrays.get("validation_error", np.empty(0))
+
+    def save(self, f):
+        """Save the surrogate's arrays to a file."""
+        np.savez(f, **vars(self))
+
+    @staticmethod
+    def load(f) -> "Surrogate":
+        """Load a surrogate from a file written by 'save'."""
+        with np.load(f) as arrays:
+            return Surrogate(**{k: arrays[k] for k in arrays.files})
+
+    def _check(self, mu: np.ndarray) -> np.ndarray:
+        mu = np.asarray(mu, dtype=np.float64)
+        if mu.shape != (len(self.sections),) or np.any(mu <= 0):
+            raise ValueError(
+                f"Expected {len(self.sections)} positive scales, got {mu.shape}"
+            )
+        return mu
+
+    def _coefficients(self, mu: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Reduced displacements of each wheel track load and thermal load."""
+        k = np.einsum("g,gij->ij", mu, self.stiffness)
+        f = np.hstack([self.loads, np.einsum("g,gia->ia", mu, self.thermal)])
+        a = solve(k, f, assume_a="pos")
+        n_loads = self.loads.shape[1]
+        return a[:, :n_loads], a[:, n_loads:]
+
+    def unit_load_matrix(self, mu: np.ndarray) -> np.ndarray:
+        """Response at each point to a 1 kN load at each wheel track position.
+
+        Returns:
+            An array of shape (L, P), as 'unit_load_matrix' of the full model.
+
+        """
+        a, _ = self._coefficients(self._check(mu))
+        return (self.sample @ a).T
+
+    def thermal_responses(self, mu: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Response at each point to the unit uniform and linear thermal loads.
+
+        Returns:
+            A tuple of two arrays of shape (P,), see 'thermal_loads'.
+
+        """
+        _, a = self._coefficients(self._check(mu))
+        uniform, linear = (self.sample @ a).T
+        return uniform, linear
+
+    def error_bound(self, mu: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Bound on the error of each response, relative to the full model.
+
+        The bound is the norm of the residual of the load times the norm of
+        the residual of the adjoint load of the point, or of the adjoint load
+        itself if smaller (see module documentation). As the basis includes
+        the adjoint displacements the former is usually smaller. A bound on
+        the round-off error of the norms of residuals, computed from projected
+        terms, is included. The bound is rigorous but may be pessimistic, see
+        also 'validation_error'.
+
+        Returns:
+            A tuple of arrays of shape (L, P) and (2, P), the bound on the error
+            of 'unit_load_matrix' and of 'thermal_responses'.
+
+        """
+        mu = self._check(mu)
+        a, b = self._coefficients(mu)
+        k = np.einsum("g,gij->ij", mu, self.stiffness)
+        adjoint = solve(k, self.sample.T, assume_a="pos")
+        gram = np.einsum("g,h,ghij->ij", mu, mu, self.gram)
+
+        def norm(squared_norms, cross, coefficients):
+            """Norm of each residual, from the norm of each load squared."""
+            squared = squared_norms - 2 * np.einsum("il,il->l", cross, coefficients)
+            squared += np.einsum("il,ij,jl->l", coefficients, gram, coefficients)
+            return np.sqrt(np.maximum(squared, 0)) + ROUND_OFF * np.sqrt(squared_norms)
+
+        loads = norm(
+            self.loads_norms, np.einsum("g,gil->il", mu, self.loads_residual), a
+        )
+        thermal = norm(
+            np.einsum("g,h,gha->a", mu, mu, self.thermal_norms),
+            np.einsum("g,h,ghia->ia", mu, mu, self.thermal_residual),
+            b,
+        )
+        points = norm(
+            self.sample_norms ** 2,
+            np.einsum("g,gip->ip", mu, self.sample_residual),
+            adjoint,
+        )
+        scale = np.minimum(points, self.sample_norms) / (mu.min() * self.min_eigenvalue)
+        return np.outer(loads, scale), np.outer(thermal, scale)
+
+
+def _full_responses(
+    model: ShellModel,
+    k_groups: List[csc_matrix],
+    mu: np.ndarray,
+    loads: csc_matrix,
+    thermal: np.ndarray,
+    sample: csc_matrix,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Responses of the full model, restricted to free degrees of freedom."""
+    lu = factorize(sum(m * k for m, k in zip(mu, k_groups)))
+    # Adjoint displacements, one solve per point.
+    u = lu.solve(sample.T.toarray())
+    return (loads.T @ u), np.einsum("g,gia->ai", mu, thermal) @ u
+
+
+def build_surrogate(
+    model: ShellModel,
+    loads: csc_matrix,
+    thermal: np.ndarray,
+    sample: csc_matrix,
+    training: List[np.ndarray],
+    block_size: int,
+    tol: float,
+) -> Surrogate:
+    """Reduced-order model of a model, see module documentation.
+
+    Args:
+        model: model of a bridge.
+        loads: array of shape (6N, L), loads of each wheel track position.
+        thermal: array of shape (G, 6N, 2), thermal loads of each group, see
+            'thermal_loads'.
+        sample: array of shape (P, 6N), the linear map from displacements to
+            responses at each point.
+        training: scales of each group's stiffness to compute the basis at.
+        block_size: loads solved for at once.
+        tol: relative tolerance of the basis, see 'extend_basis'.
+
+    """
+    labels, sections, piers = groups(model)
+    n_groups = len(sections)
+    free = model.free
+    k_groups = [
+        model.stiffness(np.flatnonzero(labels == g))[free][:, free].tocsc()
+        for g in range(n_groups)
+    ]
+    loads = csc_matrix(loads)[free]
+    thermal = thermal[:, free]
+    sample = csc_matrix(sample)[:, free]
+
+    basis = None
+    for i, mu in enumerate(training):
+        start = timer()
+        if np.all(mu == 1):
+            lu = model.factorize()
+        else:
+            lu = factorize(sum(m * k for m, k in zip(mu, k_groups)))
+        rhs = hstack(
+            [loads, csc_matrix(np.einsum("g,gia->ia", mu, thermal)), sample.T],
+            format="csc",
+        )
+        for block in range(0, rhs.shape[1], block_size):
+            u = lu.solve(rhs[:, block : block + block_size].toarray())
+            basis = extend_basis(basis=basis, snapshots=u, tol=tol)
+        print_i(
+            f"Sparse: basis of {basis.shape[1]} after training scales"
+            + f" {i + 1}/{len(training)} in {timer() - start:.2f}s"
+        )
+
+    start = timer()
+    # Each group's stiffness is only non-zero in rows of the group's degrees of
+    # freedom, so K_g V is kept only in those rows.
+    rows = [np.unique(k.indices) for k in k_groups]
+    k_basis = [k[r] @ basis for k, r in zip(k_groups, rows)]
+    gram = np.zeros((n_groups, n_groups) + (basis.shape[1],) * 2)
+    for g, h in itertools.product(range(n_groups), repeat=2):
+        _, i, j = np.intersect1d(rows[g], rows[h], return_indices=True)
+        gram[g, h] = k_basis[g][i].T @ k_basis[h][j]
+    n = len(free)
+    lu = model.factorize()
+    min_eigenvalue = eigsh(
+        model.k[free][:, free],
+        k=1,
+        sigma=0,
+        OPinv=LinearOperator((n, n), matvec=lu.solve, dtype=np.float64),
+        return_eigenvectors=False,
+    )[0]
+    loads_t = loads.T.tocsr()
+    sample_t = sample.T.toarray()
+    result = Surrogate(
+        sections=sections,
+        piers=piers,
+        stiffness=np.stack([basis[r].T @ kb for r, kb in zip(rows, k_basis)]),
+        loads=(loads_t @ basis).T,
+        thermal=np.einsum("ni,gna->gia", basis, thermal),
+        sample=np.asarray(sample @ basis),
+        gram=gram,
+        loads_norms=np.asarray(loads.multiply(loads).sum(axis=0))[0],
+        loads_residual=np.stack(
+            [(loads_t[:, r] @ kb).T for r, kb in zip(rows, k_basis)]
+        ),
+        thermal_norms=np.einsum("gna,hna->gha", thermal, thermal),
+        thermal_residual=np.stack(
+            [
+                np.einsum("ni,hna->hia", kb, thermal[:, r])
+                for r, kb in zip(rows, k_basis)
+            ]
+        ),
+        sample_residual=np.stack([kb.T @ sample_t[r] for r, kb in zip(rows, k_basis)]),
+        sample_norms=np.sqrt(np.asarray(sample.multiply(sample).sum(axis=1))[:, 0]),
+        min_eigenvalue=min_eigenvalue,
+    )
+    print_i(
+        f"Sparse: projected surrogate of {n} degrees of freedom to"
+        + f" {basis.shape[1]} in {timer() - start:.2f}s"
+    )
+    return result
+
+
+def validate(
+    surrogate: Surrogate,
+    model: ShellModel,
+    loads: csc_matrix,
+    thermal: np.ndarray,
+    sample: csc_matrix,
+    labels: np.ndarray,
+    scales: List[np.ndarray],
+) -> np.ndarray:
+    """Error of a surrogate against the full model, at each of the given scales.
+
+    Args are as for 'build_surrogate'.
+
+    Returns:
+        An array of shape (len(scales),), the maximum error of all responses
+        relative to the maximum response, at each scale.
+
+    """
+    free = model.free
+    k_groups = [
+        model.stiffness(np.flatnonzero(labels == g))[free][:, free].tocsc()
+        for g in range(labels.max() + 1)
+    ]
+    errors = np.empty(len(scales))
+    for i, mu in enumerate(scales):
+        ulm, responses = _full_responses(
+            model=model,
+            k_groups=k_groups,
+            mu=mu,
+            loads=csc_matrix(loads)[free],
+            thermal=thermal[:, free],
+            sample=csc_matrix(sample)[:, free],
+        )
+        uniform, linear = surrogate.thermal_responses(mu)
+        errors[i] = max(
+            np.abs(surrogate.unit_load_matrix(mu) - ulm).max() / np.abs(ulm).max(),
+            np.abs(np.stack([uniform, linear]) - responses).max()
+            / max(np.abs(responses).max(), np.finfo(float).tiny),
+        )
+        print_i(f"Sparse: surrogate error at validation scales {i + 1} = {errors[i]}")
+    return errors
+
+
+def surrogate(
+    c: Config, response_type: ResponseType, points: List[Point], wheel_zs: List[float]
+) -> Surrogate:
+    """Reduced-order model of a bridge, from file if previously built.
+
+    The basis is trained at nominal stiffness, and at the lower and upper scale
+    of 'Config.rom_scales' of each group's stiffness. It is validated at
+    'Config.rom_validation' random scales in that range.
+
+    Args:
+        c: simulation configuration object.
+        response_type: the type of response at each point.
+        points: points on the deck at which to calculate responses.
+        wheel_zs: z position of each wheel track.
+
+    """
+    filepath = c.get_data_path(
+        "surrogates",
+        f"{c.sim_runner.cache_name}-{response_type.name()}-{c.rom_tol}"
+        + f"-{c.rom_scales}-{c.il_num_loads}"
+        + f"-z={wheel_zs}-{[str(point) for point in points]}.npz",
+    )
+    filepath = shorten_path(c=c, bypass_config=True, filepath=filepath)
+    if os.path.exists(filepath):
+        return Surrogate.load(filepath)
+
+    model, _, loads, sample = operators(
+        c=c, response_type=response_type, points=points, wheel_zs=wheel_zs
+    )
+    labels, sections, _ = groups(model)
+    n_groups = len(sections)
+    thermal = thermal_loads(c=c, model=model, labels=labels, n_groups=n_groups)
+    low, high = c.rom_scales
+    training = [np.ones(n_groups)] + [
+        np.where(np.arange(n_groups) == g, scale, 1)
+        for g in range(n_groups)
+        for scale in (low, high)
+    ]
+    result = build_surrogate(
+        model=model,
+        loads=loads,
+        thermal=thermal,
+        sample=sample,
+        training=training,
+        block_size=c.ulm_block_size,
+        tol=c.rom_tol,
+    )
+    rng = np.random.default_rng(0)
+    result.validation_error = validate(
+        surrogate=result,
+        model=model,
+        loads=loads,
+        thermal=thermal,
+        sample=sample,
+        labels=labels,
+        scales=np.exp(
+            rng.uniform(np.log(low), np.log(high), (c.rom_validation, n_groups))
+        ),
+    )
+    with atomic_write(filepath, "wb") as f:
+        result.save(f)
+    return result
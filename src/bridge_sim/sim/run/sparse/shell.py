@@ -0,0 +1,221 @@
+"""Flat four-node shell elements.
+
+Each element combines a bilinear membrane, a Mindlin-Reissner plate with the
+MITC4 interpolation of transverse shear strain (as OpenSees' ShellMITC4) and a
+small drilling stiffness. Quantities are computed for many elements at once, as
+arrays with one element per row.
+
+Each node has six degrees of freedom, three translations followed by three
+rotations. Generalized strains are in the order that OpenSees records section
+deformations: [eps11, eps22, gamma12, kappa11, kappa22, kappa12, gamma13,
+gamma23]. The strain at distance 'z' along the element's normal is then
+eps11 + z * kappa11.
+
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+# Natural coordinates of each node of an element.
+NODE_XI = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+# Natural coordinates of each (2 x 2) Gauss point, each has a weight of 1.
+GAUSS_XI = NODE_XI / np.sqrt(3)
+# Shear correction factor of the plate.
+SHEAR_FACTOR = 5 / 6
+# Drilling stiffness as a fraction of plate bending stiffness.
+DRILLING_FACTOR = 1e-3
+
+
+def shape_functions(xi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Shape functions and their derivatives at points in natural coordinates.
+
+    Args:
+        xi: array of shape (..., 2), natural coordinates of each point.
+
+    Returns:
+        A tuple of: an array of shape (..., 4), the value of each node's shape
+        function; an array of shape (..., 2, 4), the derivatives of each node's
+        shape function with respect to each natural coordinate.
+
+    """
+    xi, eta = xi[..., [0]], xi[..., [1]]
+    n = (1 + NODE_XI[:, 0] * xi) * (1 + NODE_XI[:, 1] * eta) / 4
+    dn = np.stack(
+        [
+            NODE_XI[:, 0] * (1 + NODE_XI[:, 1] * eta) / 4,
+            NODE_XI[:, 1] * (1 + NODE_XI[:, 0] * xi) / 4,
+        ],
+        axis=-2,
+    )
+    return n, dn
+
+
+def frames(corners: np.ndarray, up: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Local coordinate system of each element.
+
+    The local x axis is the global x axis projected onto the element's plane,
+    unless the element is (nearly) normal to the global x axis, in which case
+    it is the direction from the first to the second node. The local z axis is
+    the element's normal, pointing upwards if 'up' is true.
+
+    Args:
+        corners: array of shape (M, 4, 3), coordinates of each element's nodes.
+        up: boolean array of shape (M,), true where the normal must point up.
+
+    Returns:
+        A tuple of: an array of shape (M, 3, 3), the local axes of each element
+        as rows of a rotation matrix; an array of shape (M, 4, 2), the in-plane
+        local coordinates of each element's nodes.
+
+    """
+    normal = np.cross(corners[:, 2] - corners[:, 0], corners[:, 3] - corners[:, 1])
+    area = np.linalg.norm(normal, axis=1)
+    if np.any(np.isclose(area, 0)):
+        raise ValueError("Degenerate shell element with no area")
+    normal /= area[:, np.newaxis]
+    normal[up & (normal[:, 1] < 0)] *= -1
+    e1 = np.repeat([[1.0, 0, 0]], len(corners), axis=0)
+    along = np.abs(normal[:, 0]) > 0.85
+    e1[along] = corners[along, 1] - corners[along, 0]
+    e1 -= np.sum(e1 * normal, axis=1)[:, np.newaxis] * normal
+    e1 /= np.linalg.norm(e1, axis=1)[:, np.newaxis]
+    rotation = np.stack([e1, np.cross(normal, e1), normal], axis=1)
+    center = corners.mean(axis=1, keepdims=True)
+    local = np.einsum("mij,mnj->mni", rotation[:, :2], corners - center)
+    return rotation, local
+
+
+def constitutive(sections: np.ndarray) -> np.ndarray:
+    """Section stiffness of each element, relating generalized strain to stress.
+
+    Args:
+        sections: array of shape (M, 4), the thickness (m), Young's modulus
+            (Pa), Young's modulus along the local x axis (Pa) and Poisson's
+            ratio of each element.
+
+    Returns:
+        An array of shape (M, 8, 8).
+
+    """
+    t, e2, e1, nu = sections.T
+    nu21 = nu * e2 / e1
+    den = 1 - nu * nu21
+    g = e2 / (2 * (1 + nu))
+    q = np.zeros((len(sections), 3, 3))
+    q[:, 0, 0] = e1 / den
+    q[:, 1, 1] = e2 / den
+    q[:, 0, 1] = q[:, 1, 0] = nu * e2 / den
+    q[:, 2, 2] = g
+    d = np.zeros((len(sections), 8, 8))
+    d[:, :3, :3] = t[:, None, None] * q
+    d[:, 3:6, 3:6] = (t ** 3 / 12)[:, None, None] * q
+    d[:, 6, 6] = d[:, 7, 7] = SHEAR_FACTOR * g * t
+    return d
+
+
+def _jacobian(local: np.ndarray, dn: np.ndarray) -> np.ndarray:
+    """Jacobian of each element at a point, shape is (M, 2, 2)."""
+    return np.einsum("ai,mib->mab", dn, local)
+
+
+def _covariant_shear(local: np.ndarray, xi: np.ndarray, axis: int) -> np.ndarray:
+    """Covariant transverse shear strain along a natural axis at a point.
+
+    Returns:
+        An array of shape (M, 6, 4), relating each degree of freedom of each
+        node to the strain.
+
+    """
+    n, dn = shape_functions(xi)
+    tangent = _jacobian(local, dn)[:, axis]  # (dx1, dx2) along the axis.
+    b = np.zeros((len(local), 6, 4))
+    b[:, 2] = dn[axis]
+    # Rotations about local axes 1 and 2 rotate the normal towards 2 and -1.
+    b[:, 3] = -n * tangent[:, [1]]
+    b[:, 4] = n * tangent[:, [0]]
+    return b
+
+
+def strain_displacement(local: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Generalized strain at each Gauss point, from local nodal displacements.
+
+    Args:
+        local: array of shape (M, 4, 2), local coordinates of element nodes.
+
+    Returns:
+        A tuple of: an array of shape (M, 4, 8, 24), for each Gauss point the
+        generalized strains from the 24 local degrees of freedom; an array of
+        shape (M, 4), the determinant of the Jacobian at each Gauss point.
+
+    """
+    # Tying points of transverse shear strain along each natural axis.
+    shear_a = _covariant_shear(local, np.array([0.0, 1]), axis=0)
+    shear_c = _covariant_shear(local, np.array([0.0, -1]), axis=0)
+    shear_d = _covariant_shear(local, np.array([1.0, 0]), axis=1)
+    shear_b = _covariant_shear(local, np.array([-1.0, 0]), axis=1)
+    b = np.zeros((len(local), 4, 8, 6, 4))
+    det = np.zeros((len(local), 4))
+    for g, xi in enumerate(GAUSS_XI):
+        _, dn = shape_functions(xi)
+        jac = _jacobian(local, dn)
+        det[:, g] = np.linalg.det(jac)
+        inv = np.linalg.inv(jac)
+        dndx = np.einsum("mab,bi->mai", inv, dn)
+        # Membrane.
+        b[:, g, 0, 0] = dndx[:, 0]
+        b[:, g, 1, 1] = dndx[:, 1]
+        b[:, g, 2, 0] = dndx[:, 1]
+        b[:, g, 2, 1] = dndx[:, 0]
+        # Bending.
+        b[:, g, 3, 4] = dndx[:, 0]
+        b[:, g, 4, 3] = -dndx[:, 1]
+        b[:, g, 5, 4] = dndx[:, 1]
+        b[:, g, 5, 3] = -dndx[:, 0]
+        # Transverse shear, interpolated from the tying points.
+        shear_xi = ((1 + xi[1]) * shear_a + (1 - xi[1]) * shear_c) / 2
+        shear_eta = ((1 + xi[0]) * shear_d + (1 - xi[0]) * shear_b) / 2
+        b[:, g, 6] = inv[:, 0, 0, None, None] * shear_xi
+        b[:, g, 6] += inv[:, 0, 1, None, None] * shear_eta
+        b[:, g, 7] = inv[:, 1, 0, None, None] * shear_xi
+        b[:, g, 7] += inv[:, 1, 1, None, None] * shear_eta
+    # Order degrees of freedom by node, then by direction.
+    return b.transpose(0, 1, 2, 4, 3).reshape(len(local), 4, 8, 24), det
+
+
+def stiffness(local: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Stiffness matrix of each element in local coordinates.
+
+    Args:
+        local: array of shape (M, 4, 2), local coordinates of element nodes.
+        d: array of shape (M, 8, 8), section stiffness of each element.
+
+    Returns:
+        An array of shape (M, 24, 24).
+
+    """
+    b, det = strain_displacement(local)
+    k = np.einsum("mgsi,mst,mgtj,mg->mij", b, d, b, np.abs(det), optimize=True)
+    drilling = np.arange(5, 24, 6)
+    k[:, drilling, drilling] += DRILLING_FACTOR * d[:, [3], 3]
+    return k
+
+
+def gauss_points(local: np.ndarray) -> np.ndarray:
+    """Local coordinates of each element's Gauss points, shape is (M, 4, 2)."""
+    n = np.array([shape_functions(xi)[0] for xi in GAUSS_XI])
+    return np.einsum("gi,mia->mga", n, local)
+
+
+def to_global(rotation: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """Element stiffness matrices from local to global coordinates."""
+    m = len(k)
+    k = k.reshape(m, 8, 3, 8, 3)
+    k = np.einsum("mki,makbl,mlj->maibj", rotation, k, rotation, optimize=True)
+    return k.reshape(m, 24, 24)
+
+
+def to_local(rotation: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Element displacements, shape (M, 24), from global to local coordinates."""
+    u = u.reshape(len(u), 8, 3)
+    return np.einsum("mki,mai->mak", rotation, u).reshape(len(u), 24)
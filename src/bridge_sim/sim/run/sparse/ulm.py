@@ -0,0 +1,347 @@
+"""Unit load matrices from one factorization of the stiffness matrix.
+
+A unit load matrix holds the response at each point to a 1 kN load at each
+load position of each wheel track. With 'K' the stiffness matrix, 'F' a column
+of loads for each load position and 'S' the linear map from displacements to
+responses at the points, the unit load matrix is (S K^-1 F)^T. 'K' is
+factorized once and the loads are solved for in blocks of
+'Config.ulm_block_size' load positions, which bounds memory use.
+
+As 'K' is symmetric the unit load matrix is also F^T K^-1 S^T, by reciprocity
+(Maxwell-Betti). This adjoint method solves once per point instead of once per
+load position, which is faster when there are fewer points than load positions,
+e.g. for a few sensors. See 'Config.ulm_adjoint'.
+
+The unit load matrix of a cracked bridge is computed from that of the healthy
+bridge by a low-rank update, see 'bridge_sim.sim.run.sparse.damage'.
+
+Loads are applied to the mesh built without loads, each load is distributed to
+the nodes of the deck element it is in by the element's shape functions.
+Responses are read at the node or integration point nearest to each point, as
+by 'Responses.at_deck' with 'interp=False'.
+
+"""
+
+from timeit import default_timer as timer
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+from scipy.spatial import cKDTree
+
+from bridge_sim.model import Config, Point, ResponseType
+from bridge_sim.scenarios import CrackedScenario
+from bridge_sim.sim.model import Shell, SimParams
+from bridge_sim.sim.run.opensees.convert.d3 import i_point_geometry
+from bridge_sim.sim.run.sparse import shell
+from bridge_sim.sim.run.sparse.build import build_mesh, i_point_order, sim_model
+from bridge_sim.sim.run.sparse.damage import (
+    DamageUpdate,
+    damaged_sections,
+    sweep_unit_loads,
+)
+from bridge_sim.sim.run.sparse.model import ShellModel
+from bridge_sim.util import nearest_index, print_i, print_w
+
+# Generalized strain components and sign of the offset from the mid-surface,
+# of each strain response type (see 'bridge_sim.sim.run.sparse.shell').
+STRAIN_COMPONENTS = {
+    ResponseType.StrainXXB: (0, 3, -1),
+    ResponseType.StrainXXT: (0, 3, 1),
+    ResponseType.StrainZZB: (1, 4, -1),
+}
+# Translation degree of freedom of each translation response type.
+TRANSLATION_DOFS = {
+    ResponseType.XTrans: 0,
+    ResponseType.YTrans: 1,
+    ResponseType.ZTrans: 2,
+}
+# Sign of translation and strain responses relative to the axes of the model,
+# as OpenSees responses are negated (see 'bridge_sim.sim.run.opensees.parse').
+RESPONSE_SIGN = -1
+# Number of deck elements with the nearest centers searched for a position.
+LOCATE_CANDIDATES = 8
+
+
+def locate(model: ShellModel, xz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Deck element containing each position, and shape functions there.
+
+    Args:
+        model: model of a bridge.
+        xz: array of shape (L, 2), x and z coordinates of each position.
+
+    Returns:
+        A tuple of: an integer array of shape (L,), the index of the deck
+        element containing each position; an array of shape (L, 4), the value
+        of each of the element's shape functions at each position.
+
+    """
+    deck = np.flatnonzero(model.up)
+    corners = model.points[model.elements[deck]][:, :, [0, 2]]
+    lo, hi = corners.min(axis=1), corners.max(axis=1)
+    # Candidates are the elements with the nearest centers, the first candidate
+    # (lowest index) containing a position is the element it is in.
+    k = min(LOCATE_CANDIDATES, len(deck))
+    _, candidates = cKDTree((lo + hi) / 2).query(xz, k=k)
+    candidates = candidates.reshape(len(xz), k)
+    inside = np.all(
+        (lo[candidates] <= xz[:, None]) & (xz[:, None] <= hi[candidates]), axis=2
+    )
+    found = np.where(inside, candidates, len(deck)).min(axis=1)
+    # Else searching all elements, e.g. next to much larger elements.
+    for i in np.flatnonzero(found == len(deck)):
+        inside = np.flatnonzero(np.all((lo <= xz[i]) & (xz[i] <= hi), axis=1))
+        if len(inside) == 0:
+            raise ValueError(f"No deck element at (x, z) = {tuple(xz[i])}")
+        found[i] = inside[0]
+    elements = deck[found]
+    # Position in each element's local coordinates.
+    center = model.points[model.elements[elements]].mean(axis=1)
+    position = np.stack([xz[:, 0], np.zeros(len(xz)), xz[:, 1]], axis=1)
+    position = np.einsum("lij,lj->li", model.rotation[elements, :2], position - center)
+    # Natural coordinates by Newton's method, exact for parallelograms.
+    local = model.local[elements]
+    xi = np.zeros((len(xz), 2))
+    for _ in range(5):
+        n, dn = shell.shape_functions(xi)
+        residual = position - np.einsum("li,lib->lb", n, local)
+        jacobian = np.einsum("lai,lib->lab", dn, local)
+        xi += np.linalg.solve(jacobian.transpose(0, 2, 1), residual[..., None])[..., 0]
+    n, _ = shell.shape_functions(np.clip(xi, -1, 1))
+    return elements, n
+
+
+def load_operator(model: ShellModel, xz: np.ndarray) -> csc_matrix:
+    """Loads of a 1 kN downwards load at each position, shape is (6N, L)."""
+    elements, n = locate(model=model, xz=xz)
+    rows = 6 * model.elements[elements] + 1
+    cols = np.repeat(np.arange(len(xz)), 4)
+    return csc_matrix(
+        (-1e3 * n.reshape(-1), (rows.reshape(-1), cols)), shape=(model.n_dofs, len(xz)),
+    )
+
+
+def snap(candidates: np.ndarray, points: List[Point]) -> np.ndarray:
+    """Index of the deck candidate nearest to each point.
+
+    The nearest x position is found first, then the nearest z position at that
+    x position, as in 'Responses._at_deck_snap'.
+
+    """
+    deck = np.flatnonzero(np.isclose(candidates[:, 1], 0))
+    xs = np.unique(candidates[deck, 0])
+    indices = np.empty(len(points), dtype=np.int64)
+    for i, point in enumerate(points):
+        at_x = deck[candidates[deck, 0] == xs[nearest_index(xs, point.x)]]
+        at_x = at_x[np.argsort(candidates[at_x, 2])]
+        indices[i] = at_x[nearest_index(candidates[at_x, 2], point.z)]
+    return indices
+
+
+def response_operator(
+    model: ShellModel,
+    shells: List[Shell],
+    response_type: ResponseType,
+    points: List[Point],
+) -> csr_matrix:
+    """Linear map from displacements to responses at points, shape (P, 6N)."""
+    if response_type in TRANSLATION_DOFS:
+        nodes = snap(model.points, points)
+        return csr_matrix(
+            (
+                np.full(len(points), RESPONSE_SIGN),
+                (np.arange(len(points)), 6 * nodes + TRANSLATION_DOFS[response_type]),
+            ),
+            shape=(len(points), model.n_dofs),
+        )
+    if response_type not in STRAIN_COMPONENTS:
+        raise ValueError(f"Unsupported response type {response_type}")
+    deck, i_points, half_height = i_point_geometry(shells)
+    nearest = snap(i_points.reshape(-1, 3), points)
+    i_point, deck_element = np.divmod(nearest, i_points.shape[1])
+    elements = np.flatnonzero(deck)[deck_element]
+    gauss_point = i_point_order(model)[i_point, elements]
+    b, _ = shell.strain_displacement(model.local[elements])
+    b = b[np.arange(len(points)), gauss_point]  # Shape is (P, 8, 24).
+    membrane, bending, side = STRAIN_COMPONENTS[response_type]
+    rows = b[:, membrane] + side * half_height[deck_element, None] * b[:, bending]
+    rows = (rows * RESPONSE_SIGN * 1e6).reshape(-1, 8, 3)  # Microstrain.
+    rows = np.einsum("pak,pki->pai", rows, model.rotation[elements])
+    return csr_matrix(
+        (
+            rows.reshape(-1),
+            (np.repeat(np.arange(len(points)), 24), model.dofs[elements].reshape(-1)),
+        ),
+        shape=(len(points), model.n_dofs),
+    )
+
+
+def operators(
+    c: Config, response_type: ResponseType, points: List[Point], wheel_zs: List[float]
+) -> Tuple[ShellModel, List[Shell], csc_matrix, csr_matrix]:
+    """Model of the bridge without loads, and its load and response operators.
+
+    Returns:
+        A tuple of: the model; the shells of the model; the loads of a 1 kN
+        load at each load position, see 'load_operator'; the responses at each
+        point, see 'response_operator'.
+
+    """
+    sim_params = SimParams()
+    build_mesh(c=c, sim_params=sim_params)
+    _, shells, _, model = sim_model(c=c, sim_params=sim_params)
+    wheel_xs = c.bridge.wheel_track_xs(c)
+    xz = np.array([(x, z) for z in wheel_zs for x in wheel_xs], dtype=np.float64)
+    loads = load_operator(model=model, xz=xz)
+    sample = response_operator(
+        model=model, shells=shells, response_type=response_type, points=points
+    )
+    return model, shells, loads, sample
+
+
+def static_unit_loads(
+    c: Config, model: ShellModel, loads: csc_matrix, sample: csr_matrix
+) -> np.ndarray:
+    """Unit load matrix, by the method set by 'Config.ulm_adjoint'."""
+    adjoint = c.ulm_adjoint
+    if adjoint is None:
+        adjoint = sample.shape[0] < loads.shape[1]
+    return solve_unit_loads(
+        model=model,
+        loads=loads,
+        sample=sample,
+        block_size=c.ulm_block_size,
+        adjoint=adjoint,
+    )
+
+
+def _damage_update(
+    c: Config, model: ShellModel, damage_scenario: CrackedScenario
+) -> DamageUpdate:
+    """A crack of a bridge's deck as an update of the healthy model."""
+    sections = damaged_sections(
+        model=model, bridge=c.bridge, damaged_bridge=damage_scenario.use(c)[0].bridge
+    )
+    update = DamageUpdate(model=model, sections=sections)
+    if update.rank == 0:
+        print_w(f"No element centers in crack area of {damage_scenario.name}")
+    return update
+
+
+def unit_load_matrix(
+    c: Config,
+    response_type: ResponseType,
+    points: List[Point],
+    wheel_zs: List[float],
+    damage_scenario: Optional[CrackedScenario] = None,
+) -> np.ndarray:
+    """Response at each point to a 1 kN load at each wheel track position.
+
+    Args:
+        c: simulation configuration object, of the healthy bridge.
+        response_type: the type of response at each point.
+        points: points on the deck at which to calculate responses.
+        wheel_zs: z position of each wheel track.
+        damage_scenario: optional, a crack of the bridge's deck. The unit load
+            matrix of the cracked bridge is computed from that of the healthy
+            bridge, see 'bridge_sim.sim.run.sparse.damage'.
+
+    Returns:
+        An array of shape (len(wheel_zs) * Config.il_num_loads, len(points)),
+        with one row per load position, in order of wheel track and then x
+        position, as in 'ULResponses.load_ulm'.
+
+    """
+    model, _, loads, sample = operators(
+        c=c, response_type=response_type, points=points, wheel_zs=wheel_zs
+    )
+    result = static_unit_loads(c=c, model=model, loads=loads, sample=sample)
+    if damage_scenario is None:
+        return result
+    start = timer()
+    update = _damage_update(c=c, model=model, damage_scenario=damage_scenario)
+    result = update.unit_loads(healthy=result, loads=loads, sample=sample)
+    print_i(
+        f"Sparse: updated {len(update.elements)} damaged elements (rank"
+        + f" {update.rank}) in {timer() - start:.2f}s"
+    )
+    return result
+
+
+def unit_load_matrices(
+    c: Config,
+    response_type: ResponseType,
+    points: List[Point],
+    wheel_zs: List[float],
+    damage_scenarios: List[CrackedScenario],
+) -> np.ndarray:
+    """Unit load matrix of each of many cracks, see 'unit_load_matrix'.
+
+    The healthy unit load matrix is computed once, and each damaged element is
+    solved for once (see 'bridge_sim.sim.run.sparse.damage.sweep_unit_loads').
+
+    Returns:
+        An array of shape (len(damage_scenarios), L, len(points)), where L is
+        len(wheel_zs) * Config.il_num_loads.
+
+    """
+    model, _, loads, sample = operators(
+        c=c, response_type=response_type, points=points, wheel_zs=wheel_zs
+    )
+    healthy = static_unit_loads(c=c, model=model, loads=loads, sample=sample)
+    updates = [
+        _damage_update(c=c, model=model, damage_scenario=damage_scenario)
+        for damage_scenario in damage_scenarios
+    ]
+    return sweep_unit_loads(
+        updates=updates,
+        healthy=healthy,
+        loads=loads,
+        sample=sample,
+        block_size=c.ulm_block_size,
+    )
+
+
+def solve_unit_loads(
+    model: ShellModel,
+    loads: csc_matrix,
+    sample: csr_matrix,
+    block_size: int,
+    adjoint: bool,
+) -> np.ndarray:
+    """Responses to each column of loads, sampled by each row of 'sample'.
+
+    The direct method solves for the displacements of each column of loads. The
+    adjoint method solves for the displacements of a load equal to each row of
+    'sample', by reciprocity (the stiffness matrix is symmetric) the response
+    to each column of loads is then the work that column does on those
+    displacements.
+
+    Args:
+        model: model of a bridge.
+        loads: array of shape (6N, L), loads of each load position.
+        sample: array of shape (P, 6N), the linear map from displacements to
+            responses at each point.
+        block_size: load positions, or points, solved for at once.
+        adjoint: solve once per point, instead of once per load position.
+
+    Returns:
+        An array of shape (L, P).
+
+    """
+    result = np.empty((loads.shape[1], sample.shape[0]))
+    rhs = sample.T.tocsc() if adjoint else loads
+    method = "adjoint" if adjoint else "unit"
+    for start in range(0, rhs.shape[1], block_size):
+        block_start = timer()
+        block = slice(start, min(start + block_size, rhs.shape[1]))
+        u = model.solve(rhs[:, block].toarray())
+        if adjoint:
+            result[:, block] = loads.T @ u
+        else:
+            result[block] = (sample @ u).T
+        print_i(
+            f"Sparse: {method} loads {block.start + 1}-{block.stop}/{rhs.shape[1]}"
+            + f" in {timer() - block_start:.2f}s"
+        )
+    return result
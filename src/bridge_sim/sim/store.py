@@ -0,0 +1,202 @@
+"""Columnar on-disk storage of simulation responses.
+
+Responses of one response type for one simulation are saved as a flat array of
+float values, in a '.npy' file. The (x, y, z) coordinates of each value are
+saved separately, once per mesh, under a digest of the coordinates. A small
+sidecar file next to the values records which mesh the values belong to. All
+files are written atomically.
+
+All response types sharing a mesh (e.g. the translation responses of every
+unit load simulation on one bridge mesh) thus share one coordinate file, and
+loading responses is a memory-map of two '.npy' files.
+
+A 'ColumnStore' holds the columns of a matrix that are each computed for one
+point, e.g. the unit load matrix of a bridge, so any subset of the columns can
+be loaded and only missing columns need be computed.
+
+"""
+
+import glob
+import hashlib
+import os
+import uuid
+from typing import Dict, Tuple
+
+import dill
+import numpy as np
+
+from bridge_sim.model import Config
+from bridge_sim.util import atomic_write, print_i, round_m
+
+# Extension of the sidecar file naming the mesh of a values file.
+MESH_EXT = ".mesh"
+# Extension of the metadata sidecar of a values file, see 'bridge_sim.sim.cache'.
+META_EXT = ".json"
+
+
+def mesh_digest(points: np.ndarray) -> str:
+    """A digest identifying an (N, 3) array of coordinates."""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    return hashlib.sha1(points.tobytes()).hexdigest()
+
+
+def mesh_path(c: Config, digest: str) -> str:
+    """Path of the coordinate file of a mesh, shared by all bridges."""
+    return c.get_path_in(c.root_generated_data_dir(), "meshes", f"{digest}.npy")
+
+
+def is_columnar(path: str) -> bool:
+    """Whether responses at the given path are in columnar format."""
+    return os.path.exists(path + MESH_EXT)
+
+
+def save_responses(c: Config, path: str, values: np.ndarray, points: np.ndarray):
+    """Save response values and their coordinates in columnar format.
+
+    Args:
+        c: simulation configuration object.
+        path: path of the values file.
+        values: array of N response values.
+        points: array of shape (N, 3), the coordinates of each response.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    points = np.asarray(points, dtype=np.float64)
+    if len(values) != len(points):
+        raise ValueError(f"{len(values)} values but {len(points)} points")
+    digest = mesh_digest(points)
+    points_path = mesh_path(c=c, digest=digest)
+    # The coordinates are shared by all responses on this mesh.
+    if not os.path.exists(points_path):
+        with atomic_write(points_path, "wb") as f:
+            np.save(f, points)
+    # The values file is written last, its existence means responses are saved.
+    with atomic_write(path + MESH_EXT) as f:
+        f.write(digest)
+    with atomic_write(path, "wb") as f:
+        np.save(f, values)
+
+
+def load_responses(
+    c: Config, path: str, mmap: bool = True
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Load response values and their coordinates.
+
+    Responses saved in the legacy format (a dill-pickled list of (value, Point)
+    tuples) are converted to columnar format on first load.
+
+    Args:
+        c: simulation configuration object.
+        path: path of the values file.
+        mmap: memory-map the arrays (read-only) instead of reading into memory.
+
+    """
+    if not is_columnar(path):
+        values, points = _load_legacy(path)
+        print_i(f"Converting legacy responses to columnar format: {path}")
+        save_responses(c=c, path=path, values=values, points=points)
+    mmap_mode = "r" if mmap else None
+    with open(path + MESH_EXT) as f:
+        digest = f.read().strip()
+    values = np.load(path, mmap_mode=mmap_mode)
+    points = np.load(mesh_path(c=c, digest=digest), mmap_mode=mmap_mode)
+    if len(values) != len(points):
+        raise ValueError(f"Mesh {digest} does not match values in {path}")
+    return values, points
+
+
+def remove_responses(path: str):
+    """Remove a values file and its sidecar files, those that exist.
+
+    The values file is removed first, its absence means responses are not saved.
+
+    """
+    for ext in ["", MESH_EXT, META_EXT]:
+        if os.path.exists(path + ext):
+            os.remove(path + ext)
+
+
+def _load_legacy(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Load a dill-pickled list of (value, Point) tuples as arrays."""
+    with open(path, "rb") as f:
+        responses = dill.load(f)
+    values = np.array([value for value, _ in responses], dtype=np.float64)
+    points = np.array([[p.x, p.y, p.z] for _, p in responses], dtype=np.float64)
+    return values, points
+
+
+class ColumnStore:
+    """Columns of a matrix on disk, each keyed by a point, grown by appending.
+
+    Each append saves a chunk of columns in a directory: the columns as a
+    '.npy' file of shape (K, R), i.e. one row per column, and the rounded
+    coordinates of the K points in a '.keys.npy' file which is written last.
+    Chunks are never modified and have unique names, so concurrent appends do
+    not conflict and a crashed append is ignored. A point saved twice is loaded
+    from the first chunk found.
+
+    Args:
+        path: path of the directory of the store.
+
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def _keys(points: np.ndarray) -> np.ndarray:
+        return round_m(np.asarray(points, dtype=np.float64).reshape(-1, 3))
+
+    def index(self) -> Dict[Tuple[float, float, float], Tuple[str, int]]:
+        """Path of the chunk and row in the chunk of each saved point."""
+        result = dict()
+        for keys_path in sorted(glob.glob(os.path.join(self.path, "*.keys.npy"))):
+            values_path = keys_path[: -len(".keys.npy")] + ".npy"
+            for row, key in enumerate(map(tuple, np.load(keys_path).tolist())):
+                result.setdefault(key, (values_path, row))
+        return result
+
+    def missing(self, points: np.ndarray) -> np.ndarray:
+        """Whether each point of an array of shape (P, 3) is not saved."""
+        index = self.index()
+        return np.array(
+            [key not in index for key in map(tuple, self._keys(points).tolist())],
+            dtype=bool,
+        )
+
+    def append(self, points: np.ndarray, columns: np.ndarray):
+        """Save columns of shape (R, K), for points of shape (K, 3)."""
+        keys = self._keys(points)
+        columns = np.asarray(columns, dtype=np.float64)
+        if columns.ndim != 2 or columns.shape[1] != len(keys):
+            raise ValueError(f"{len(keys)} points but columns of {columns.shape}")
+        name = os.path.join(self.path, uuid.uuid4().hex)
+        with atomic_write(name + ".npy", "wb") as f:
+            np.save(f, np.ascontiguousarray(columns.T))
+        with atomic_write(name + ".keys.npy", "wb") as f:
+            np.save(f, keys)
+
+    def gather(self, points: np.ndarray) -> np.ndarray:
+        """The columns of points of shape (P, 3), as an array of shape (R, P).
+
+        Chunks are memory-mapped, so only the requested columns are read.
+
+        """
+        index = self.index()
+        keys = list(map(tuple, self._keys(points).tolist()))
+        for key in keys:
+            if key not in index:
+                raise KeyError(f"No column for point {key} in {self.path}")
+        by_chunk = dict()
+        for i, key in enumerate(keys):
+            values_path, row = index[key]
+            by_chunk.setdefault(values_path, []).append((i, row))
+        result = np.empty((0, 0))
+        for values_path, rows in by_chunk.items():
+            chunk = np.load(values_path, mmap_mode="r")
+            if result.size == 0:
+                result = np.empty((chunk.shape[1], len(keys)))
+            i, row = map(list, zip(*rows))
+            result[:, i] = chunk[row].T
+        return result
@@ -1,10 +1,38 @@
+import os
+
+from bridge_sim.util import lookup_short_path
+
+
 def _responses_path(
     sim_runner: "FEMRunner", sim_params: "SimParams", response_type: "ResponseType"
 ) -> str:
-    """Path to fem that were generated with given parameters."""
-    return sim_runner.sim_out_path(
-        sim_params=sim_params, ext="npy", response_types=[response_type]
+    """Path to fem that were generated with given parameters.
+
+    The path is content-addressed, see 'bridge_sim.sim.cache'. Responses saved
+    at the previous (legacy) path are moved to the content-addressed path. The
+    legacy path is only looked up, not added, in the database of shortened
+    paths.
+
+    """
+    from bridge_sim.sim.cache import adopt_legacy, cached_responses_path
+
+    c = sim_runner.c
+    path = cached_responses_path(
+        c=c, sim_params=sim_params, response_type=response_type
     )
+    if not os.path.exists(path):
+        legacy_path = lookup_short_path(
+            c=c,
+            filepath=sim_runner.sim_out_path(
+                sim_params=sim_params,
+                ext="npy",
+                response_types=[response_type],
+                shorten=False,
+            ),
+        )
+        if legacy_path is not None and os.path.exists(legacy_path):
+            adopt_legacy(c=c, legacy_path=legacy_path, path=path, sim_params=sim_params)
+    return path
 
 
 # determinant of matrix a
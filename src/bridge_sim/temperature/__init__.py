@@ -15,7 +15,7 @@ from sklearn.linear_model import LinearRegression
 
 from bridge_sim.model import Config, Point, ResponseType
 from bridge_sim.scenarios import ThermalScenario
-from bridge_sim.sim.responses import load_fem_responses
+from bridge_sim.sim.responses import ULResponses, load_fem_responses
 from bridge_sim.sim.run.opensees import OSRunner
 from bridge_sim.util import print_d, print_i, project_dir
 
@@ -168,6 +168,77 @@ def temps_bottom_top(c: Config, temps: List[float], solar: List[float], len_per_
     return np.array(temps_b), np.array(temps_s)
 
 
+def sim_effect(
+    c: Config, response_type: ResponseType, points: List[Point]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit uniform and linear temperature effect at each point, by simulation."""
+    original_c = c
+    # Unit effect from uniform temperature loading.
+    unit_uniform = ThermalScenario(axial_delta_temp=c.unit_axial_delta_temp_c)
+    c, sim_params = unit_uniform.use(original_c)
+    uniform_responses = load_fem_responses(
+        c=c, sim_runner=OSRunner, response_type=response_type, sim_params=sim_params,
+    )
+    # Unit effect from linear temperature loading.
+    unit_linear = ThermalScenario(moment_delta_temp=c.unit_moment_delta_temp_c)
+    c, sim_params = unit_linear.use(original_c)
+    linear_responses = load_fem_responses(
+        c=c, sim_runner=OSRunner, response_type=response_type, sim_params=sim_params,
+    )
+    print_i("Loaded unit uniform and linear temperature fem")
+
+    # Convert uniform fem to correct type (thermal post-processing).
+    if response_type in [
+        ResponseType.Strain,
+        ResponseType.StrainT,
+        ResponseType.StrainZZB,
+    ]:
+        uniform_responses = unit_uniform.to_strain(c=c, sim_responses=uniform_responses)
+    elif response_type == ResponseType.Stress:
+        uniform_responses = unit_uniform.to_stress(c=c, sim_responses=uniform_responses)
+    unit_uniforms = np.array(uniform_responses.at_decks(points))
+
+    # Convert linear fem to correct type (thermal post-processing).
+    if response_type in [
+        ResponseType.Strain,
+        ResponseType.StrainT,
+        ResponseType.StrainZZB,
+    ]:
+        linear_responses = unit_linear.to_strain(c=c, sim_responses=linear_responses)
+    elif response_type == ResponseType.Stress:
+        linear_responses = unit_linear.to_stress(c=c, sim_responses=linear_responses)
+    unit_linears = np.array(linear_responses.at_decks(points))
+
+    return unit_uniforms, unit_linears
+
+
+def surrogate_effect(
+    c: Config, response_type: ResponseType, points: List[Point], scales: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit uniform and linear temperature effect at each point, by surrogate.
+
+    Args:
+        c: Config, global configuration object.
+        response_type: ResponseType, type of sensor response to temp. effect.
+        points: List[Point], points at which to calculate temperature effect.
+        scales: np.ndarray, scale of the stiffness of each group of elements,
+            see 'bridge_sim.sim.run.sparse.rom'.
+
+    """
+    surrogate = ULResponses.load_surrogate(
+        c=c, response_type=response_type, points=points, sim_runner=c._sim_runner(c),
+    )
+    unit_uniforms, unit_linears = surrogate.thermal_responses(scales)
+    if response_type.is_strain():
+        unit_uniform = ThermalScenario(axial_delta_temp=c.unit_axial_delta_temp_c)
+        unit_linear = ThermalScenario(moment_delta_temp=c.unit_moment_delta_temp_c)
+        unit_uniforms = unit_uniform.strain(c=c, responses=unit_uniforms)
+        unit_linears = unit_linear.strain(c=c, responses=unit_linears)
+    elif response_type.is_stress():
+        raise ValueError("Stress is not supported by surrogates")
+    return unit_uniforms, unit_linears
+
+
 def effect(
     c: Config,
     response_type: ResponseType,
@@ -178,6 +249,7 @@ def effect(
     solar: Optional[List[float]] = None,
     d: bool = False,
     ret_temps_bt: bool = False,
+    scales: Optional[np.ndarray] = None,
 ) -> List[List[float]]:
     """Temperature effect at given points for a number of given temperatures.
 
@@ -204,6 +276,10 @@ def effect(
             data given at one data point per minute.
         solar: Optional[List[float]], first see 'len_per_hour'. Solar irradiance
             data given at one data point per minute, same as 'temps'.
+        scales: Optional[np.ndarray], if given then the unit temperature
+            responses are from a reduced-order model of the bridge, with the
+            stiffness of each group of elements scaled by the given factor
+            (see 'ULResponses.load_surrogate'), instead of simulation.
 
     """
     if temps_bt is not None:
@@ -212,44 +288,16 @@ def effect(
                 "Must only pass 'temps_bt', or ('len_per_hour', 'temps' & 'solar')"
             )
 
-    original_c = c
-    # Unit effect from uniform temperature loading.
-    unit_uniform = ThermalScenario(axial_delta_temp=c.unit_axial_delta_temp_c)
-    c, sim_params = unit_uniform.use(original_c)
-    uniform_responses = load_fem_responses(
-        c=c, sim_runner=OSRunner, response_type=response_type, sim_params=sim_params,
-    )
-    # Unit effect from linear temperature loading.
-    unit_linear = ThermalScenario(moment_delta_temp=c.unit_moment_delta_temp_c)
-    c, sim_params = unit_linear.use(original_c)
-    linear_responses = load_fem_responses(
-        c=c, sim_runner=OSRunner, response_type=response_type, sim_params=sim_params,
-    )
-    print_i("Loaded unit uniform and linear temperature fem")
-
-    # Convert uniform fem to correct type (thermal post-processing).
-    if response_type in [
-        ResponseType.Strain,
-        ResponseType.StrainT,
-        ResponseType.StrainZZB,
-    ]:
-        uniform_responses = unit_uniform.to_strain(c=c, sim_responses=uniform_responses)
-    elif response_type == ResponseType.Stress:
-        uniform_responses = unit_uniform.to_stress(c=c, sim_responses=uniform_responses)
-    unit_uniforms = np.array(uniform_responses.at_decks(points))
+    if scales is not None:
+        unit_uniforms, unit_linears = surrogate_effect(
+            c=c, response_type=response_type, points=points, scales=scales
+        )
+    else:
+        unit_uniforms, unit_linears = sim_effect(
+            c=c, response_type=response_type, points=points
+        )
     print(f"Unit uniform temperature per point, shape = {unit_uniforms.shape}")
 
-    # Convert linear fem to correct type (thermal post-processing).
-    if response_type in [
-        ResponseType.Strain,
-        ResponseType.StrainT,
-        ResponseType.StrainZZB,
-    ]:
-        linear_responses = unit_linear.to_strain(c=c, sim_responses=linear_responses)
-    elif response_type == ResponseType.Stress:
-        linear_responses = unit_linear.to_stress(c=c, sim_responses=linear_responses)
-    unit_linears = np.array(linear_responses.at_decks(points))
-
     # Determine temperature gradient throughout the bridge.
     if temps_bt is None:
         temps_bottom, temps_top = temps_bottom_top(
@@ -1,17 +1,19 @@
 """Generate time series of traffic."""
 
+import itertools
 import os
-from collections import deque
+from collections import defaultdict, deque
 from timeit import default_timer as timer
-from typing import NewType, List, Tuple, Callable, Optional
+from typing import NewType, Iterator, List, Tuple, Callable, Optional, Union
 
 import dill
 import numpy as np
-from bridge_sim.vehicles.sample import sample_vehicle
+from bridge_sim.vehicles.sample import sample_vehicles
+from scipy import sparse as sp
 from scipy.interpolate import interp1d
 
 from bridge_sim.model import Bridge, Config, PointLoad, Vehicle
-from bridge_sim.util import print_i, print_d, st, safe_str
+from bridge_sim.util import print_i, print_d, round_m, safe_str
 
 D = False
 
@@ -27,7 +29,9 @@ Traffic = NewType("Traffic", List[List[List[Vehicle]]])
 # An array of time step (rows) * wheel position (columns). Each cell value is
 # load in kilo Newton. This representation is useful for matrix multiplication.
 # NOTE: a cell in a column is indexed as wheel track * x position.
-TrafficArray = NewType("TrafficArray", np.ndarray)
+# Only the few load positions under an axle are non-zero at each time step, so
+# a 'TrafficArray' may also be a sparse CSR matrix, of the same shape.
+TrafficArray = NewType("TrafficArray", Union[np.ndarray, sp.csr_matrix])
 
 
 class TrafficScenario:
@@ -214,8 +218,10 @@ def to_traffic_array(
     max_time: float,
     warm_up: bool = True,
     new: bool = True,
-) -> Traffic:
-    """Convert a 'TrafficSequence' to 'Traffic'.
+    sparse: bool = False,
+    vectorized: bool = True,
+) -> TrafficArray:
+    """Convert a 'TrafficSequence' to a 'TrafficArray'.
 
     Args:
         c: Config, global configuration object.
@@ -225,8 +231,23 @@ def to_traffic_array(
         warm_up: bool, if true then begin generating the 'TrafficArray' once the
             first vehicles has passed over the bridge (traffic has warmed up).
         new: bool, use the new "bucketing" method instead of the old method.
+        sparse: bool, return a sparse CSR matrix instead of a dense array.
+        vectorized: bool, with the new method, compute the loads of each
+            vehicle at all its time steps at once (see 'traffic_array_blocks'),
+            instead of stepping through time.
 
     """
+    if new and vectorized:
+        return next(
+            traffic_array_blocks(
+                c=c,
+                traffic_sequence=traffic_sequence,
+                max_time=max_time,
+                warm_up=warm_up,
+                block_size=int(max_time / c.sensor_hz) + 1,
+                sparse=sparse,
+            )
+        )
 
     # NOTE: If you are going to try understand the code in this function then
     # start with looking at 'to_traffic', as that is almost a subset of this
@@ -237,15 +258,15 @@ def to_traffic_array(
     print(
         f"array size = {int(max_time / time_step)}, {len(c.bridge.lanes) * 2 * c.il_num_loads}"
     )
-    # Initial traffic array, to be filled in.
-    result = np.zeros(
-        (
-            # '+ 1' to account for time t = 0.
-            int(max_time / time_step) + 1,
-            # 2 wheel tracks per lane.
-            len(c.bridge.lanes) * 2 * c.il_num_loads,
-        )
+    shape = (
+        # '+ 1' to account for time t = 0.
+        int(max_time / time_step) + 1,
+        # 2 wheel tracks per lane.
+        len(c.bridge.lanes) * 2 * c.il_num_loads,
     )
+    # Initial traffic array, to be filled in. If sparse, the loads of each time
+    # step by column index, converted to a CSR matrix at the end.
+    result = [] if sparse else np.zeros(shape)
     # Current traffic per lane.
     current = [deque([]) for _ in c.bridge.lanes]
     # Current time and timestep index.
@@ -271,7 +292,7 @@ def to_traffic_array(
     warmed_up_at = traffic_sequence[0][0].time_left_bridge(c.bridge)
 
     last_print_time, start_time = -np.inf, None
-    while time_i < result.shape[0]:
+    while time_i < shape[0]:
         # Print an update when at least 1 second has passed.
         if time - last_print_time > 1:
             print_i(f"Generating 'TrafficArray', time = {time:.4f} s", end="\r")
@@ -304,6 +325,7 @@ def to_traffic_array(
             # TODO: This bottom part of the loop should be parallelized!
             if start_time is None:
                 start_time = time
+            row = defaultdict(float) if sparse else result[time_i]
             # For each vehicles, find the lane it's on, and indices into the ULM.
             if new:
                 for js, vehicles in zip(j_indices, current):
@@ -318,7 +340,7 @@ def to_traffic_array(
                                 for x_ind, (load_x, load_kn) in zip(
                                     x_inds, wheel_loads
                                 ):
-                                    result[time_i][j + x_ind] += load_kn
+                                    row[j + x_ind] += load_kn
             # The old method.
             else:
                 # For each lane.
@@ -335,16 +357,215 @@ def to_traffic_array(
                                 # For each wheel.
                                 for j in [j0, j1]:
                                     # print(f"lane = {l}, w = {w}, x = {x}, x_interp = {x_interp(x)}, j = {j}, kn = {kn / 2}")
-                                    result[time_i][j + x_ind] = kn / 2
+                                    row[j + x_ind] = kn / 2
+            if sparse:
+                result.append(row)
             time_i += 1
         time += time_step
 
     print_i(
         f"Generated {time - start_time - time_step:.4f} s of 'TrafficArray' from 'TrafficSequence'"
     )
+    if sparse:
+        result = sp.csr_matrix(
+            (
+                np.fromiter(
+                    itertools.chain.from_iterable(r.values() for r in result), float
+                ),
+                np.fromiter(
+                    itertools.chain.from_iterable(r.keys() for r in result), np.int64
+                ),
+                np.cumsum([0] + [len(r) for r in result]),
+            ),
+            shape=shape,
+        )
+        result.sort_indices()
     return result
 
 
+def _time_steps(
+    c: Config, traffic_sequence: TrafficSequence, max_time: float, warm_up: bool
+) -> Tuple[np.ndarray, List[Tuple[Vehicle, int, int]]]:
+    """Time of each time step of a 'TrafficArray', and when each vehicle is on.
+
+    Time steps and events are as in 'to_traffic_array': time advances by
+    repeatedly adding 'Config.sensor_hz', and an event occurs at the first time
+    step at or after (or close to) the event's time.
+
+    Returns:
+        A tuple of: an array of the time of each time step; and for each vehicle
+        on the bridge during the time steps, in order of entering, a tuple of
+        the vehicle, the first time step it is on and the time step it left.
+
+    """
+    time_step = c.sensor_hz
+    n_times = int(max_time / time_step) + 1
+    warmed_up_at = traffic_sequence[0][0].time_left_bridge(c.bridge)
+    n_raw = n_times + (int(warmed_up_at / time_step) + 2 if warm_up else 0)
+    while True:
+        raw_times = np.add.accumulate(np.full(n_raw, time_step))
+        raw_times[1:] = raw_times[:-1]
+        raw_times[0] = 0
+        first = 0
+        if warm_up:
+            warm = (raw_times > warmed_up_at) | np.isclose(raw_times, warmed_up_at)
+            first = np.argmax(warm) if np.any(warm) else n_raw
+        if first + n_times <= n_raw:
+            break
+        n_raw *= 2
+    # Time step at which each event occurs, events occur in order.
+    event_times = np.array([time for _, time, _ in traffic_sequence])
+    event_steps = np.searchsorted(
+        raw_times, event_times - (1e-8 + 1e-5 * np.abs(event_times))
+    )
+    event_steps = np.maximum.accumulate(event_steps) - first
+    result = []
+    current = [deque([]) for _ in c.bridge.lanes]
+    for (vehicle, _, enter), step in zip(traffic_sequence, event_steps.tolist()):
+        if step >= n_times:
+            break
+        if enter:
+            current[vehicle.lane].append((vehicle, max(step, 0)))
+        else:
+            left_vehicle, entered = current[vehicle.lane].popleft()
+            if step > entered:
+                result.append((entered, left_vehicle, step))
+    for lane in current:
+        result.extend((entered, vehicle, n_times) for vehicle, entered in lane)
+    result.sort(key=lambda r: r[0])
+    return (
+        raw_times[first : first + n_times],
+        [(vehicle, entered, left) for entered, vehicle, left in result],
+    )
+
+
+def _vehicle_loads(
+    c: Config, vehicle: Vehicle, times: np.ndarray, wheel_track_xs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Loads of a vehicle at time steps, bucketed onto the wheel tracks.
+
+    The same loads as 'Vehicle.to_wheel_track_loads_' at each time step, for
+    all time steps and axles at once.
+
+    Returns:
+        A tuple of three arrays: index into 'times', column in 'TrafficArray',
+        and load in kN, of each load.
+
+    """
+    bridge = c.bridge
+    x = interp1d([0, 1], [bridge.x_min, bridge.x_max], fill_value="extrapolate")
+    # Position of each axle at each time step, as in 'Vehicle.xs_at'.
+    vehicle.xs_at(time=times[0], bridge=bridge)
+    xs0 = vehicle._xs_at_time
+    deltas = x(vehicle.x_frac_at(time=times, bridge=bridge)) - xs0[0]
+    xs = np.sort(xs0[np.newaxis, :] + deltas[:, np.newaxis], axis=1)
+    kns = np.broadcast_to(np.array(vehicle.kn_per_axle(), dtype=float), xs.shape)
+    steps = np.broadcast_to(np.arange(len(times))[:, np.newaxis], xs.shape)
+    on = ~(
+        ((xs < bridge.x_min) & ~np.isclose(xs, bridge.x_min))
+        | ((xs > bridge.x_max) & ~np.isclose(xs, bridge.x_max))
+    )
+    # Axles within tolerance of either end are at that end.
+    xs = np.clip(xs[on], bridge.x_min, bridge.x_max)
+    kns, steps = kns[on], steps[on]
+    # Bucketing onto the unit loads either side, as 'Vehicle.to_wheel_track_xs'.
+    wheel_xs = round_m(xs)
+    lo = np.minimum(np.searchsorted(wheel_track_xs, wheel_xs), len(wheel_track_xs) - 1)
+    lo -= wheel_track_xs[lo] > wheel_xs
+    hi = np.minimum(lo + 1, len(wheel_track_xs) - 1)
+    exact = np.isclose(wheel_xs, wheel_track_xs[lo])
+    dist_lo = np.abs(wheel_track_xs[lo] - wheel_xs)
+    dist_hi = np.abs(wheel_track_xs[hi] - wheel_xs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac_lo = np.where(exact, 1, dist_hi / (dist_lo + dist_hi))
+        frac_hi = np.where(exact, 0, dist_lo / (dist_lo + dist_hi))
+    load_xs = np.concatenate(
+        [np.where(exact, wheel_xs, wheel_track_xs[lo]), wheel_track_xs[hi]]
+    )
+    fracs = np.concatenate([frac_lo, frac_hi])
+    keep = fracs > 0
+    # Column of each unit load, as in 'to_traffic_array'.
+    x_ind = interp1d([bridge.x_min, bridge.x_max], [0, c.il_num_loads - 1])
+    x_inds = np.around(x_ind(load_xs[keep]), 0).astype(int)
+    kns = (np.tile(kns, 2) / 2 * fracs)[keep]
+    steps = np.tile(steps, 2)[keep]
+    # Each load is on both wheel tracks of the vehicle's lane.
+    j0 = vehicle.lane * 2 * c.il_num_loads
+    return (
+        np.tile(steps, 2),
+        np.concatenate([j0 + x_inds, j0 + c.il_num_loads + x_inds]),
+        np.tile(kns, 2),
+    )
+
+
+def traffic_array_blocks(
+    c: Config,
+    traffic_sequence: TrafficSequence,
+    max_time: float,
+    warm_up: bool = True,
+    block_size: Optional[int] = None,
+    sparse: bool = False,
+) -> Iterator[TrafficArray]:
+    """Generate a 'TrafficArray' one block of time steps at a time.
+
+    The same 'TrafficArray' as 'to_traffic_array' (with the new method), but
+    the loads of each vehicle are computed for all its time steps in a block
+    at once, with array arithmetic. Blocks can be passed on to
+    'responses_to_traffic_blocks' as they are generated.
+
+    Args:
+        c: Config, global configuration object.
+        traffic_sequence: TrafficSequence, the sequence of traffic to convert.
+        max_time: float, maximum time of 'TrafficArray' to generate.
+        warm_up: bool, see 'to_traffic_array'.
+        block_size: Optional[int], time steps per block, by default
+            'Config.traffic_block_size'.
+        sparse: bool, yield sparse CSR matrices instead of dense arrays.
+
+    """
+    if block_size is None:
+        block_size = c.traffic_block_size
+    start_time = timer()
+    times, on_bridge = _time_steps(
+        c=c, traffic_sequence=traffic_sequence, max_time=max_time, warm_up=warm_up
+    )
+    wheel_track_xs = np.asarray(c.bridge.wheel_track_xs(c))
+    n_columns = len(c.bridge.lanes) * 2 * c.il_num_loads
+    # Vehicles on the bridge during the current block.
+    current, next_i = [], 0
+    for start in range(0, len(times), block_size):
+        end = min(start + block_size, len(times))
+        current = [v for v in current if v[2] > start]
+        while next_i < len(on_bridge) and on_bridge[next_i][1] < end:
+            current.append(on_bridge[next_i])
+            next_i += 1
+        rows, columns, loads = [np.empty(0, dtype=int)], [np.empty(0, dtype=int)], []
+        for vehicle, entered, left in current:
+            lo, hi = max(entered, start), min(left, end)
+            if hi <= lo:
+                continue
+            vehicle_rows, vehicle_columns, vehicle_loads = _vehicle_loads(
+                c=c, vehicle=vehicle, times=times[lo:hi], wheel_track_xs=wheel_track_xs
+            )
+            rows.append(vehicle_rows + (lo - start))
+            columns.append(vehicle_columns)
+            loads.append(vehicle_loads)
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+        loads = np.concatenate(loads) if len(loads) > 0 else np.empty(0)
+        shape = (end - start, n_columns)
+        if sparse:
+            block = sp.csr_matrix((loads, (rows, columns)), shape=shape)
+        else:
+            block = np.bincount(
+                rows * n_columns + columns, weights=loads, minlength=shape[0] * shape[1]
+            ).reshape(shape)
+        yield block
+    print_i(
+        f"Generated {len(times)} time steps of 'TrafficArray' from 'TrafficSequence'"
+        + f" in {timer() - start_time:.2f}s"
+    )
+
+
 def arrival(beta: float, min_d: float):
     """Inter-arrival times of vehicles to a bridge."""
     result = np.random.exponential(beta)
@@ -356,15 +577,15 @@ def arrival(beta: float, min_d: float):
 
 def normal_traffic(c: Config, lam: float, min_d: float):
     """Normal traffic scenario, arrives according to poisson process."""
-    count = 0
+    # Vehicles are sampled in batches, see 'sample_vehicles'.
+    vehicles = deque([])
 
     def mv_vehicle_f(time: float, full_lanes: int):
-        start = timer()
-        vehicle = sample_vehicle(c), arrival(beta=lam, min_d=min_d)
-        nonlocal count
-        count += 1
-        print_i(f"{count}{st(count)} sampled vehicles took {timer() - start}")
-        return vehicle
+        if len(vehicles) == 0:
+            start = timer()
+            vehicles.extend(sample_vehicles(c, n=1000))
+            print_i(f"Sampling {len(vehicles)} vehicles took {timer() - start:.3f}s")
+        return vehicles.popleft(), arrival(beta=lam, min_d=min_d)
 
     return TrafficScenario(name=f"normal-lam-{lam}", mv_vehicle_f=mv_vehicle_f)
 
@@ -425,8 +646,14 @@ def load_traffic(
     traffic_scenario: TrafficScenario,
     max_time: float,
     add: Optional[str] = None,
+    sparse: bool = False,
 ):
-    """Load traffic from disk, generated if necessary."""
+    """Load traffic from disk, generated if necessary.
+
+    If 'sparse' then the 'TrafficArray' is a sparse CSR matrix, see
+    'to_traffic_array'. Dense and sparse arrays are of the same traffic.
+
+    """
     path = (
         c.get_data_path(
             "traffic",
@@ -438,25 +665,36 @@ def load_traffic(
     print(path)
     if add is not None:
         path += add
+    array_path = path + (".csr" if sparse else ".arr")
     # Create the traffic if it doesn't exist.
-    if not os.path.exists(path + ".arr"):
-        traffic_sequence = traffic_scenario.traffic_sequence(
-            bridge=c.bridge, max_time=max_time
-        )
-        traffic = to_traffic(c=c, traffic_sequence=traffic_sequence, max_time=max_time)
+    if not os.path.exists(array_path):
+        # The array in the other format, and thus the traffic, may exist.
+        if os.path.exists(path + (".arr" if sparse else ".csr")):
+            with open(path + ".seq", "rb") as f:
+                traffic_sequence = dill.load(f)
+        else:
+            traffic_sequence = traffic_scenario.traffic_sequence(
+                bridge=c.bridge, max_time=max_time
+            )
+            traffic = to_traffic(
+                c=c, traffic_sequence=traffic_sequence, max_time=max_time
+            )
+            with open(path + ".seq", "wb") as f:
+                dill.dump(traffic_sequence, f)
+            with open(path + ".tra", "wb") as f:
+                dill.dump(traffic, f)
         traffic_array = to_traffic_array(
-            c=c, traffic_sequence=traffic_sequence, max_time=max_time
+            c=c, traffic_sequence=traffic_sequence, max_time=max_time, sparse=sparse
         )
-        with open(path + ".seq", "wb") as f:
-            dill.dump(traffic_sequence, f)
-        with open(path + ".tra", "wb") as f:
-            dill.dump(traffic, f)
-        with open(path + ".arr", "wb") as f:
-            np.save(f, traffic_array)
+        with open(array_path, "wb") as f:
+            if sparse:
+                sp.save_npz(f, traffic_array)
+            else:
+                np.save(f, traffic_array)
     with open(path + ".seq", "rb") as f:
         traffic_sequence = dill.load(f)
     with open(path + ".tra", "rb") as f:
         traffic = dill.load(f)
-    with open(path + ".arr", "rb") as f:
-        traffic_array = np.load(f)
+    with open(array_path, "rb") as f:
+        traffic_array = sp.load_npz(f) if sparse else np.load(f)
     return traffic_sequence, traffic, traffic_array
@@ -1,14 +1,17 @@
 """Useful functions that don't belong anywhere else."""
 from __future__ import annotations
 
+import contextlib
+import functools
 import os
 import math
-from typing import Union
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple, Union
 
 import findup
 import numpy as np
 import pandas as pd
-import portalocker
 import scipy.stats as stats
 from colorama import init
 from termcolor import colored
@@ -101,42 +104,202 @@ def nearest_index(array, value):
         return i
 
 
+def nearest_indices(array: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Like 'nearest_index', for each of many values."""
+    array, values = np.asarray(array), np.asarray(values)
+    i = np.searchsorted(array, values, side="left")
+    lo = np.maximum(i - 1, 0)
+    hi = np.minimum(i, len(array) - 1)
+    below = (i > 0) & (
+        (i == len(array)) | (np.abs(values - array[lo]) < np.abs(values - array[hi]))
+    )
+    return np.where(below, i - 1, i)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """Open a temporary file for writing, which atomically replaces 'path'.
+
+    The file at 'path' is only replaced if the 'with' block exits without an
+    exception, so a crash never leaves a partially written file at 'path'.
+
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Table mapping original filepaths to shortened filepaths.
+_PATHS_TABLE = """
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    original TEXT UNIQUE NOT NULL,
+    short TEXT UNIQUE NOT NULL
+)
+"""
+# Open connections to path index databases, per process and thread.
+_path_index_conns: Dict[Tuple[int, int, str], sqlite3.Connection] = dict()
+
+
+def path_index_path(c: Config) -> str:
+    """Path of the database mapping filepaths to shortened filepaths."""
+    return c.get_data_path("metadata", "filepath-shortening-map.db")
+
+
+def _path_index(db_path: str) -> sqlite3.Connection:
+    """Connection to a path index database, creating it if necessary.
+
+    A new database imports any existing CSV map in the same directory.
+
+    """
+    key = (os.getpid(), threading.get_ident(), db_path)
+    if key not in _path_index_conns:
+        exists = os.path.exists(db_path)
+        # Autocommit mode, transactions are started explicitly.
+        conn = sqlite3.connect(db_path, timeout=600, isolation_level=None)
+        # Readers don't block on the writer, and vice versa.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_PATHS_TABLE)
+        _path_index_conns[key] = conn
+        csv_path = os.path.join(os.path.dirname(db_path), "filepath-shortening-map.txt")
+        if not exists and os.path.exists(csv_path):
+            import_path_csv(db_path=db_path, csv_path=csv_path)
+    return _path_index_conns[key]
+
+
+def _next_path_id(conn: sqlite3.Connection) -> int:
+    """ID of the next path added to a path index."""
+    return conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM paths").fetchone()[0]
+
+
+def _shorten_paths(db_path: str, filepaths: List[str]) -> List[str]:
+    """Shortened filepaths, adding new filepaths in one transaction."""
+    conn = _path_index(db_path)
+
+    def lookup(filepath: str) -> Optional[str]:
+        row = conn.execute(
+            "SELECT short FROM paths WHERE original = ?", (filepath,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    shorts = list(map(lookup, filepaths))
+    if all(short is not None for short in shorts):
+        return shorts
+    # Take the write lock, another process may have added some filepaths.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        next_id = _next_path_id(conn)
+        for i, filepath in enumerate(filepaths):
+            if shorts[i] is not None:
+                continue
+            shorts[i] = lookup(filepath)
+            if shorts[i] is not None:
+                continue
+            shorts[i] = os.path.join(
+                os.path.dirname(filepath),
+                "short" + str(next_id) + os.path.splitext(filepath)[1],
+            )
+            conn.execute(
+                "INSERT INTO paths (id, original, short) VALUES (?, ?, ?)",
+                (next_id, filepath, shorts[i]),
+            )
+            next_id += 1
+            print_i(f"Shortened path to: {shorts[i]}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return shorts
+
+
+@functools.lru_cache(maxsize=2 ** 16)
+def _shorten_path(db_path: str, filepath: str) -> str:
+    """Cached shortened filepath, a mapping never changes once added."""
+    return _shorten_paths(db_path=db_path, filepaths=[filepath])[0]
+
+
 def shorten_path(c: Config, filepath: str, bypass_config: bool = False) -> str:
-    """Shorten path by mapping to a shorter filepath via a metadata file."""
+    """Shorten path by mapping to a shorter filepath via a metadata database."""
     if not bypass_config and not c.shorten_paths:
         return filepath
-    df_path = c.get_data_path("metadata", "filepath-shortening-map.txt")
-    lock_path = df_path + ".lock"
+    short = _shorten_path(db_path=path_index_path(c), filepath=filepath)
+    if not os.path.exists(os.path.dirname(short)):
+        os.makedirs(os.path.dirname(short), exist_ok=True)
+    return short
 
-    # Acquire an exclusive file lock.
-    with portalocker.Lock(lock_path, flags=portalocker.LOCK_EX) as f:
 
-        def flush():
-            """Ensure all results are written back before exiting 'with'."""
-            f.flush()
-            os.fsync(f.fileno())
+def lookup_short_path(
+    c: Config, filepath: str, bypass_config: bool = False
+) -> Optional[str]:
+    """Shortened path of a filepath, None if it was never shortened.
 
-        if os.path.exists(df_path):
-            df = pd.read_csv(df_path, index_col=0)
-        else:
-            df = pd.DataFrame(columns=["original", "short"])
-        existing_row = df[df["original"] == filepath]
-        if len(existing_row) == 1:
-            return str(existing_row["short"].iloc[0])
-        elif len(existing_row) > 1:
-            raise ValueError(f"Duplicate rows in metadata file: row = {filepath}")
-        short = len(df.index) + 1
-        short = os.path.join(
-            os.path.dirname(filepath),
-            "short" + str(short) + os.path.splitext(filepath)[1],
-        )
+    Unlike 'shorten_path' the filepath is not added to the database.
+
+    """
+    if not bypass_config and not c.shorten_paths:
+        return filepath
+    db_path = path_index_path(c)
+    if not os.path.exists(db_path):
+        return None
+    row = (
+        _path_index(db_path)
+        .execute("SELECT short FROM paths WHERE original = ?", (filepath,))
+        .fetchone()
+    )
+    return None if row is None else row[0]
+
+
+def shorten_paths(
+    c: Config, filepaths: List[str], bypass_config: bool = False
+) -> List[str]:
+    """Shorten many paths, any new paths are added in one transaction."""
+    if not bypass_config and not c.shorten_paths:
+        return filepaths
+    shorts = _shorten_paths(db_path=path_index_path(c), filepaths=filepaths)
+    for short in shorts:
         if not os.path.exists(os.path.dirname(short)):
-            os.makedirs(os.path.dirname(short))
-        df = df.append({"original": filepath, "short": short}, ignore_index=True)
-        df.to_csv(df_path)
-        flush()
-    print_i(f"Shortened path to: {short}")
-    return short
+            os.makedirs(os.path.dirname(short), exist_ok=True)
+    return shorts
+
+
+def import_path_csv(db_path: str, csv_path: str):
+    """Import a CSV map of filepaths to shortened filepaths into a database.
+
+    The CSV map is the format previously used by 'shorten_path'. Filepaths
+    already in the database are skipped.
+
+    """
+    conn = _path_index(db_path)
+    df = pd.read_csv(csv_path, index_col=0)
+    print_i(f"Importing {len(df.index)} shortened paths from {csv_path}")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        next_id = _next_path_id(conn)
+        for original, short in zip(df["original"], df["short"]):
+            try:
+                conn.execute(
+                    "INSERT INTO paths (id, original, short) VALUES (?, ?, ?)",
+                    (next_id, str(original), str(short)),
+                )
+                next_id += 1
+            except sqlite3.IntegrityError:
+                existing = conn.execute(
+                    "SELECT short FROM paths WHERE original = ?", (str(original),)
+                ).fetchone()
+                if existing is None or existing[0] != str(short):
+                    print_w(f"Not importing conflicting path: {original} -> {short}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
 
 def clean_generated(c: "Config"):
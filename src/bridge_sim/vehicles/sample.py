@@ -1,6 +1,6 @@
 """Sample vehicles from the vehicles data."""
 from timeit import default_timer as timer
-from typing import List, Tuple, Union, NewType
+from typing import List, NewType, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
@@ -61,6 +61,108 @@ def noise_per_column(c: Config, col_names: List[str]):
     return result
 
 
+class VehicleSampler:
+    """The vehicles data indexed for sampling many vehicles at once.
+
+    Built once per 'Config' (see 'vehicle_sampler'): the rows of each group of
+    'Config.vehicle_pdf' as an array of row positions, and the axle distances
+    and weights of each vehicle parsed into arrays padded with zeros.
+
+    Args:
+        c: Config, config from which to load vehicles data and density info.
+
+    """
+
+    def __init__(self, c: Config):
+        self.c = c
+        self.groups = [np.empty(0, dtype=int) for _ in c.vehicle_pdf]
+        for i, positions in vehicle_pdf_groups(c).indices.items():
+            self.groups[int(i)] = np.asarray(positions, dtype=int)
+        self.group_cdf = np.cumsum([fraction for _, fraction in c.vehicle_pdf])
+        self.axle_distances, self.n_axle_distances = self._padded("axle_distance")
+        self.axle_weights, self.n_axle_weights = self._padded("weight_per_axle")
+        # Standard deviation of each column noise was added to, as noise.
+        self._noise_stddevs = dict()
+
+    def _padded(self, col_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Axle values of each vehicle, padded with zeros, and their amount."""
+        values = [
+            axle_array_and_count(axles) for axles in self.c.vehicle_data[col_name]
+        ]
+        counts = np.array(list(map(len, values)), dtype=int)
+        result = np.zeros((len(values), max(counts, default=0)))
+        result[np.arange(result.shape[1]) < counts[:, np.newaxis]] = np.concatenate(
+            [np.empty(0)] + values
+        )
+        return result, counts
+
+    def noise_stddev(self, col_name: str) -> float:
+        """Standard deviation of noise for a column, see 'noise_per_column'."""
+        if col_name not in self._noise_stddevs:
+            _, stddev = noise_per_column(self.c, [col_name])[0]
+            self._noise_stddevs[col_name] = self.c.perturb_stddev * stddev
+        return self._noise_stddevs[col_name]
+
+    def sample_indices(
+        self, n: int, group_index: Optional[int] = None, rng=np.random
+    ) -> np.ndarray:
+        """Row positions in the vehicles data of n randomly sampled vehicles.
+
+        Args:
+            n: int, amount of vehicles to sample.
+            group_index: Optional[int], sample from a given group index or
+                according to 'Config.vehicle_pdf' (None).
+            rng: a NumPy random generator, by default NumPy's global one.
+
+        """
+        if group_index is None:
+            groups = np.searchsorted(self.group_cdf, rng.random(n), side="right")
+            groups = np.minimum(groups, len(self.groups) - 1)
+        else:
+            groups = np.full(n, group_index)
+        result = np.empty(n, dtype=int)
+        # Sample a vehicle uniformly randomly from each group.
+        for group_index in np.unique(groups):
+            in_group = groups == group_index
+            group = self.groups[group_index]
+            if len(group) == 0:
+                raise ValueError(f"No vehicles in vehicle PDF group {group_index}")
+            choices = (rng.random(in_group.sum()) * len(group)).astype(int)
+            result[in_group] = group[choices]
+        return result
+
+    def vehicle(self, index: int) -> Vehicle:
+        """The vehicle at a row position in the vehicles data."""
+        # TODO: Fix units in database.
+        return Vehicle(
+            kmph=40,
+            kn=self.axle_weights[index, : self.n_axle_weights[index]].tolist(),
+            axle_width=self.c.axle_width,
+            axle_distances=self.axle_distances[index, : self.n_axle_distances[index]]
+            / 100,
+        )
+
+    def sample_row(
+        self, index: int, noise_col_names: List[str] = [], rng=np.random
+    ) -> pd.DataFrame:
+        """The row at a row position in the vehicles data, with noise added."""
+        sample = self.c.vehicle_data.iloc[[index]].copy()
+        if self.c.perturb_stddev:
+            for col_name in noise_col_names:
+                noise = rng.normal(loc=0, scale=self.noise_stddev(col_name))
+                sample[col_name] = sample[col_name] + noise
+        return sample
+
+
+def vehicle_sampler(c: Config) -> VehicleSampler:
+    """Return the vehicle sampler of a config, only ever built once."""
+    if not hasattr(c, "_vehicle_sampler"):
+        start = timer()
+        c._vehicle_sampler = VehicleSampler(c)
+        print_s(f"Vehicle sampler built in {timer() - start}")
+    return c._vehicle_sampler
+
+
 def sample_vehicle(
     c: Config,
     group_index: int = None,
@@ -77,73 +179,29 @@ def sample_vehicle(
             row from the Pandas DataFrame, else return just a Vehicle.
 
     """
-    # Select a vehicles group randomly, if no group is specified.
-    if group_index is None:
-        rand = np.random.uniform()
-        # print(rand)
-        # print_d(D, f"Vehicle PDF = {c.vehicle_pdf}")
-        # Group's are tuples of group maximum and percentage of all groups.
-        min, max = 0, c.vehicle_pdf[-1][0]
-        print_d(D, f"rand = {rand}")
-        print_d(D, f"min = {min}, max = {max}")
-        running_fraction = 0
-        # Iterate through group percentage's until the randomly selected one.
-        # print(c.vehicle_pdf)
-        for i, (_, group_fraction) in enumerate(c.vehicle_pdf):
-            running_fraction += group_fraction
-            # print(f"running fraction = {running_fraction}")
-            # print(f"i = {i}, running_fraction = {running_fraction}")
-            if rand < running_fraction:
-                group_index = i
-                break
-    # print(D, f"group_index = {group_index}")
-
-    # Sample a vehicles uniformly randomly from the group.
-    groups_dict = {i: None for i in range(len(c.vehicle_pdf))}
-    print_d(D, groups_dict.items())
-    for i, (_, group) in enumerate(vehicle_pdf_groups(c)):
-        # print(D, f"i = {i}")
-        groups_dict[i] = group
-    group = groups_dict[group_index]
-
-    # print(f"group = {type(group)}")
-    if group is None:
-        print_w(f"Sampled group is None, resampling...")
-        return sample_vehicle(c, group_index)
-    sample = c.vehicle_data.loc[group.sample().index]
-
-    # Add noise to the sample if requested.
-    if c.perturb_stddev:
-        # print(f"perturb")
-        for col_name, (_, stddev) in zip(
-            noise_col_names, noise_per_column(c, noise_col_names)
-        ):
-            print_d(
-                D,
-                f"col_name = {col_name}, stddev = {stddev:.2f}"
-                + f",{c.perturb_stddev} x stddev"
-                + f" {c.perturb_stddev * stddev:.2f}",
-            )
-            noise = np.random.normal(loc=0, scale=c.perturb_stddev * stddev)
-            print_d(D, f"before =\n{sample[col_name]},\nnoise = {noise}")
-            sample[col_name] = sample[col_name] + noise
-            print_d(D, f"after =\n{sample[col_name]}")
-
-    # Convert sample to Vehicle and return it.
-    row = sample.iloc[0]
-    axle_distances = axle_array_and_count(row["axle_distance"])
-    axle_weights = axle_array_and_count(row["weight_per_axle"])
-    # TODO: Fix units in database.
-    # print(axle_distances)
-    # print(axle_weights)
-    # print(row["total_weight"])
-    vehicle = Vehicle(
-        kmph=40,
-        kn=axle_weights,
-        axle_width=c.axle_width,
-        axle_distances=np.array(axle_distances) / 100,
-    )
-    return (vehicle, sample) if pd_row else vehicle
+    sampler = vehicle_sampler(c)
+    index = sampler.sample_indices(1, group_index=group_index)[0]
+    vehicle = sampler.vehicle(index)
+    if pd_row:
+        return vehicle, sampler.sample_row(index, noise_col_names=noise_col_names)
+    return vehicle
+
+
+def sample_vehicles(
+    c: Config, n: int, group_index: Optional[int] = None, rng=np.random
+) -> List[Vehicle]:
+    """Sample n vehicles at once, like 'sample_vehicle'.
+
+    Args:
+        c: Config, config from which to load vehicles data and density info.
+        n: int, amount of vehicles to sample.
+        group_index: Optional[int], sample from a given group index or all.
+        rng: a NumPy random generator, by default NumPy's global one.
+
+    """
+    sampler = vehicle_sampler(c)
+    indices = sampler.sample_indices(n, group_index=group_index, rng=rng)
+    return [sampler.vehicle(index) for index in indices.tolist()]
 
 
 col_names = [
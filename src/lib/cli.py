@@ -13,7 +13,7 @@ import traceback
 
 import click
 
-from bridge_sim.configs import opensees_default
+from bridge_sim.configs import opensees_default, sparse_default
 from bridge_sim.model import ResponseType
 from bridge_sim.vehicles import truck1
 from lib.validate import _truck1_x_pos
@@ -78,6 +78,9 @@ def c():
 @click.option(
     "--shorten-paths", is_flag=True, help="Save responses at shorter filepaths.",
 )
+@click.option(
+    "--sparse", is_flag=True, help="Simulate in-process instead of with OpenSees.",
+)
 @click.option(
     "--pdb", is_flag=True, help="Jump into the debugger on exception.",
 )
@@ -89,9 +92,11 @@ def cli(
     parallel_ulm: bool,
     save_to: bool,
     shorten_paths: bool,
+    sparse: bool,
     pdb: bool,
 ):
     global b_func
+    global c_func
     global two_materials_
     global save_to_
     global parallel_
@@ -99,6 +104,7 @@ def cli(
     global shorten_paths_
     global il_num_loads_
     b_func = bridge_705(msl)
+    c_func = sparse_default if sparse else opensees_default
     two_materials_ = two_materials
     save_to_ = save_to
     parallel_ = parallel
@@ -114,6 +120,7 @@ def cli(
     click.echo(f"Parallel wheel tracks: {parallel_ulm_}")
     click.echo(f"Save to: {save_to_}")
     click.echo(f"Shorten paths: {shorten_paths_}")
+    click.echo(f"Sparse: {sparse}")
 
 
 ################
@@ -141,6 +148,19 @@ def clean(keep):
     remove_except_npy(c=c_, keep=keep)
 
 
+@cli.command(help="Import a CSV map of shortened paths into the path index.")
+@click.option(
+    "--csv", type=str, default=None, help="CSV map, defaults to the old map.",
+)
+def migrate_paths(csv):
+    from bridge_sim.util import import_path_csv, path_index_path
+
+    db_path = path_index_path(c())
+    if csv is None:
+        csv = os.path.join(os.path.dirname(db_path), "filepath-shortening-map.txt")
+    import_path_csv(db_path=db_path, csv_path=csv)
+
+
 ################
 ##### Info #####
 ################
@@ -277,7 +297,10 @@ def simulate():
 @click.option(
     "--crack-length", type=float, help="Set length of crack zone in X direction."
 )
-def uls(piers, healthy, cracked, crack_x, crack_length):
+@click.option(
+    "--resume", is_flag=True, help="Skip simulations completed by an earlier run."
+)
+def uls(piers, healthy, cracked, crack_x, crack_length, resume):
     bridge_sim.sim.responses.run_uls(
         c=c(),
         piers=piers,
@@ -285,6 +308,7 @@ def uls(piers, healthy, cracked, crack_x, crack_length):
         cracked=cracked,
         crack_x=crack_x,
         crack_length=crack_length,
+        resume=resume,
     )
 
 
@@ -303,6 +327,60 @@ def ulm(healthy, cracked, x_i, z_i):
     )
 
 
+@simulate.command(help="Generate unit load matrices of a grid of cracks.")
+@click.option(
+    "--crack-xs",
+    type=str,
+    required=True,
+    help="Comma-separated X positions of the start of crack zones.",
+)
+@click.option(
+    "--lengths",
+    type=str,
+    default="0.5",
+    help="Comma-separated lengths of crack zones in X direction.",
+)
+@click.option(
+    "--widths",
+    type=str,
+    default=None,
+    help="Comma-separated widths of crack zones in Z direction (default half).",
+)
+@click.option(
+    "--sensor-xs",
+    type=str,
+    required=True,
+    help="Comma-separated X positions of sensors, on each wheel track.",
+)
+@click.option(
+    "--rt",
+    type=click.Choice([rt.value for rt in ResponseType]),
+    default=ResponseType.YTrans.value,
+    help="Sensor response type.",
+)
+def sweep_cracks(crack_xs, lengths, widths, sensor_xs, rt):
+    from bridge_sim.model import Point
+    from bridge_sim.sim.responses import run_crack_sweep
+
+    def floats(csv: str):
+        return [float(value) for value in csv.split(",")]
+
+    config = c()
+    cracks, _ = run_crack_sweep(
+        c=config,
+        response_type=ResponseType(rt),
+        points=[
+            Point(x=x, y=0, z=z)
+            for x in floats(sensor_xs)
+            for z in config.bridge.wheel_track_zs(config)
+        ],
+        crack_xs=floats(crack_xs),
+        lengths=floats(lengths),
+        widths=[None] if widths is None else floats(widths),
+    )
+    print_i(f"Unit load matrices of {len(cracks)} cracks")
+
+
 @simulate.command(help="Record information for convergence plots.")
 def converge():
     verification.make_convergence_data(c())
@@ -0,0 +1,86 @@
+from copy import deepcopy
+from types import SimpleNamespace
+
+from bridge_sim.model import PointLoad
+from bridge_sim.sim.cache import sim_params_key
+from bridge_sim.sim.model import SimParams
+from bridge_sim.sim.run import FEMRunner
+from bridge_sim.sim.run.opensees.batch import batch_sim_params, batch_tcl
+
+tcl = """model basic -ndm 3 -ndf 6
+node 1 0 0 0
+node 2 1 0 0
+node 3 2 0 0.5
+
+timeSeries Linear 1
+
+pattern Plain 1 1 {
+load 2 0 -1000 0 0 0 0
+load 3 0 -1000 0 0 0 0
+}
+
+recorder Node -file y.out -node 1 2 3 -dof 2 disp
+
+system BandGeneral
+numberer RCM
+constraints Plain
+integrator LoadControl 1
+algorithm Linear
+analysis Static
+
+analyze 1
+"""
+expt_params = [
+    SimParams(ploads=[PointLoad(x=1, z=0, load=100)]),
+    SimParams(ploads=[PointLoad(x=2, z=0.5, load=50), PointLoad(x=1, z=0, load=2)]),
+]
+
+
+def test_batch_sim_params():
+    batch_params = batch_sim_params(expt_params)
+    assert [(pl.x, pl.z, pl.load) for pl in batch_params.ploads] == [
+        (1, 0, 1),
+        (2, 0.5, 1),
+    ]
+
+
+def test_batch_tcl():
+    batched = batch_tcl(tcl=tcl, expt_params=expt_params)
+    assert "timeSeries Linear" not in batched
+    assert "timeSeries Path 1 -time {0 1 2} -values {0 1 0}" in batched
+    assert "timeSeries Path 2 -time {1 2 3} -values {0 1 0}" in batched
+    assert "load 2 0.0 -100000.0 0.0 0.0 0.0 0.0" in batched
+    assert "load 3 0.0 -50000.0 0.0 0.0 0.0 0.0" in batched
+    assert "load 2 0.0 -2000.0 0.0 0.0 0.0 0.0" in batched
+    assert batched.count("recorder Node") == 1
+    assert "algorithm Linear -factorOnce" in batched
+    assert batched.strip().endswith("analyze 2")
+
+
+def test_batches():
+    """Each simulation in a batch is keyed by the mesh of its batch."""
+    fem_runner = FEMRunner.__new__(FEMRunner)
+    fem_runner.c = SimpleNamespace(sim_batch_size=2)
+    batched = deepcopy(expt_params) + [SimParams(ploads=[PointLoad(3, 0, 10)])]
+    assert fem_runner.batches(batched) == [[0, 1], [2]]
+    assert batched[0].mesh_positions == [(1, 0), (2, 0.5)]
+    assert batched[1].mesh_positions == [(1, 0), (2, 0.5)]
+    assert batched[2].mesh_positions == [(3, 0)]
+    # Batched responses are not those of the simulation on its own mesh.
+    assert sim_params_key(batched[0]) != sim_params_key(expt_params[0])
+    assert batched[0].id_str() != expt_params[0].id_str()
+    # A simulation on its own has the same mesh as its batch.
+    xzs = lambda sim_params: {(p.x, p.z) for p in sim_params.build_ctx().add_loads}
+    assert xzs(batched[0]) == xzs(batch_sim_params(batched[:2]))
+    # Batching again, e.g. only the simulations without saved results, is the same.
+    assert fem_runner.batches(batched[1:2]) == [[0]]
+    assert batched[1].mesh_positions == [(1, 0), (2, 0.5)]
+
+
+def test_batch_size():
+    fem_runner = FEMRunner.__new__(FEMRunner)
+    fem_runner.c = SimpleNamespace(sim_batch_size=4)
+    fem_runner._build_batch = fem_runner._run_batch = None
+    assert fem_runner.batch_size() == 1
+    fem_runner._build_batch = fem_runner._run_batch = lambda **kwargs: None
+    assert fem_runner.batch_size() == 4
@@ -0,0 +1,31 @@
+from copy import deepcopy
+
+from bridge_sim.bridges.bridge_705 import bridge_705
+from bridge_sim.configs import opensees_default
+from bridge_sim.model import PointLoad
+from bridge_sim.sim.cache import sim_digest
+from bridge_sim.sim.model import SimParams
+
+c = opensees_default(bridge_705(0.5))
+sim_params = SimParams(ploads=[PointLoad(x=10, z=-2, load=100)])
+
+
+def test_sim_digest_ignores_identifiers():
+    c_ = deepcopy(c)
+    c_.bridge.name = "other-name"
+    c_.bridge.data_id = "other-data-id"
+    assert sim_digest(c, sim_params) == sim_digest(c_, sim_params)
+    same_params = SimParams(ploads=[PointLoad(x=10.0, z=-2.0, load=100.0)])
+    assert sim_digest(c, sim_params) == sim_digest(c, same_params)
+
+
+def test_sim_digest_depends_on_model():
+    other_params = SimParams(ploads=[PointLoad(x=10, z=-2, load=101)])
+    assert sim_digest(c, sim_params) != sim_digest(c, other_params)
+    c_ = deepcopy(c)
+    youngs_x = c_.bridge.sections[0].youngs_x()
+    c_.bridge.sections[0].youngs_x = lambda: youngs_x / 2
+    assert sim_digest(c, sim_params) != sim_digest(c_, sim_params)
+    c_ = deepcopy(c)
+    c_.bridge.additional_xs = [1.5]
+    assert sim_digest(c, sim_params) != sim_digest(c_, sim_params)
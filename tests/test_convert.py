@@ -0,0 +1,70 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+import numpy as np
+
+from bridge_sim.model import ResponseType
+from bridge_sim.sim.model import Node, Shell
+from bridge_sim.sim.run.opensees.convert.d3 import (
+    convert_sim_translation_responses,
+    convert_strain_responses,
+    node_points,
+)
+
+nodes_by_id = {
+    n_id: Node(n_id=n_id, x=x, y=0, z=z, deck=True)
+    for n_id, (x, z) in enumerate([(0, 0), (2, 0), (2, 1), (0, 1), (4, 0), (4, 1)])
+}
+section = SimpleNamespace(thickness=0.5)
+shells = [
+    Shell(1, 0, 1, 2, 3, section=section, pier=False, nodes_by_id=nodes_by_id),
+    Shell(2, 1, 4, 5, 2, section=section, pier=True, nodes_by_id=nodes_by_id),
+]
+
+
+def test_convert_translation_responses():
+    points = node_points(list(nodes_by_id.values()))
+    parsed = {ResponseType.YTrans: np.arange(6)[np.newaxis]}
+    converted = defaultdict(dict)
+    convert_sim_translation_responses(
+        points=points,
+        sim_ind=0,
+        response_type=ResponseType.YTrans,
+        parsed_sim_responses=parsed,
+        converted_expt_responses=converted,
+    )
+    values, points = converted[0][ResponseType.YTrans]
+    assert (values == np.arange(6)).all()
+    assert (points[2] == [2, 0, 1]).all()
+
+
+def test_convert_strain_responses():
+    # Section deformations at each integration point of each element.
+    strain = np.zeros((4, 2, 8))
+    strain[:, :, 0] = 1e-6  # eps11
+    strain[:, :, 1] = 2e-6  # eps22
+    strain[:, :, 3] = 4e-6  # theta11
+    converted = defaultdict(dict)
+    convert_strain_responses(
+        elements=shells,
+        sim_ind=0,
+        parsed_sim_responses={ResponseType.StrainXXB: strain},
+        converted_expt_responses=converted,
+    )
+    # Only the deck element is converted, at its 4 integration points.
+    xxb, points = converted[0][ResponseType.StrainXXB]
+    xxt, _ = converted[0][ResponseType.StrainXXT]
+    zzb, _ = converted[0][ResponseType.StrainZZB]
+    assert np.allclose(xxb, (1e-6 - 4e-6 * 0.25) * -1e6)
+    assert np.allclose(xxt, (1e-6 + 4e-6 * 0.25) * -1e6)
+    assert np.allclose(zzb, -2)
+    dx, dz = 1 / np.sqrt(3), 0.5 / np.sqrt(3)
+    assert np.allclose(
+        points,
+        [
+            [1 - dx, 0, 0.5 - dz],
+            [1 + dx, 0, 0.5 - dz],
+            [1 + dx, 0, 0.5 + dz],
+            [1 - dx, 0, 0.5 + dz],
+        ],
+    )
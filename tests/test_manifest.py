@@ -0,0 +1,49 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from bridge_sim.model import Config
+from bridge_sim.sim.manifest import Manifest
+from bridge_sim.util import atomic_write
+
+
+def config(tmp_path):
+    return SimpleNamespace(
+        root_generated_data_dir=lambda: str(tmp_path),
+        get_path_in=lambda *args: Config.get_path_in(None, *args),
+    )
+
+
+def test_atomic_write(tmp_path):
+    path = os.path.join(str(tmp_path), "file.txt")
+    with atomic_write(path) as f:
+        f.write("saved")
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("partial")
+            raise RuntimeError()
+    with open(path) as f:
+        assert f.read() == "saved"
+    assert os.listdir(str(tmp_path)) == ["file.txt"]
+
+
+def test_manifest(tmp_path):
+    paths = [os.path.join(str(tmp_path), f"{i}.npy") for i in range(3)]
+    for path in paths:
+        with open(path, "w") as f:
+            f.write(path)
+    manifest = Manifest(config(tmp_path), paths)
+    assert manifest.entries() == dict()
+    for path in paths:
+        manifest.record(path)
+    # A partially written line is ignored.
+    with open(manifest.path, "a") as f:
+        f.write('{"path": ')
+    assert set(manifest.entries()) == set(paths)
+    with open(paths[0], "w") as f:
+        f.write("corrupt")
+    os.remove(paths[1])
+    assert manifest.verify() == ({paths[2]}, {paths[0], paths[1]})
+    # The same batch has the same manifest.
+    assert Manifest(config(tmp_path), paths[::-1]).path == manifest.path
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from bridge_sim.sim.run.opensees.parse.common import (
+    opensees_strains_to_numpy,
+    opensees_to_numpy,
+)
+from bridge_sim.sim.run.opensees.recorders import binary_recorders
+
+
+def test_opensees_to_numpy(tmp_path):
+    path = tmp_path / "trans.out"
+    path.write_text("1 2 3\n4 5 6\n\n")
+    assert (opensees_to_numpy(str(path)) == [[1, 2, 3], [4, 5, 6]]).all()
+    assert (opensees_to_numpy(str(path), row=1) == [[4, 5, 6]]).all()
+    path.write_text("1 2 3")
+    assert opensees_to_numpy(str(path)).shape == (1, 3)
+
+
+def test_opensees_strains_to_numpy(tmp_path):
+    path = tmp_path / "strain.out"
+    values = np.arange(2 * 16).reshape(2, 16)
+    np.savetxt(path, values)
+    strains = opensees_strains_to_numpy(str(path))
+    assert strains.shape == (4, 8)
+    assert (strains == values.reshape(-1, 8)).all()
+    assert (
+        opensees_strains_to_numpy(str(path), row=1) == values[1].reshape(2, 8)
+    ).all()
+    np.savetxt(path, np.arange(12).reshape(1, 12))
+    with pytest.raises(ValueError):
+        opensees_strains_to_numpy(str(path))
+
+
+def test_opensees_binary_to_numpy(tmp_path):
+    values = np.arange(2 * 6, dtype=np.float64).reshape(2, 6)
+    # Each analysis step terminated by a newline, as written by OpenSees.
+    path = tmp_path / "trans-nl.bin"
+    path.write_bytes(b"".join(step.tobytes() + b"\n" for step in values))
+    assert (opensees_to_numpy(str(path), binary=True, steps=2) == values).all()
+    assert (
+        opensees_to_numpy(str(path), row=1, binary=True, steps=2) == values[1]
+    ).all()
+    # Only raw doubles.
+    path = tmp_path / "trans.bin"
+    path.write_bytes(values.tobytes())
+    assert (opensees_to_numpy(str(path), binary=True, steps=2) == values).all()
+    with pytest.raises(ValueError):
+        opensees_strains_to_numpy(str(path), binary=True, steps=1)
+    path.write_bytes(np.arange(16, dtype=np.float64).tobytes())
+    strains = opensees_strains_to_numpy(str(path), binary=True, steps=1)
+    assert (strains == np.arange(16).reshape(2, 8)).all()
+
+
+def test_binary_recorders():
+    tcl = (
+        "recorder Node -file a.out -node 1 2 -dof 2 disp\n"
+        + "recorder Element -file b.out -ele 1 material 1 deformation\n"
+        + 'puts $outfile "-file"\n'
+    )
+    assert binary_recorders(tcl) == (
+        "recorder Node -binary a.out -node 1 2 -dof 2 disp\n"
+        + "recorder Element -binary b.out -ele 1 material 1 deformation\n"
+        + 'puts $outfile "-file"\n'
+    )
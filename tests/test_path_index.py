@@ -0,0 +1,68 @@
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+
+from bridge_sim.util import (
+    import_path_csv,
+    lookup_short_path,
+    path_index_path,
+    shorten_path,
+    shorten_paths,
+)
+
+
+def config(tmp_path):
+    def get_data_path(*paths):
+        path = os.path.join(str(tmp_path), *paths)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    return SimpleNamespace(get_data_path=get_data_path, shorten_paths=True)
+
+
+def test_shorten_path(tmp_path):
+    c = config(tmp_path)
+    a = os.path.join(str(tmp_path), "a", "long-name.npy")
+    b = os.path.join(str(tmp_path), "b", "other-long-name.npy")
+    assert shorten_path(c, a) == os.path.join(str(tmp_path), "a", "short1.npy")
+    assert shorten_path(c, a) == os.path.join(str(tmp_path), "a", "short1.npy")
+    assert shorten_paths(c, [a, b]) == [
+        os.path.join(str(tmp_path), "a", "short1.npy"),
+        os.path.join(str(tmp_path), "b", "short2.npy"),
+    ]
+    c.shorten_paths = False
+    assert shorten_path(c, a) == a
+
+
+def test_import_path_csv(tmp_path):
+    c = config(tmp_path)
+    csv_path = c.get_data_path("metadata", "filepath-shortening-map.txt")
+    path = lambda name: os.path.join(str(tmp_path), name)
+    pd.DataFrame(
+        {
+            "original": [path("long-a.npy"), path("long-b.npy")],
+            "short": [path("short1.npy"), path("short2.npy")],
+        }
+    ).to_csv(csv_path)
+    # The CSV map is imported when the path index is created.
+    assert shorten_path(c, path("long-b.npy")) == path("short2.npy")
+    assert shorten_path(c, path("long-c.npy")) == path("short3.npy")
+    # Importing again skips existing paths.
+    import_path_csv(db_path=path_index_path(c), csv_path=csv_path)
+    assert shorten_path(c, path("long-d.npy")) == path("short4.npy")
+
+
+def test_lookup_short_path(tmp_path):
+    c = config(tmp_path)
+    a = os.path.join(str(tmp_path), "a", "long-name.npy")
+    b = os.path.join(str(tmp_path), "b", "other-long-name.npy")
+    # No database is created, and no path added, by a lookup.
+    assert lookup_short_path(c, a) is None
+    assert not os.path.exists(path_index_path(c))
+    short = shorten_path(c, a)
+    assert lookup_short_path(c, a) == short
+    assert lookup_short_path(c, b) is None
+    assert shorten_path(c, b) == os.path.join(str(tmp_path), "b", "short2.npy")
+    c.shorten_paths = False
+    assert lookup_short_path(c, b) == b
@@ -1,9 +1,13 @@
 """Test classify.data.fem."""
+
+import os
+
 import numpy as np
+import pytest
 
 from bridge_sim.bridges.bridge_705 import bridge_705
 from bridge_sim.configs import opensees_default
-from bridge_sim.model import PointLoad
+from bridge_sim.model import Point, PointLoad, ResponseType
 from bridge_sim.vehicles import truck1
 from bridge_sim.traffic import x_to_wheel_track_index, loads_to_traffic_array
 from bridge_sim.util import flatten
@@ -87,3 +91,69 @@ def test_loads_to_traffic_array():
 #             fem_runner=OSRunner(c),
 #         )
 #     assert "single lane" in str(e.value)
+
+
+def test_responses_to_traffic_blocks(monkeypatch, tmp_path):
+    from copy import deepcopy
+
+    from scipy.sparse import csr_matrix
+
+    from bridge_sim.scenarios import HealthyScenario
+    from bridge_sim.sim import responses
+
+    c_ = deepcopy(c)
+    c_.traffic_block_size, c_.traffic_threads = 7, 3
+    rng = np.random.default_rng(0)
+    points = [Point(x=x, y=0, z=0) for x in [10, 20]]
+    ulm = rng.random((2 * c_.il_num_loads, len(points)))
+    monkeypatch.setattr(
+        responses.ULResponses, "load_ulm", staticmethod(lambda **kwargs: ulm)
+    )
+    traffic_array = rng.random((50, ulm.shape[0]))
+    thermal = rng.random((50, len(points)))
+    expected = traffic_array @ ulm + thermal
+    kwargs = dict(
+        c=c_,
+        response_type=ResponseType.YTrans,
+        damage_scenario=HealthyScenario(),
+        points=points,
+        sim_runner=lambda c: None,
+        thermal=thermal,
+    )
+    blocks = list(
+        responses.responses_to_traffic_blocks(traffic_array=traffic_array, **kwargs)
+    )
+    assert [len(block) for block in blocks] == [7] * 7 + [1]
+    assert np.allclose(np.concatenate(blocks), expected)
+    # Blocks of a sparse array, e.g. generated on the fly.
+    sparse_blocks = (csr_matrix(traffic_array[i : i + 20]) for i in range(0, 50, 20))
+    path = os.path.join(str(tmp_path), "responses.npy")
+    saved = responses.save_responses_to_traffic(
+        path, traffic_array=sparse_blocks, time_steps=50, **kwargs
+    )
+    assert np.allclose(saved, expected)
+    with pytest.raises(ValueError):
+        responses.save_responses_to_traffic(
+            path, traffic_array=traffic_array[:40], **kwargs
+        )
+
+
+def test_sample_wheel_track_meshes():
+    from bridge_sim.sim.model import Responses
+    from bridge_sim.sim.responses import ULResponses
+
+    # Each unit load simulation adds a node at its load, so meshes differ.
+    xs, zs = np.meshgrid(np.linspace(0, 10, 11), np.linspace(-2, 2, 5))
+    grid = np.stack([xs.ravel(), np.zeros(xs.size), zs.ravel()], axis=1)
+    wheel_track = []
+    for i in range(c.il_num_loads):
+        points = np.concatenate([grid, [[0.25 + i, 0, 0.5]]])
+        values = points[:, 0] * (i + 1) + points[:, 2]
+        wheel_track.append(Responses(ResponseType.YTrans, (values, points)))
+    points = [Point(x=3.3, y=0, z=0.4), Point(x=7.6, y=0, z=-1.2)]
+    expected = [
+        [responses.at_deck(point, interp=False) for point in points]
+        for responses in wheel_track
+    ]
+    ulm = ULResponses.sample_wheel_track(c=c, wheel_track=wheel_track, points=points)
+    assert np.array_equal(ulm, expected)
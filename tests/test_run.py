@@ -0,0 +1,51 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from bridge_sim.model import PointLoad
+from bridge_sim.sim.model import SimParams
+from bridge_sim.sim.run import FEMRunner
+
+
+def test_run_pipelined():
+    """Simulations are built in the calling thread, and run concurrently."""
+    lock = threading.Lock()
+    built, running, parsed = [], [], []
+    max_running, max_in_flight = [0], [0]
+
+    def build(c, expt_params, fem_runner):
+        built.append(threading.current_thread())
+        with lock:
+            max_in_flight[0] = max(max_in_flight[0], len(built) - len(parsed))
+        return expt_params
+
+    def run(c, expt_params, fem_runner, sim_ind):
+        with lock:
+            running.append(sim_ind)
+            max_running[0] = max(max_running[0], len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(sim_ind)
+        return expt_params
+
+    def parse(c, expt_params, fem_runner):
+        parsed.append(expt_params[0])
+        return {}
+
+    c = SimpleNamespace(sim_window=3, parallel_sims=2)
+    fem_runner = FEMRunner(
+        c=c,
+        name="Test",
+        exe_path=None,
+        supported_response_types=lambda bridge: [],
+        build=build,
+        run=run,
+        parse=parse,
+        convert=lambda c, expt_params, parsed_expt_responses: {},
+    )
+    expt_params = [SimParams(ploads=[PointLoad(x, 0, 1)]) for x in range(7)]
+    fem_runner.run(expt_params)
+    assert all(thread is threading.current_thread() for thread in built)
+    assert sorted(parsed, key=lambda p: p.ploads[0].x) == expt_params
+    assert max_running[0] == 2
+    assert max_in_flight[0] <= 3
@@ -1,9 +1,17 @@
 """Test the sampling from the vehicle database."""
 
+import numpy as np
+
 from bridge_sim.bridges.bridge_705 import bridge_705
 from bridge_sim.configs import opensees_default
 from bridge_sim.model import Vehicle
-from bridge_sim.vehicles.sample import noise_col_names, sample_vehicle
+from bridge_sim.vehicles.sample import (
+    axle_array_and_count,
+    noise_col_names,
+    sample_vehicle,
+    sample_vehicles,
+    vehicle_sampler,
+)
 from bridge_sim.util import print_d
 
 # Print debug information for this file.
@@ -39,3 +47,23 @@ def test_sample_vehicle():
             vehicle.loc[vehicle.index, col_name]
             == c.vehicle_data.loc[vehicle.index, col_name]
         ).all()
+
+
+def test_sample_vehicles():
+    c = opensees_default(bridge_705(0.5))
+    vehicles = sample_vehicles(c, n=100, rng=np.random.default_rng(0))
+    assert len(vehicles) == 100
+    assert all(isinstance(vehicle, Vehicle) for vehicle in vehicles)
+    # Axles are parsed as when sampling one vehicle.
+    sampler = vehicle_sampler(c)
+    index = sampler.sample_indices(1, group_index=0)[0]
+    row = c.vehicle_data.iloc[index]
+    vehicle = sampler.vehicle(index)
+    assert vehicle.kn == axle_array_and_count(row["weight_per_axle"])
+    assert np.allclose(
+        vehicle.axle_distances,
+        np.array(axle_array_and_count(row["axle_distance"])) / 100,
+    )
+    # Only vehicles of the given group are sampled.
+    indices = sampler.sample_indices(100, group_index=0)
+    assert set(indices) <= set(sampler.groups[0])
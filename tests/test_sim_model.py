@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from bridge_sim.model import Point, ResponseType
+from bridge_sim.sim.model import Responses
+
+
+def grid_responses():
+    """Responses on a grid of the deck and below it, in shuffled order."""
+    xs, ys, zs = np.meshgrid([0, 1, 2.5], [-1, 0], [-1, 0, 0.5, 1], indexing="ij")
+    points = np.stack([xs.ravel(), ys.ravel(), zs.ravel()], axis=1)
+    order = np.random.default_rng(0).permutation(len(points))
+    points = points[order]
+    values = points[:, 0] * 10 + points[:, 2] + points[:, 1] * 100
+    return Responses(ResponseType.YTrans, (values, points))
+
+
+def test_index():
+    responses = grid_responses()
+    assert responses.points.shape == (24, 3)
+    assert np.array_equal(
+        responses.data[0],
+        responses.raw_values[np.lexsort(responses.raw_points.T[::-1])],
+    )
+    # Views as nested dictionaries.
+    assert responses.xs == [0, 1, 2.5]
+    assert responses.deck_xs == [0, 1, 2.5]
+    assert responses.zs[1][0] == [-1, 0, 0.5, 1]
+    assert responses.responses[0][2.5][-1][0.5] == 25.5 - 100
+    assert len(responses.deck_points()) == 12
+    assert all(p.y == 0 for p in responses.deck_points())
+
+
+def test_repeated_positions():
+    points = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 0]], dtype=float)
+    responses = Responses(ResponseType.YTrans, (np.array([1.0, 2, 3]), points))
+    assert list(responses.values()) == [3, 2]
+
+
+def test_at_deck_snap():
+    responses = grid_responses()
+    # Nearest x first, then nearest z at that x.
+    assert responses.at_deck(Point(x=1.8, y=0, z=0.2), interp=False) == 25
+    assert responses.at_deck(Point(x=1.7, y=0, z=0.8), interp=False) == 11
+    assert responses.at_deck(Point(x=-5, y=0, z=5), interp=False) == 1
+    assert np.isclose(responses.at_deck(Point(x=0.5, y=0, z=0.25), interp=True), 5.25)
+
+
+def test_nearest_and_within():
+    responses = grid_responses()
+    assert np.array_equal(
+        responses.nearest([Point(x=0.9, y=-0.8, z=0.1), Point(x=3, y=0, z=2)]),
+        [10 - 100, 26],
+    )
+    near = responses.within(Point(x=1, y=0, z=0), radius=0.6)
+    assert sorted(near.values()) == [10, 10.5]
+
+
+def test_map_add_without():
+    responses = grid_responses()
+    responses.map(lambda r: r * 2)
+    assert responses.responses[0][1][0][1] == 22
+    deck = responses.deck_points()
+    responses.add(np.ones(len(deck)), deck)
+    assert responses.at_deck(Point(x=1, y=0, z=1), interp=False) == 23
+    with pytest.raises(KeyError):
+        responses.add([1], [Point(x=0.3, y=0, z=0)])
+    deck_only = responses.without(lambda p: p.y != 0)
+    assert len(list(deck_only.values())) == 12
+    responses.map(lambda r, x, y, z: x, xyz=True)
+    assert set(responses.values()) == {0, 1, 2.5}
+
+
+def test_interpolator_shared():
+    responses = grid_responses()
+    other = grid_responses().map(lambda r: -r)
+    assert responses.interpolator().tri is other.interpolator().tri
+    points = [Point(x=0.5, y=0, z=0.25), Point(x=2, y=0, z=-0.5)]
+    expected = [5.25, 19.5]
+    assert np.allclose(responses.at_decks(points), expected)
+    assert np.allclose(other.at_decks(points), np.negative(expected))
+    # Outside of the deck.
+    assert np.isnan(responses.at_deck(Point(x=3, y=0, z=0), interp=True))
+    # Values changed after interpolating.
+    responses.map(lambda r: r * 2)
+    assert np.isclose(responses.at_deck(points[0], interp=True), 10.5)
+
+
+def test_sampling_operator():
+    responses = grid_responses()
+    other = grid_responses().map(lambda r: -r)
+    rng = np.random.default_rng(1)
+    points = [Point(x=x, y=0, z=z) for x, z in rng.uniform(-0.5, 3, (50, 2))]
+    snap = responses.sampling_operator(points, interp=False)
+    assert responses.sampling_operator(points, interp=False) is snap
+    sampled = snap.sample([responses, other])
+    expected = [responses.at_deck(p, interp=False) for p in points]
+    assert np.array_equal(sampled, [expected, np.negative(expected)])
+    interp = responses.sampling_operator(points, interp=True)
+    expected = responses.at_decks(points)
+    assert np.allclose(interp.sample([responses])[0], expected, equal_nan=True)
+    assert np.isnan(expected).any() and not np.isnan(expected).all()
+    with pytest.raises(ValueError):
+        snap.sample([responses.without(lambda p: p.y != 0)])
@@ -0,0 +1,353 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from scipy.sparse import random as sparse_random
+
+from bridge_sim.model import Point, ResponseType
+from bridge_sim.sim.model import Node, Shell
+from bridge_sim.sim.run.sparse.damage import DamageUpdate, sweep_unit_loads
+from bridge_sim.sim.run.sparse.modal import lumped_mass, modal_displacements, modes
+from bridge_sim.sim.run.sparse.rom import build_surrogate, groups, validate
+from bridge_sim.sim.run.sparse.model import ShellModel
+from bridge_sim.sim.run.sparse.ulm import (
+    RESPONSE_SIGN,
+    load_operator,
+    locate,
+    response_operator,
+    solve_unit_loads,
+)
+
+E, T = 3e10, 0.2
+
+
+def strip(length: float, width: float, nx: int, nz: int):
+    """Points and elements of a rectangular mesh in the x-z plane."""
+    xs, zs = np.meshgrid(
+        np.linspace(0, length, nx + 1), np.linspace(0, width, nz + 1), indexing="ij"
+    )
+    points = np.stack([xs.ravel(), np.zeros(xs.size), zs.ravel()], axis=1)
+    i, j = np.meshgrid(np.arange(nx), np.arange(nz), indexing="ij")
+    n = (i * (nz + 1) + j).ravel()
+    elements = np.stack([n, n + nz + 1, n + nz + 2, n + 1], axis=1)
+    return points, elements
+
+
+def line_load(model: ShellModel, nodes: np.ndarray, dof: int, load: float):
+    """Loads for a line load on the given nodes, along one axis."""
+    loads = np.zeros(model.n_dofs)
+    weights = np.ones(len(nodes))
+    weights[[0, -1]] = 0.5
+    loads[6 * nodes + dof] = load * weights / weights.sum()
+    return loads
+
+
+def test_simply_supported_strip():
+    length, width, load = 10, 1, -1e4
+    points, elements = strip(length, width, 40, 4)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], length)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    mid = np.flatnonzero(np.isclose(points[:, 0], length / 2))
+    u = model.solve(line_load(model, mid, 1, load))
+    # Bending and shear deflection of a beam.
+    i = width * T**3 / 12
+    expected = load * length**3 / (48 * E * i)
+    expected += load * length / (4 * 5 / 6 * E / 2 * width * T)
+    assert np.allclose(u[6 * mid + 1], expected, rtol=0.01)
+    # Tension at the bottom and compression at the top of the strip.
+    deformations = model.deformations(u)
+    bottom = deformations[:, :, 0] - deformations[:, :, 3] * T / 2
+    top = deformations[:, :, 0] + deformations[:, :, 3] * T / 2
+    assert np.all(bottom > 0) and np.all(top < 0)
+    # Strain is constant in each element, at most half an element from midspan.
+    assert np.isclose(bottom.max(), -load * length / 4 * T / 2 / (E * i), rtol=0.05)
+
+
+def test_cantilever_any_plane():
+    """A thin cantilever, in the x-z and in the x-y plane, does not lock."""
+    length, width, thickness, load = 1, 0.2, 0.01, -1
+    for plane, dof in [([0, 1, 2], 1), ([0, 2, 1], 2)]:
+        points, elements = strip(length, width, 20, 2)
+        points = points[:, plane]
+        fixed = np.zeros((len(points), 6), dtype=bool)
+        fixed[np.isclose(points[:, 0], 0)] = True
+        sections = np.tile([thickness, E, E, 0], (len(elements), 1))
+        model = ShellModel(points, elements, sections, np.zeros(len(elements)), fixed)
+        tip = np.flatnonzero(np.isclose(points[:, 0], length))
+        u = model.solve(line_load(model, tip, dof, load))
+        i = width * thickness**3 / 12
+        expected = load * length**3 / (3 * E * i)
+        assert np.allclose(u[6 * tip + dof], expected, rtol=0.01)
+
+
+def test_prescribed_displacement():
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start] = True
+    fixed[end, 1] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    displacements = np.zeros(model.n_dofs)
+    displacements[6 * np.flatnonzero(end) + 1] = -0.01
+    u = model.solve(np.zeros(model.n_dofs), displacements)
+    assert np.allclose(u[6 * np.flatnonzero(end) + 1], -0.01)
+    assert np.allclose(u[6 * np.flatnonzero(start) + 1], 0)
+
+
+def test_load_operator():
+    """Loads are distributed to the nodes of the element they are in."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    loads = load_operator(model, np.array([[5, 0.5], [5.25, 0.25]])).toarray()
+    assert np.allclose(loads.sum(axis=0), -1e3)
+    # A load on a node is only applied to that node.
+    node = np.flatnonzero(np.all(np.isclose(points, [5, 0, 0.5]), axis=1))
+    assert np.isclose(loads[6 * node + 1, 0], -1e3)
+    # A load at the center of an element is shared equally by its nodes.
+    assert np.allclose(loads[:, 1][loads[:, 1] != 0], -250)
+    assert np.all(loads[np.arange(model.n_dofs) % 6 != 1] == 0)
+
+
+def test_locate():
+    """The element containing each position, as by searching all elements."""
+    points, elements = strip(10, 1, 20, 2)
+    # Smaller elements in the first half.
+    points[:, 0] = np.where(points[:, 0] < 5, points[:, 0] / 2, points[:, 0] * 1.5 - 5)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    xz = np.random.default_rng(0).random((200, 2)) * [10, 1]
+    xz[:3] = [[0, 0], [5, 0.5], [10, 1]]
+    found, n = locate(model, xz)
+    corners = points[elements][:, :, [0, 2]]
+    lo, hi = corners.min(axis=1), corners.max(axis=1)
+    for position, element in zip(xz, found):
+        inside = np.all((lo <= position) & (position <= hi), axis=1)
+        assert element == np.flatnonzero(inside)[0]
+    assert np.allclose(n.sum(axis=1), 1)
+    with pytest.raises(ValueError):
+        locate(model, np.array([[11, 0.5]]))
+
+
+def test_unit_load_matrix_translation():
+    """Each column of loads is solved at once, as by one solve per load."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    xz = np.array([[2.1, 0.3], [5, 0.5], [7.7, 0.9]])
+    sensors = [Point(x=4.9, y=0, z=0.6), Point(x=8, y=0, z=0)]
+    sample = response_operator(model, [], ResponseType.YTrans, sensors)
+    ulm = (sample @ model.solve(load_operator(model, xz).toarray())).T
+    for i, (x, z) in enumerate(xz):
+        u = model.solve(load_operator(model, np.array([[x, z]])).toarray()[:, 0])
+        nodes = [
+            np.argmin(np.linalg.norm(points - [p.x, 0, p.z], axis=1)) for p in sensors
+        ]
+        assert np.allclose(ulm[i], RESPONSE_SIGN * u[6 * np.array(nodes) + 1])
+    # Deflection is largest for the load at midspan.
+    assert np.all(np.argmax(ulm, axis=0) == 1)
+
+
+def test_response_sign():
+    """Responses are negated relative to the model's axes, as with OpenSees."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    nodes_by_id = {
+        i: Node(n_id=i, x=x, y=y, z=z, deck=True) for i, (x, y, z) in enumerate(points)
+    }
+    section = SimpleNamespace(thickness=T)
+    shells = [
+        Shell(i, *element, section=section, pier=False, nodes_by_id=nodes_by_id)
+        for i, element in enumerate(elements)
+    ]
+    # A downward load at midspan, the sagging beam deflects downwards and has
+    # tensile strain at the bottom, in the axes of the model.
+    midspan = Point(x=5, y=0, z=0.5)
+    u = model.solve(load_operator(model, np.array([[5, 0.5]])).toarray()[:, 0])
+    node = np.argmin(np.linalg.norm(points - [5, 0, 0.5], axis=1))
+    deformations = model.deformations(u)
+    bottom = deformations[:, :, 0] - deformations[:, :, 3] * T / 2
+    assert u[6 * node + 1] < 0 and np.all(bottom > 0)
+    # OpenSees negates translations (parse) and strains (convert to microstrain).
+    y = response_operator(model, shells, ResponseType.YTrans, [midspan]) @ u
+    strain = response_operator(model, shells, ResponseType.StrainXXB, [midspan]) @ u
+    assert np.isclose(y[0], -u[6 * node + 1]) and y[0] > 0
+    assert strain[0] < 0
+    assert np.isclose(strain[0], bottom.max() * -1e6, rtol=0.1)
+
+
+def test_unit_load_matrix_adjoint():
+    """One solve per point gives the same responses, by reciprocity."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    xz = np.stack([np.linspace(0, 10, 13), np.linspace(0, 1, 13)], axis=1)
+    loads = load_operator(model, xz)
+    # Translations, and any linear map of displacements e.g. strain.
+    sensors = [Point(x=4.9, y=0, z=0.6), Point(x=10, y=0, z=0)]
+    samples = [
+        response_operator(model, [], ResponseType.YTrans, sensors),
+        sparse_random(3, model.n_dofs, density=0.05, format="csr", random_state=1),
+    ]
+    for sample in samples:
+        direct = solve_unit_loads(model, loads, sample, block_size=5, adjoint=False)
+        adjoint = solve_unit_loads(model, loads, sample, block_size=2, adjoint=True)
+        assert direct.shape == adjoint.shape == (len(xz), sample.shape[0])
+        assert np.allclose(direct, adjoint, rtol=1e-6, atol=1e-9 * np.abs(direct).max())
+
+
+def test_damage_update():
+    """A low-rank update of the healthy model solves the damaged model."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    healthy = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    # Halve Young's modulus along x of a crack at midspan.
+    centers = points[elements].mean(axis=1)
+    cracked = sections.copy()
+    cracked[np.abs(centers[:, 0] - 5) < 0.5, 2] /= 2
+    damaged = ShellModel(points, elements, cracked, np.ones(len(elements)), fixed)
+    update = DamageUpdate(healthy, cracked)
+    assert len(update.elements) == 4 and 0 < update.rank < 4 * 24
+    xz = np.stack([np.linspace(0, 10, 13), np.linspace(0, 1, 13)], axis=1)
+    loads = load_operator(healthy, xz)
+    u = update.solve(loads.toarray())
+    assert np.allclose(u, damaged.solve(loads.toarray()), atol=1e-9 * np.abs(u).max())
+    assert not np.allclose(u, healthy.solve(loads.toarray()))
+    # With prescribed displacements.
+    displacements = np.zeros(healthy.n_dofs)
+    displacements[6 * np.flatnonzero(end) + 1] = -0.01
+    u = update.solve(np.zeros(healthy.n_dofs), displacements)
+    assert np.allclose(u, damaged.solve(np.zeros(healthy.n_dofs), displacements))
+    # Unit load matrix of the damaged model, from that of the healthy model.
+    sample = sparse_random(
+        3, healthy.n_dofs, density=0.05, format="csr", random_state=1
+    )
+    ulm = solve_unit_loads(healthy, loads, sample, block_size=5, adjoint=True)
+    expected = solve_unit_loads(damaged, loads, sample, block_size=5, adjoint=True)
+    ulm = update.unit_loads(ulm, loads, sample)
+    assert np.allclose(ulm, expected, atol=1e-9 * np.abs(expected).max())
+
+
+def test_sweep_unit_loads():
+    """Many damaged models at once, as each damaged model alone."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    healthy = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    xz = np.stack([np.linspace(0, 10, 13), np.linspace(0, 1, 13)], axis=1)
+    loads = load_operator(healthy, xz)
+    sample = sparse_random(
+        3, healthy.n_dofs, density=0.05, format="csr", random_state=1
+    )
+    ulm = solve_unit_loads(healthy, loads, sample, block_size=5, adjoint=True)
+    # Overlapping cracks, and no crack.
+    centers = points[elements].mean(axis=1)
+    updates = []
+    for crack_x, length in [(5, 1), (5, 2), (2, 1), (20, 1)]:
+        cracked = sections.copy()
+        cracked[np.abs(centers[:, 0] - crack_x) < length / 2, 2] /= 2
+        updates.append(DamageUpdate(healthy, cracked))
+    result = sweep_unit_loads(updates, ulm, loads, sample, block_size=7)
+    assert result.shape == (len(updates),) + ulm.shape
+    for update, damaged in zip(updates, result):
+        expected = update.unit_loads(ulm, loads, sample)
+        assert np.allclose(damaged, expected, atol=1e-9 * np.abs(expected).max())
+    assert np.array_equal(result[-1], ulm)
+
+
+def test_modal_step_load():
+    """Natural frequency of a beam, and response to a suddenly applied load."""
+    length, width, density = 10, 1, 2500
+    points, elements = strip(length, width, 40, 4)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], length)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0], (len(elements), 1))
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    mass = lumped_mass(model, np.full(len(elements), density))
+    assert np.isclose(mass[0::6].sum(), density * T * length * width)
+    omega, shapes = modes(model, mass, 5)
+    i, a = width * T**3 / 12, width * T
+    expected = (np.pi / length) ** 2 * np.sqrt(E * i / (density * a))
+    assert np.isclose(omega[0], expected, rtol=0.01)
+    # Undamped, a suddenly applied load doubles the static deflection.
+    loads = load_operator(model, np.array([[length / 2, width / 2]]))
+    sample = response_operator(model, [], ResponseType.YTrans, [Point(x=5, z=0.5)])
+    static = solve_unit_loads(model, loads, sample, block_size=1, adjoint=False)
+    history = np.ones((2000, 1))
+    history[0] = 0
+    modal_loads = history @ (loads.T @ shapes)
+    x = modal_displacements(omega, modal_loads, damping_ratio=0, time_step=1e-3)
+    y = history @ static + (x - modal_loads / omega**2) @ (sample @ shapes).T
+    assert np.isclose(y.max(), 2 * static[0, 0], rtol=0.01)
+    # Damped, it settles at the static deflection.
+    x = modal_displacements(omega, modal_loads, damping_ratio=0.5, time_step=1e-3)
+    y = history @ static + (x - modal_loads / omega**2) @ (sample @ shapes).T
+    assert np.isclose(y[-1, 0], static[0, 0], rtol=1e-3)
+
+
+def test_surrogate():
+    """Surrogate with scaled stiffness of half of a strip, against the model."""
+    points, elements = strip(10, 1, 20, 2)
+    fixed = np.zeros((len(points), 6), dtype=bool)
+    start, end = np.isclose(points[:, 0], 0), np.isclose(points[:, 0], 10)
+    fixed[start | end, 1:3] = True
+    fixed[start, 0] = True
+    sections = np.tile([T, E, E, 0.2], (len(elements), 1))
+    sections[points[elements].mean(axis=1)[:, 0] > 5, 1:3] /= 2
+    model = ShellModel(points, elements, sections, np.ones(len(elements)), fixed)
+    labels, group_sections, piers = groups(model)
+    assert len(group_sections) == 2 and not np.any(piers)
+    loads = load_operator(
+        model, np.stack([np.linspace(0, 10, 13), np.full(13, 0.3)], 1)
+    )
+    thermal = np.zeros((2, model.n_dofs, 2))
+    thermal[:, 1::6] = -1e3
+    sample = response_operator(
+        model, [], ResponseType.YTrans, [Point(x=3, z=0.5), Point(x=7, z=0.5)]
+    )
+    training = [np.ones(2), [0.5, 1], [2, 1], [1, 0.5], [1, 2]]
+    surrogate = build_surrogate(
+        model, loads, thermal, sample, training, block_size=8, tol=1e-4
+    )
+    assert surrogate.stiffness.shape[1] < len(model.free)
+    mu = np.array([0.7, 1.6])
+    # Compared to the model with scaled sections.
+    scaled = sections.copy()
+    scaled[:, 1:3] *= mu[labels, np.newaxis]
+    full = ShellModel(points, elements, scaled, np.ones(len(elements)), fixed)
+    expected = solve_unit_loads(full, loads, sample, block_size=8, adjoint=True)
+    bound, _ = surrogate.error_bound(mu)
+    error = np.abs(surrogate.unit_load_matrix(mu) - expected)
+    assert error.max() < 1e-4 * np.abs(expected).max()
+    assert np.all(error <= bound)
+    errors = validate(surrogate, model, loads, thermal, sample, labels, [mu])
+    assert errors[0] < 1e-4
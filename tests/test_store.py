@@ -0,0 +1,57 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from bridge_sim.sim.store import (
+    MESH_EXT,
+    META_EXT,
+    ColumnStore,
+    load_responses,
+    remove_responses,
+    save_responses,
+)
+
+
+def test_column_store(tmp_path):
+    store = ColumnStore(os.path.join(str(tmp_path), "ulm.columns"))
+    points = np.array([[0, 0, 1], [2, 0, 1], [1, 0, 0]], dtype=float)
+    columns = np.arange(12, dtype=float).reshape(4, 3)
+    store.append(points[:2], columns[:, :2])
+    assert list(store.missing(points)) == [False, False, True]
+    with pytest.raises(KeyError):
+        store.gather(points)
+    store.append(points[2:] + 1e-9, columns[:, 2:])
+    assert not np.any(store.missing(points))
+    # Any subset of the points, in any order.
+    order = [2, 0, 2, 1]
+    assert np.array_equal(store.gather(points[order]), columns[:, order])
+    with pytest.raises(ValueError):
+        store.append(points, columns[:, :2])
+    # A crashed append, without keys, is ignored.
+    values_path, _ = store.index()[(1, 0, 0)]
+    os.remove(values_path[: -len(".npy")] + ".keys.npy")
+    assert list(store.missing(points)) == [False, False, True]
+
+
+def test_remove_responses(tmp_path):
+    def get_path_in(root, dirname, filename):
+        os.makedirs(os.path.join(root, dirname), exist_ok=True)
+        return os.path.join(root, dirname, filename)
+
+    c = SimpleNamespace(
+        root_generated_data_dir=lambda: str(tmp_path), get_path_in=get_path_in
+    )
+    path = os.path.join(str(tmp_path), "responses.npy")
+    points = np.array([[0, 0, 1], [2, 0, 1]], dtype=float)
+    save_responses(c=c, path=path, values=np.array([1.0, 2.0]), points=points)
+    with open(path + META_EXT, "w") as f:
+        f.write("{}")
+    assert np.array_equal(load_responses(c=c, path=path)[1], points)
+    remove_responses(path)
+    for ext in ["", MESH_EXT, META_EXT]:
+        assert not os.path.exists(path + ext)
+    # The coordinates are kept, shared by other responses on the mesh.
+    assert len(os.listdir(os.path.join(str(tmp_path), "meshes"))) == 1
+    remove_responses(path)
@@ -1,9 +1,17 @@
 """Test model.scenario and classify.data.scenarios."""
+
 import numpy as np
+from scipy.sparse import csr_matrix, vstack
 
 from bridge_sim.bridges.bridge_705 import bridge_705
 from bridge_sim.configs import opensees_default
-from bridge_sim.traffic import normal_traffic, to_traffic_array
+from bridge_sim.model import Vehicle
+from bridge_sim.traffic import (
+    _vehicle_loads,
+    normal_traffic,
+    to_traffic_array,
+    traffic_array_blocks,
+)
 
 
 def test_traffic_sequence_not_adjusted():
@@ -184,3 +192,94 @@ def test_to_traffic_array_methods():
 #     plt.plot(fem.T[0])
 #     plt.plot(responses_2)
 #     plt.show()
+
+
+def test_to_traffic_array_sparse():
+    c = opensees_default(bridge_705(0.5))
+    max_time = 2
+    vehicles = [
+        Vehicle(
+            kn=[(50, 60), (70, 80)], axle_distances=[2], axle_width=2, kmph=k, lane=l
+        )
+        for k, l in [(60, 0), (40, 1)]
+    ]
+    traffic_sequence = [(vehicles[0], 0, True), (vehicles[1], 0.5, True)] + [
+        (v, v.time_left_bridge(c.bridge), False) for v in vehicles
+    ]
+    traffic_array = to_traffic_array(
+        c=c, traffic_sequence=traffic_sequence, max_time=max_time, warm_up=False
+    )
+    traffic_array_sparse = to_traffic_array(
+        c=c,
+        traffic_sequence=traffic_sequence,
+        max_time=max_time,
+        warm_up=False,
+        sparse=True,
+    )
+    assert isinstance(traffic_array_sparse, csr_matrix)
+    assert np.array_equal(traffic_array_sparse.toarray(), traffic_array)
+    assert traffic_array_sparse.nnz < traffic_array.size / 100
+    ulm = np.random.default_rng(0).random((traffic_array.shape[1], 3))
+    assert np.allclose(traffic_array_sparse @ ulm, traffic_array @ ulm)
+
+
+def test_to_traffic_array_vectorized():
+    c = opensees_default(bridge_705(0.5))
+    max_time = 3
+    vehicles = [
+        Vehicle(
+            kn=[(50, 60), (70, 80)], axle_distances=[2], axle_width=2, kmph=k, lane=l
+        )
+        for k, l in [(60, 0), (40, 1), (50, 0)]
+    ]
+    traffic_sequence = sorted(
+        [(v, t, True) for v, t in zip(vehicles, [0, 0.5, 1.5])]
+        + [
+            (v, t + v.time_left_bridge(c.bridge), False)
+            for v, t in zip(vehicles, [0, 0.5, 1.5])
+        ],
+        key=lambda e: e[1],
+    )
+    for warm_up in [False, True]:
+        expected = to_traffic_array(
+            c=c,
+            traffic_sequence=traffic_sequence,
+            max_time=max_time,
+            warm_up=warm_up,
+            vectorized=False,
+        )
+        traffic_array = to_traffic_array(
+            c=c, traffic_sequence=traffic_sequence, max_time=max_time, warm_up=warm_up
+        )
+        assert np.allclose(traffic_array, expected)
+        blocks = list(
+            traffic_array_blocks(
+                c=c,
+                traffic_sequence=traffic_sequence,
+                max_time=max_time,
+                warm_up=warm_up,
+                block_size=70,
+                sparse=True,
+            )
+        )
+        assert np.allclose(vstack(blocks).toarray(), expected)
+
+
+def test_vehicle_loads_at_x_max():
+    """Axles within tolerance past the end of the bridge are at the end."""
+    c = opensees_default(bridge_705(0.5))
+    vehicle = Vehicle(
+        kn=[(50, 60), (70, 80)], axle_distances=[2], axle_width=2, kmph=60, lane=0
+    )
+    leaving = vehicle.time_leaving_bridge(c.bridge)
+    times = leaving + np.array([0, 1e-6, 1e-4]) / vehicle.mps
+    steps, columns, kns = _vehicle_loads(
+        c=c,
+        vehicle=vehicle,
+        times=times,
+        wheel_track_xs=np.array(c.bridge.wheel_track_xs(c)),
+    )
+    for step in range(len(times)):
+        assert np.isclose(kns[steps == step].sum(), vehicle.total_kn())
+        # The front axle is on the last unit load of each wheel track.
+        assert np.any(columns[steps == step] == c.il_num_loads - 1)